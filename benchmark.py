@@ -0,0 +1,71 @@
+# benchmark.py
+# Сравнение задержек частых запросов с подготовленными запросами и без них
+# под нагрузкой, похожей на занятие: несколько студентов одновременно входят,
+# получают вопросы, сохраняют ответы и смотрят результаты.
+import hashlib
+import random
+import sys
+import threading
+import time
+
+from database import Database, CONN_STRING, PREPARED_STATEMENTS
+
+BENCH_LOGIN = "bench_student_{}"
+
+def simulate_student(db, number, rounds, topics, password_hash):
+    """Действия одного студента за занятие"""
+    login = BENCH_LOGIN.format(number)
+    for _ in range(rounds):
+        db.get_user(login, password_hash, "Студент")
+        topic = random.choice(topics)
+        questions = db.get_questions_by_topic(topic)
+        for question in questions[:5]:
+            db.save_test_result(login, topic, question[6], random.random() < 0.7, question[0])
+        db.get_user_results(login)
+        db.get_weak_topics(login)
+
+def run_classroom(conn_string, prepare_statements, students, rounds):
+    """Один прогон нагрузки; возвращает (статистика по методам, время прогона)"""
+    # minconn = maxconn: пул psycopg2 закрывает свободные соединения сверх minconn,
+    # а вместе с соединением теряются и подготовленные на нем запросы
+    connections = min(students, 10)
+    db = Database(conn_string, pooled=True, minconn=connections, maxconn=connections,
+                  prepare_statements=prepare_statements, slow_query_ms=None)
+    try:
+        topics = db.get_all_topics()
+        password_hash = hashlib.sha256(b"bench").hexdigest()
+        # Прогрев: первое соединение открыто, запросы на нем подготовлены
+        simulate_student(db, 0, 1, topics, password_hash)
+        db.reset_query_stats()
+        threads = [threading.Thread(target=simulate_student, args=(db, n, rounds, topics, password_hash))
+                   for n in range(students)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        return db.get_query_stats(), elapsed
+    finally:
+        with db._cursor() as cursor:
+            cursor.execute("DELETE FROM test_results WHERE user_login LIKE 'bench_student_%%'")
+            cursor.execute("DELETE FROM user_topic_stats WHERE user_login LIKE 'bench_student_%%'")
+        db.close()
+
+def run_benchmark(conn_string=CONN_STRING, students=30, rounds=20):
+    """Сравнение прогонов без подготовленных запросов и с ними"""
+    plain, plain_time = run_classroom(conn_string, False, students, rounds)
+    prepared, prepared_time = run_classroom(conn_string, True, students, rounds)
+    print(f"Студентов: {students}, раундов на студента: {rounds}")
+    print(f"{'Метод':<26}{'вызовов':>9}{'без PREPARE, мс':>18}{'с PREPARE, мс':>16}{'экономия, мс':>15}")
+    for method in PREPARED_STATEMENTS:
+        before, after = plain.get(method), prepared.get(method)
+        if not before or not after:
+            continue
+        print(f"{method:<26}{after['calls']:>9}{before['avg_ms']:>18.3f}{after['avg_ms']:>16.3f}"
+              f"{before['avg_ms'] - after['avg_ms']:>15.3f}")
+    print(f"Общее время: {plain_time:.2f} с без PREPARE, {prepared_time:.2f} с с PREPARE")
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    run_benchmark(CONN_STRING, *args)
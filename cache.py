@@ -0,0 +1,149 @@
+import threading
+import time
+from collections import OrderedDict
+
+class TTLCache:
+    def __init__(self, max_size=256, ttl=300):
+        """Инициализация кэша с ограничением по времени жизни и размеру (LRU)"""
+        self.max_size = max_size
+        self.ttl = ttl
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Получение значения; возвращает (найдено, значение)"""
+        with self.lock:
+            item = self.data.get(key)
+            if item is None:
+                self.misses += 1
+                return False, None
+            expires, value = item
+            if expires < time.monotonic():
+                del self.data[key]
+                self.misses += 1
+                return False, None
+            self.data.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def set(self, key, value):
+        """Сохранение значения"""
+        with self.lock:
+            self.data[key] = (time.monotonic() + self.ttl, value)
+            self.data.move_to_end(key)
+            while len(self.data) > self.max_size:
+                self.data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, predicate=None):
+        """Удаление записей, для ключей которых predicate истинен (или всех)"""
+        with self.lock:
+            if predicate is None:
+                self.data.clear()
+                return
+            for key in [k for k in self.data if predicate(k)]:
+                del self.data[key]
+
+    def reset_stats(self):
+        """Обнуление счетчиков попаданий, промахов и вытеснений (содержимое кэша не меняется)"""
+        with self.lock:
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def get_stats(self):
+        """Статистика попаданий и промахов"""
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self.data),
+                "max_size": self.max_size,
+                "evictions": self.evictions,
+            }
+
+# Запросы материалов, которые сбрасываются после любого изменения материалов
+MATERIAL_QUERIES = {"get_all_materials", "get_materials_by_category", "get_material_list_page", "get_material"}
+
+class CachedDatabase:
+    # Справочные данные, которые кэшируются, и методы, после которых их нужно сбросить
+    CACHED_METHODS = {
+        "get_categories",
+        "get_all_topics",
+        "get_topics_by_category",
+        "get_questions_by_topic",
+        "get_all_materials",
+        "get_materials_by_category",
+        "get_material_list_page",
+        "get_material",
+    }
+    INVALIDATES = {
+        "add_question": {"get_all_topics", "get_topics_by_category", "get_questions_by_topic"},
+        "import_questions": {"get_all_topics", "get_topics_by_category", "get_questions_by_topic"},
+        "add_material": MATERIAL_QUERIES,
+        "update_material": MATERIAL_QUERIES,
+        "delete_material": MATERIAL_QUERIES,
+        # Справочники не меняют, но о них сообщается подписчикам (аналитика группы)
+        "save_test_result": set(),
+        "save_test_results": set(),
+        "rebuild_topic_stats": set(),
+        "apply_roster": set(),
+        "delete_user": set(),
+    }
+
+    def __init__(self, db, max_size=256, ttl=300):
+        """Кэширующая обертка над Database для справочных данных"""
+        self.db = db
+        self.cache = TTLCache(max_size, ttl)
+        self.listeners = []
+
+    def __getattr__(self, name):
+        """Проксирование вызовов к Database с кэшированием и сбросом кэша"""
+        attr = getattr(self.db, name)
+        if name in self.CACHED_METHODS:
+            def cached(*args):
+                key = (name,) + args
+                found, value = self.cache.get(key)
+                if not found:
+                    value = attr(*args)
+                    self.cache.set(key, value)
+                return list(value) if isinstance(value, list) else value
+            return cached
+        if name in self.INVALIDATES:
+            methods = self.INVALIDATES[name]
+            def invalidating(*args, **kwargs):
+                try:
+                    return attr(*args, **kwargs)
+                finally:
+                    if methods:
+                        self.cache.invalidate(lambda key: key[0] in methods)
+                    for listener in self.listeners:
+                        listener(name)
+            return invalidating
+        return attr
+
+    def subscribe(self, listener):
+        """Подписка на изменяющие вызовы: listener(имя метода) после каждого из INVALIDATES"""
+        self.listeners.append(listener)
+
+    def invalidate_cache(self):
+        """Полный сброс кэша"""
+        self.cache.invalidate()
+
+    def get_cache_stats(self):
+        """Статистика кэша"""
+        return self.cache.get_stats()
+
+    def dump_query_stats(self, file_path):
+        """Сохранение статистики запросов вместе со статистикой кэша"""
+        return self.db.dump_query_stats(file_path, {"cache": self.get_cache_stats()})
+
+    def reset_query_stats(self):
+        """Сброс статистики запросов и счетчиков кэша"""
+        self.db.reset_query_stats()
+        self.cache.reset_stats()
@@ -0,0 +1,169 @@
+import os
+import sys
+import threading
+import weakref
+
+import numpy as np
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.figure import Figure
+
+# Счетчики для диагностики: графики, созданные и закрытые за время работы
+_live_charts = weakref.WeakSet()
+_counters = {"created": 0, "closed": 0}
+_counters_lock = threading.Lock()
+
+class ChartView:
+    def __init__(self, parent, ncols=1, figsize=(6, 4), width_ratios=None):
+        """График экрана: одна Figure и один FigureCanvasTkAgg на все обновления
+
+        Figure создается без pyplot, поэтому не попадает в его глобальный
+        список фигур. Методы set_* меняют данные уже созданных столбцов,
+        линий и изображений и перерисовывают холст через draw_idle. При
+        уничтожении виджета (смене экрана) фигура очищается и закрывается.
+        """
+        self.figure = Figure(figsize=figsize)
+        gridspec = {"width_ratios": width_ratios} if width_ratios else None
+        axes = self.figure.subplots(1, ncols, gridspec_kw=gridspec)
+        self.axes = list(np.atleast_1d(axes))
+        self.canvas = FigureCanvasTkAgg(self.figure, master=parent)
+        self.widget = self.canvas.get_tk_widget()
+        self.widget.bind("<Destroy>", self._on_destroy, add="+")
+        self.bars = {}
+        self.lines = {}
+        self.images = {}
+        self.closed = False
+        with _counters_lock:
+            _counters["created"] += 1
+        _live_charts.add(self)
+
+    def pack(self, **kwargs):
+        """Размещение графика"""
+        self.widget.pack(**kwargs)
+
+    def set_bars(self, index, labels, values, title=None, ylabel=None, ylim=None):
+        """Столбчатая диаграмма на осях index; при тех же подписях меняются только высоты"""
+        ax = self.axes[index]
+        labels = [str(label) for label in labels]
+        bars = self.bars.get(index)
+        layout = False
+        if bars is not None and bars[0] == labels:
+            for rect, value in zip(bars[1], values):
+                rect.set_height(value)
+        else:
+            if bars is not None:
+                bars[1].remove()
+            container = ax.bar(range(len(labels)), values)
+            ax.set_xticks(range(len(labels)), labels, rotation=45, ha="right", fontsize=8)
+            self.bars[index] = (labels, container)
+            layout = True
+        if ylim is not None:
+            ax.set_ylim(*ylim)
+        else:
+            ax.relim()
+            ax.autoscale_view()
+        self._set_titles(ax, title, ylabel)
+        self.redraw(layout)
+
+    def set_line(self, index, x, y, title=None, ylabel=None, ylim=None):
+        """Линия на осях index (обновляется существующая)"""
+        ax = self.axes[index]
+        line = self.lines.get(index)
+        layout = line is None
+        if line is None:
+            line, = ax.plot(x, y, marker="o")
+            self.lines[index] = line
+            self.figure.autofmt_xdate()
+        else:
+            line.set_data(x, y)
+        ax.relim()
+        ax.autoscale_view()
+        if ylim is not None:
+            ax.set_ylim(*ylim)
+        self._set_titles(ax, title, ylabel)
+        self.redraw(layout)
+
+    def set_image(self, index, data, colorbar_label=None, **kwargs):
+        """Матрица как изображение (тепловая карта); цветовая шкала создается один раз"""
+        ax = self.axes[index]
+        if not np.size(data):
+            # Пустая выборка: одна пустая клетка
+            data = np.full((1, 1), np.nan)
+        data = np.ma.masked_invalid(data)
+        rows, columns = data.shape
+        image = self.images.get(index)
+        layout = image is None
+        if image is None:
+            image = ax.imshow(data, aspect="auto", interpolation="nearest", **kwargs)
+            if colorbar_label:
+                self.figure.colorbar(image, ax=ax, label=colorbar_label)
+            self.images[index] = image
+        else:
+            image.set_data(data)
+        image.set_extent((-0.5, columns - 0.5, rows - 0.5, -0.5))
+        ax.set_xlim(-0.5, columns - 0.5)
+        ax.set_ylim(rows - 0.5, -0.5)
+        self.redraw(layout)
+
+    def _set_titles(self, ax, title, ylabel):
+        """Заголовок и подпись оси Y, если заданы"""
+        if title is not None:
+            ax.set_title(title)
+        if ylabel is not None:
+            ax.set_ylabel(ylabel)
+
+    def redraw(self, layout=False):
+        """Отложенная перерисовка (объединяет несколько обновлений в одну)
+
+        layout=True пересчитывает поля фигуры - нужно только при смене подписей осей.
+        """
+        if self.closed:
+            return
+        if layout:
+            self.figure.tight_layout()
+        self.canvas.draw_idle()
+
+    def _on_destroy(self, event):
+        """Закрытие фигуры вместе с виджетом холста"""
+        if event.widget is self.widget:
+            self.close()
+
+    def close(self):
+        """Освобождение фигуры"""
+        if self.closed:
+            return
+        self.closed = True
+        self.figure.clear()
+        self.bars.clear()
+        self.lines.clear()
+        self.images.clear()
+        _live_charts.discard(self)
+        with _counters_lock:
+            _counters["closed"] += 1
+
+def process_memory_mb():
+    """Текущий объем памяти процесса (RSS), МБ; None, если недоступно"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        # Пиковый объем: в Linux в КБ, в macOS в байтах
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        return None
+
+def get_chart_stats():
+    """Диагностика графиков: открытые, созданные и закрытые ChartView, фигуры pyplot, память"""
+    pyplot = sys.modules.get("matplotlib.pyplot")
+    with _counters_lock:
+        counters = dict(_counters)
+    return {
+        "live": len(_live_charts),
+        "created": counters["created"],
+        "closed": counters["closed"],
+        "pyplot_figures": len(pyplot.get_fignums()) if pyplot else 0,
+        "memory_mb": process_memory_mb(),
+    }
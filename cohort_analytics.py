@@ -0,0 +1,130 @@
+import threading
+import time
+
+import numpy as np
+
+# Вызовы CachedDatabase, после которых матрица группы устаревает
+RESULT_METHODS = {"save_test_result", "save_test_results", "rebuild_topic_stats", "apply_roster", "delete_user"}
+# Границы корзин распределения общего результата студентов, %
+SCORE_BINS = np.arange(0, 101, 10)
+
+class CohortMatrix:
+    def __init__(self, logins, topics, attempts, correct):
+        """Матрица студент x тема: попыток и верных ответов (int32)
+
+        rates - процент верных (float32), NaN там, где попыток не было.
+        Срезы и сортировки возвращают новые матрицы с представлениями массивов.
+        """
+        self.logins = logins
+        self.topics = topics
+        self.attempts = attempts
+        self.correct = correct
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.rates = np.where(attempts > 0, 100.0 * correct / attempts, np.nan).astype(np.float32)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Построение из строк (логин, тема, попыток, верных)"""
+        logins = np.array(sorted({row[0] for row in rows}), dtype=object)
+        topics = np.array(sorted({row[1] for row in rows}), dtype=object)
+        login_index = {login: i for i, login in enumerate(logins)}
+        topic_index = {topic: i for i, topic in enumerate(topics)}
+        attempts = np.zeros((len(logins), len(topics)), dtype=np.int32)
+        correct = np.zeros_like(attempts)
+        if rows:
+            i = np.fromiter((login_index[row[0]] for row in rows), dtype=np.int32, count=len(rows))
+            j = np.fromiter((topic_index[row[1]] for row in rows), dtype=np.int32, count=len(rows))
+            attempts[i, j] = np.fromiter((row[2] for row in rows), dtype=np.int32, count=len(rows))
+            correct[i, j] = np.fromiter((row[3] for row in rows), dtype=np.int32, count=len(rows))
+        return cls(logins, topics, attempts, correct)
+
+    @property
+    def shape(self):
+        return self.attempts.shape
+
+    def student_scores(self):
+        """Общий процент верных ответов каждого студента"""
+        totals = self.attempts.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(totals > 0, 100.0 * self.correct.sum(axis=1) / totals, np.nan)
+
+    def topic_scores(self):
+        """Процент верных ответов группы по каждой теме"""
+        totals = self.attempts.sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(totals > 0, 100.0 * self.correct.sum(axis=0) / totals, np.nan)
+
+    def score_distribution(self, bins=SCORE_BINS):
+        """Распределение студентов по общему результату: (число студентов, границы корзин)"""
+        scores = self.student_scores()
+        return np.histogram(scores[~np.isnan(scores)], bins=bins)
+
+    def select(self, logins=None, topics=None):
+        """Срез по списку студентов и/или тем (неизвестные пропускаются)"""
+        rows = np.flatnonzero(np.isin(self.logins, list(logins))) if logins is not None else slice(None)
+        columns = np.flatnonzero(np.isin(self.topics, list(topics))) if topics is not None else slice(None)
+        return self._take(rows, columns)
+
+    def sorted(self, students="score", topics="score"):
+        """Упорядочивание: студенты и темы по "score" (от слабых к сильным) или "name" """
+        rows = np.argsort(self.student_scores(), kind="stable") if students == "score" else slice(None)
+        columns = np.argsort(self.topic_scores(), kind="stable") if topics == "score" else slice(None)
+        return self._take(rows, columns)
+
+    def _take(self, rows, columns):
+        """Новая матрица из выбранных строк и столбцов"""
+        matrix = CohortMatrix.__new__(CohortMatrix)
+        matrix.logins = self.logins[rows]
+        matrix.topics = self.topics[columns]
+        matrix.attempts = self.attempts[rows][:, columns]
+        matrix.correct = self.correct[rows][:, columns]
+        matrix.rates = self.rates[rows][:, columns]
+        return matrix
+
+class CohortAnalytics:
+    def __init__(self, db, ttl=300, missed_limit=20):
+        """Аналитика по всей группе: матрица успешности, распределение и трудные вопросы
+
+        Данные загружаются двумя запросами (сводка user_topic_stats по всем
+        студентам и агрегат ошибок по вопросам) и кэшируются. Кэш сбрасывается,
+        когда через CachedDatabase сохраняются результаты, и по истечении ttl
+        секунд (результаты с других машин).
+        """
+        self.db = db
+        self.ttl = ttl
+        self.missed_limit = missed_limit
+        self.lock = threading.Lock()
+        self.data = None
+        self.loaded_at = 0.0
+        self.generation = 0
+        if hasattr(db, "subscribe"):
+            db.subscribe(self.on_db_change)
+
+    def on_db_change(self, method):
+        """Сброс кэша после записи результатов"""
+        if method in RESULT_METHODS:
+            self.invalidate()
+
+    def invalidate(self):
+        """Сброс кэша"""
+        with self.lock:
+            self.data = None
+            self.generation += 1
+
+    def get(self, since=None):
+        """(CohortMatrix, трудные вопросы) из кэша или из базы
+
+        since ограничивает период для трудных вопросов; матрица строится по всей истории.
+        """
+        with self.lock:
+            if self.data is not None and self.data[0] == since and time.monotonic() - self.loaded_at < self.ttl:
+                return self.data[1]
+            generation = self.generation
+        matrix = CohortMatrix.from_rows(self.db.get_cohort_stats())
+        missed = self.db.get_most_missed_questions(self.missed_limit, since)
+        with self.lock:
+            # Результаты, записанные во время загрузки, требуют повторного чтения
+            if generation == self.generation:
+                self.data = (since, (matrix, missed))
+                self.loaded_at = time.monotonic()
+        return matrix, missed
@@ -1,382 +1,1261 @@
-
 # database.py
-import psycopg2
+import sqlite3
+import functools
+import gzip
 import hashlib
-from datetime import datetime
+import itertools
+import os
+import re
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from migrations import MIGRATIONS, LATEST_VERSION, PARTITION_MONTHS_AHEAD
+from query_stats import QueryStats, InstrumentedCursor, execute_values
+
+try:
+    import psycopg2
+    import psycopg2.errors
+    from psycopg2 import pool, sql
+except ImportError:
+    # Встроенному хранилищу SQLite драйвер PostgreSQL не нужен
+    psycopg2 = pool = sql = None
+
+# Ошибки драйверов, которые методы Database оборачивают в Exception с описанием
+DB_ERRORS = (psycopg2.Error, sqlite3.Error) if psycopg2 is not None else (sqlite3.Error,)
+
+# Ключ advisory-блокировки, чтобы миграции с нескольких машин не шли одновременно
+MIGRATION_LOCK_ID = 720401
+
+# Месячные секции test_results
+PARTITION_NAME = re.compile(r"^test_results_(\d{4})_(\d{2})$")
+
+def month_start(value):
+    """Первое число месяца для даты"""
+    return date(value.year, value.month, 1)
+
+def next_month(value):
+    """Первое число следующего месяца"""
+    return (month_start(value) + timedelta(days=32)).replace(day=1)
+
+# Частые запросы: при prepare_statements=True они готовятся (PREPARE) один раз
+# на соединение и затем выполняются по имени, без повторного разбора и планирования
+PREPARED_STATEMENTS = {
+    "get_user": "SELECT * FROM users WHERE login=%s AND password=%s AND role=%s",
+    "get_questions_by_topic": "SELECT * FROM questions WHERE topic=%s",
+    "save_test_result": "INSERT INTO test_results (user_login, topic, category, correct, timestamp, question_id) "
+                        "VALUES (%s, %s, %s, %s, %s, %s)",
+    "get_user_results": "SELECT * FROM test_results WHERE user_login=%s "
+                        "AND timestamp >= COALESCE(%s::timestamp, '-infinity') ORDER BY timestamp DESC",
+    "get_weak_topics": "SELECT topic FROM user_topic_stats "
+                       "WHERE user_login=%s AND attempts > 0 AND correct_count < 0.7 * attempts",
+}
+
+# Периоды для динамики результатов (date_trunc)
+TREND_BUCKETS = ("day", "week", "month")
+
+def numbered_placeholders(query):
+    """Замена %s на $1, $2, ... для PREPARE"""
+    counter = itertools.count(1)
+    return re.sub(r"%s", lambda _: f"${next(counter)}", query)
+
+CONN_STRING = "dbname=postgres user=postgres password=4BQT6r0VVWjo host=localhost port=5432"
+
+class CopyRowStream:
+    def __init__(self, rows):
+        """Файлоподобный объект, отдающий строки в текстовом формате COPY"""
+        self.rows = iter(rows)
+        self.buffer = b""
+
+    @staticmethod
+    def _field(value):
+        """Экранирование одного поля"""
+        if value is None:
+            return "\\N"
+        if isinstance(value, list):
+            value = "{" + ",".join('"' + str(v).replace("\\", "\\\\").replace('"', '\\"') + '"' for v in value) + "}"
+        return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+                .replace("\n", "\\n").replace("\r", "\\r"))
+
+    def read(self, size=-1):
+        """Чтение очередной порции данных для copy_expert"""
+        while size < 0 or len(self.buffer) < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            self.buffer += ("\t".join(self._field(v) for v in row) + "\n").encode("utf-8")
+        if size < 0:
+            size = len(self.buffer)
+        chunk, self.buffer = self.buffer[:size], self.buffer[size:]
+        return chunk
+
+    readline = read
 
 class Database:
-    def __init__(self):
-        """Инициализация подключения к PostgreSQL"""
-        conn_string = "dbname=postgres user=postgres password=4BQT6r0VVWjo host=localhost port=5432"
+    def __init__(self, conn_string=CONN_STRING, pooled=False, minconn=1, maxconn=10,
+                 checkout_timeout=30, health_check=True, health_check_idle=30,
+                 slow_query_ms=200, slow_log_file="logs/slow_queries.log", explain_slow=False,
+                 prepare_statements=True):
+        """Инициализация подключения к PostgreSQL
+
+        В обычном режиме используется одно соединение, доступ к которому
+        сериализуется блокировкой. В режиме pooled=True соединения берутся
+        из пула psycopg2 (от minconn до maxconn), и каждый вызов получает
+        собственное соединение и курсор.
+        prepare_statements включает подготовленные запросы из PREPARED_STATEMENTS.
+        """
+        if psycopg2 is None:
+            raise Exception("Для подключения к PostgreSQL нужен пакет psycopg2")
+        self._init_common(conn_string, pooled, maxconn, checkout_timeout,
+                          slow_query_ms, slow_log_file, explain_slow, prepare_statements)
+        self.health_check = health_check
+        self.health_check_idle = health_check_idle
         try:
-            self.conn = psycopg2.connect(conn_string)
-            self.cursor = self.conn.cursor()
+            if pooled:
+                self.pool = pool.ThreadedConnectionPool(minconn, maxconn, conn_string)
+            else:
+                self.conn = psycopg2.connect(conn_string)
             print("Подключение к базе данных успешно установлено")
-        except psycopg2.Error as e:
+        except DB_ERRORS as e:
             raise Exception(f"Ошибка подключения к базе данных: {str(e)}")
         except Exception as e:
             raise Exception(f"Неожиданная ошибка при подключении: {str(e)}")
 
+    def _init_common(self, conn_string, pooled, maxconn, checkout_timeout, slow_query_ms, slow_log_file,
+                     explain_slow, prepare_statements):
+        """Состояние, общее для всех хранилищ: соединения, слоты, статистика запросов и пула"""
+        self.conn_string = conn_string
+        self.pooled = pooled
+        self.conn = None
+        self.pool = None
+        self.maxconn = maxconn
+        self.checkout_timeout = checkout_timeout
+        self._last_used = {}
+        self.prepare_statements = prepare_statements
+        # Имена запросов, уже подготовленных на каждом соединении
+        self._prepared = weakref.WeakKeyDictionary()
+        self._stream_ids = itertools.count(1)
+        self._local = threading.local()
+        self.query_stats = QueryStats(slow_query_ms, slow_log_file, explain_slow)
+        self._slots = threading.BoundedSemaphore(maxconn if pooled else 1)
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "checkouts": 0,
+            "in_use": 0,
+            "max_in_use": 0,
+            "waits": 0,
+            "wait_time": 0.0,
+            "health_check_failures": 0,
+            "reconnects": 0,
+            "errors": 0,
+        }
+
+    def _is_alive(self, conn):
+        """Проверка работоспособности соединения"""
+        if conn.closed:
+            return False
+        if not self.health_check:
+            return True
+        # Соединение, которое использовалось недавно, не проверяем лишним запросом
+        last_used = self._last_used.get(id(conn))
+        if last_used is not None and time.monotonic() - last_used < self.health_check_idle:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _acquire(self):
+        """Получение соединения (из пула или единственного)"""
+        started = time.perf_counter()
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self._stats["waits"] += 1
+            if not self._slots.acquire(timeout=self.checkout_timeout):
+                raise pool.PoolError("Истекло время ожидания свободного соединения")
+        try:
+            if self.pooled:
+                conn = self.pool.getconn()
+                if not self._is_alive(conn):
+                    with self._stats_lock:
+                        self._stats["health_check_failures"] += 1
+                    self.pool.putconn(conn, close=True)
+                    conn = self.pool.getconn()
+                    with self._stats_lock:
+                        self._stats["reconnects"] += 1
+            else:
+                if not self._is_alive(self.conn):
+                    with self._stats_lock:
+                        self._stats["health_check_failures"] += 1
+                    if not self.conn.closed:
+                        self.conn.close()
+                    self.conn = psycopg2.connect(self.conn_string)
+                    with self._stats_lock:
+                        self._stats["reconnects"] += 1
+                conn = self.conn
+        except Exception:
+            self._slots.release()
+            raise
+        with self._stats_lock:
+            self._stats["checkouts"] += 1
+            self._stats["in_use"] += 1
+            self._stats["max_in_use"] = max(self._stats["max_in_use"], self._stats["in_use"])
+            self._stats["wait_time"] += time.perf_counter() - started
+        return conn
+
+    def _release(self, conn, broken=False):
+        """Возврат соединения"""
+        if broken or conn.closed:
+            self._last_used.pop(id(conn), None)
+        else:
+            self._last_used[id(conn)] = time.monotonic()
+        try:
+            if self.pooled:
+                self.pool.putconn(conn, close=broken or conn.closed)
+        finally:
+            with self._stats_lock:
+                self._stats["in_use"] -= 1
+            self._slots.release()
+
+    def _current_method(self):
+        """Имя публичного метода Database, выполняющегося в текущем потоке"""
+        return getattr(self._local, "method", None) or "unknown"
+
+    @contextmanager
+    def _cursor(self, name=None, method=None):
+        """Курсор на время одного вызова
+
+        При успешном выходе транзакция фиксируется, при ошибке - откатывается,
+        поэтому сбойный запрос не оставляет соединение в прерванной транзакции.
+        С name создается серверный (именованный) курсор для потоковой выборки.
+        Все запросы курсора учитываются в query_stats под именем метода.
+        """
+        conn = self._acquire()
+        broken = False
+        try:
+            with conn.cursor(name=name, cursor_factory=InstrumentedCursor) as cursor:
+                cursor.stats = self.query_stats
+                cursor.method = method or self._current_method()
+                yield cursor
+            conn.commit()
+        except BaseException as e:
+            # GeneratorExit при досрочном закрытии потоковой выборки - не ошибка
+            if isinstance(e, Exception):
+                with self._stats_lock:
+                    self._stats["errors"] += 1
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                broken = True
+            raise
+        finally:
+            self._release(conn, broken)
+
+    def _execute_prepared(self, cursor, name, params):
+        """Выполнение запроса из PREPARED_STATEMENTS
+
+        На соединении, где запрос еще не подготовлен, сначала выполняется
+        PREPARE. Подготовленный запрос переживает откат транзакции и живет,
+        пока открыто соединение.
+        """
+        query = PREPARED_STATEMENTS[name]
+        if not self.prepare_statements:
+            cursor.execute(query, params)
+            return
+        prepared = self._prepared.setdefault(cursor.connection, set())
+        if name not in prepared:
+            cursor.execute(f"PREPARE db_{name} AS {numbered_placeholders(query)}")
+            prepared.add(name)
+        cursor.execute(f"EXECUTE db_{name} ({', '.join(['%s'] * len(params))})", params)
+
+    def _iter_query(self, query, params, batch_size, error_message):
+        """Генератор строк запроса, читаемых с сервера порциями по batch_size
+
+        Соединение занято, пока генератор не исчерпан или не закрыт,
+        поэтому в режиме одного соединения его нужно дочитывать до конца
+        прежде, чем обращаться к базе снова.
+        """
+        # Имя метода запоминается сейчас: тело генератора выполнится позже
+        return self._stream(query, params, batch_size, error_message, self._current_method())
+
+    def _stream(self, query, params, batch_size, error_message, method):
+        """Тело потоковой выборки для _iter_query"""
+        name = f"stream_{id(self)}_{next(self._stream_ids)}"
+        try:
+            with self._cursor(name=name, method=method) as cursor:
+                cursor.itersize = batch_size
+                cursor.execute(query, params)
+                for row in cursor:
+                    yield row
+        except DB_ERRORS as e:
+            raise Exception(f"{error_message}: {str(e)}")
+
+    def get_pool_stats(self):
+        """Статистика пула соединений"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["pooled"] = self.pooled
+        stats["maxconn"] = self.maxconn if self.pooled else 1
+        if self.pooled:
+            stats["open_connections"] = len(self.pool._pool) + len(self.pool._used)
+            stats["idle_connections"] = len(self.pool._pool)
+        else:
+            stats["open_connections"] = 0 if self.conn is None or self.conn.closed else 1
+            stats["idle_connections"] = stats["open_connections"] - stats["in_use"]
+        if stats["checkouts"]:
+            stats["avg_wait_ms"] = stats["wait_time"] / stats["checkouts"] * 1000
+        else:
+            stats["avg_wait_ms"] = 0.0
+        return stats
+
+    def get_schema_version(self):
+        """Текущая версия схемы (0, если миграции не применялись)"""
+        try:
+            with self._cursor() as cursor:
+                cursor.execute("SELECT MAX(version) FROM schema_version")
+                return cursor.fetchone()[0] or 0
+        except psycopg2.errors.UndefinedTable:
+            return 0
+        except DB_ERRORS as e:
+            raise Exception(f"Ошибка при получении версии схемы: {str(e)}")
+
+    def migrate(self):
+        """Применение недостающих миграций схемы
+
+        При актуальной схеме выполняется единственный запрос версии.
+        """
+        if self.get_schema_version() >= LATEST_VERSION:
+            return LATEST_VERSION
+        try:
+            with self._cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_ID,))
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS schema_version (
+                        version INTEGER PRIMARY KEY,
+                        description TEXT,
+                        applied_at TIMESTAMP DEFAULT now()
+                    )
+                """)
+                cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+                current = cursor.fetchone()[0]
+                for version, description, step in MIGRATIONS:
+                    if version <= current:
+                        continue
+                    step(self, cursor)
+                    cursor.execute("INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+                                  (version, description))
+                    print(f"Применена миграция {version}: {description}")
+            return LATEST_VERSION
+        except DB_ERRORS as e:
+            raise Exception(f"Ошибка при миграции схемы: {str(e)}")
+
+    def get_query_stats(self):
+        """Статистика запросов по методам"""
+        return self.query_stats.get_stats()
+
+    def dump_query_stats(self, file_path, extra=None):
+        """Сохранение статистики запросов и пула соединений (и разделов extra) в JSON"""
+        return self.query_stats.dump_json(file_path, dict(extra or {}, pool=self.get_pool_stats()))
+
+    def reset_query_stats(self):
+        """Сброс статистики запросов"""
+        self.query_stats.reset()
+
     def create_tables(self):
-        """Создание таблиц базы данных"""
-        try:
-            # Таблица пользователей
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS users (
-                    id SERIAL PRIMARY KEY,
-                    login VARCHAR(50) UNIQUE,
-                    password VARCHAR(64),
-                    role VARCHAR(20),
-                    name VARCHAR(100)
-                );
-                CREATE INDEX IF NOT EXISTS idx_users_login ON users(login);
-            """)
-            # Таблица материалов
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS materials (
-                    id SERIAL PRIMARY KEY,
-                    topic VARCHAR(100),
-                    content TEXT,
-                    file_path VARCHAR(255),
-                    category VARCHAR(50)
-                );
-                CREATE INDEX IF NOT EXISTS idx_materials_topic ON materials(topic);
-            """)
-            # Таблица вопросов
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS questions (
-                    id SERIAL PRIMARY KEY,
-                    topic VARCHAR(100),
-                    question TEXT,
-                    correct_answer VARCHAR(255),
-                    wrong_answers TEXT[],
-                    question_type VARCHAR(50),
-                    category VARCHAR(50)
-                );
-                CREATE INDEX IF NOT EXISTS idx_questions_topic ON questions(topic);
-            """)
-            # Таблица результатов тестов
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS test_results (
-                    id SERIAL PRIMARY KEY,
-                    user_login VARCHAR(50),
-                    topic VARCHAR(100),
-                    category VARCHAR(50),
-                    correct BOOLEAN,
-                    timestamp TIMESTAMP
-                );
-                CREATE INDEX IF NOT EXISTS idx_test_results_user ON test_results(user_login);
-            """)
-            # Таблица категорий
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS categories (
-                    id SERIAL PRIMARY KEY,
-                    name VARCHAR(50) UNIQUE
-                );
-            """)
-            # Таблица прогресса пользователя
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS user_progress (
-                    id SERIAL PRIMARY KEY,
-                    user_login VARCHAR(50),
-                    topic VARCHAR(100),
-                    progress INTEGER
-                );
-            """)
-            # Таблица логов
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS logs (
-                    id SERIAL PRIMARY KEY,
-                    user_login VARCHAR(50),
-                    action TEXT,
-                    timestamp TIMESTAMP
-                );
-            """)
-            self.conn.commit()
-            print("Таблицы успешно созданы")
-        except psycopg2.Error as e:
-            self.conn.rollback()
-            raise Exception(f"Ошибка при создании таблиц: {str(e)}")
+        """Создание таблиц базы данных: применение всех миграций схемы (см. migrations.py)"""
+        return self.migrate()
 
     def insert_test_data(self):
         """Вставка тестовых данных"""
         try:
-            # Проверка и вставка пользователей
-            self.cursor.execute("SELECT COUNT(*) FROM users")
-            if self.cursor.fetchone()[0] == 0:
-                self.cursor.execute("""
-                    INSERT INTO users (login, password, role, name) VALUES
-                    (%s, %s, %s, %s),
-                    (%s, %s, %s, %s),
-                    (%s, %s, %s, %s)
-                """, (
-                    'admin', hashlib.sha256("admin123".encode()).hexdigest(), 'Администратор', 'Админ Админов',
-                    'teacher', hashlib.sha256("teacher123".encode()).hexdigest(), 'Преподаватель', 'Петр Петров',
-                    'student', hashlib.sha256("student123".encode()).hexdigest(), 'Студент', 'Иван Иванов'
-                ))
-
-            # Проверка и вставка категорий
-            self.cursor.execute("SELECT COUNT(*) FROM categories")
-            if self.cursor.fetchone()[0] == 0:
-                self.cursor.execute("""
-                    INSERT INTO categories (name) VALUES
-                    (%s), (%s), (%s), (%s)
-                """, ('Логика', 'Теория множеств', 'Графы', 'Комбинаторика'))
-
-            # Проверка и вставка материалов
-            self.cursor.execute("SELECT COUNT(*) FROM materials")
-            if self.cursor.fetchone()[0] == 0:
-                self.cursor.execute("""
-                    INSERT INTO materials (topic, content, file_path, category) VALUES
-                    (%s, %s, %s, %s),
-                    (%s, %s, %s, %s),
-                    (%s, %s, %s, %s),
-                    (%s, %s, %s, %s)
-                """, (
-                    'Логика высказываний', 'Основы математической логики...', 'data/logic.jpg', 'Логика',
-                    'Операции над множествами', 'Множества и их свойства...', 'data/sets.mp4', 'Теория множеств',
-                    'Основы теории графов', 'Графы и их применение...', 'data/graph.png', 'Графы',
-                    'Комбинаторные задачи', 'Принципы подсчета...', 'data/combinatorics.pdf', 'Комбинаторика'
-                ))
-
-            # Проверка и вставка вопросов
-            self.cursor.execute("SELECT COUNT(*) FROM questions")
-            if self.cursor.fetchone()[0] == 0:
-                self.cursor.execute("""
-                    INSERT INTO questions (topic, question, correct_answer, wrong_answers, question_type, category) VALUES
-                    (%s, %s, %s, %s, %s, %s),
-                    (%s, %s, %s, %s, %s, %s),
-                    (%s, %s, %s, %s, %s, %s),
-                    (%s, %s, %s, %s, %s, %s)
-                """, (
-                    'Логика высказываний', 'Что такое дизъюнкция?', 'Логическое ИЛИ',
-                    ['Логическое И', 'Логическое НЕ', 'Импликация'], 'Множественный выбор', 'Логика',
-                    'Операции над множествами', 'Что такое объединение множеств?', 'Все элементы обоих множеств',
-                    ['Пересечение', 'Разность', 'Дополнение'], 'Множественный выбор', 'Теория множеств',
-                    'Основы теории графов', 'Что такое вершина графа?', 'Точка в графе',
-                    ['Ребро', 'Цикл', 'Путь'], 'Множественный выбор', 'Графы',
-                    'Комбинаторные задачи', 'Сколько способов выбрать 3 книги из 5?', '10',
-                    [], 'Открытый вопрос', 'Комбинаторика'
-                ))
-
-            # Проверка и вставка прогресса пользователя
-            self.cursor.execute("SELECT COUNT(*) FROM user_progress")
-            if self.cursor.fetchone()[0] == 0:
-                self.cursor.execute("""
-                    INSERT INTO user_progress (user_login, topic, progress) VALUES
-                    (%s, %s, %s),
-                    (%s, %s, %s)
-                """, ('student', 'Логика высказываний', 50, 'student', 'Операции над множествами', 70))
-
-            self.conn.commit()
+            with self._cursor() as cursor:
+                self._insert_test_data(cursor)
             print("Тестовые данные успешно вставлены")
-        except psycopg2.Error as e:
-            self.conn.rollback()
+        except DB_ERRORS as e:
             raise Exception(f"Ошибка при вставке тестовых данных: {str(e)}")
 
+    def _insert_test_data(self, cursor):
+        """Вставка тестовых данных в текущей транзакции"""
+        # Проверка и вставка пользователей
+        cursor.execute("SELECT COUNT(*) FROM users")
+        if cursor.fetchone()[0] == 0:
+            cursor.execute("""
+                INSERT INTO users (login, password, role, name) VALUES
+                (%s, %s, %s, %s),
+                (%s, %s, %s, %s),
+                (%s, %s, %s, %s)
+            """, (
+                'admin', hashlib.sha256("admin123".encode()).hexdigest(), 'Администратор', 'Админ Админов',
+                'teacher', hashlib.sha256("teacher123".encode()).hexdigest(), 'Преподаватель', 'Петр Петров',
+                'student', hashlib.sha256("student123".encode()).hexdigest(), 'Студент', 'Иван Иванов'
+            ))
+
+        # Проверка и вставка категорий
+        cursor.execute("SELECT COUNT(*) FROM categories")
+        if cursor.fetchone()[0] == 0:
+            cursor.execute("""
+                INSERT INTO categories (name) VALUES
+                (%s), (%s), (%s), (%s)
+            """, ('Логика', 'Теория множеств', 'Графы', 'Комбинаторика'))
+
+        # Проверка и вставка материалов
+        cursor.execute("SELECT COUNT(*) FROM materials")
+        if cursor.fetchone()[0] == 0:
+            cursor.execute("""
+                INSERT INTO materials (topic, content, file_path, category) VALUES
+                (%s, %s, %s, %s),
+                (%s, %s, %s, %s),
+                (%s, %s, %s, %s),
+                (%s, %s, %s, %s)
+            """, (
+                'Логика высказываний', 'Основы математической логики...', 'data/logic.jpg', 'Логика',
+                'Операции над множествами', 'Множества и их свойства...', 'data/sets.mp4', 'Теория множеств',
+                'Основы теории графов', 'Графы и их применение...', 'data/graph.png', 'Графы',
+                'Комбинаторные задачи', 'Принципы подсчета...', 'data/combinatorics.pdf', 'Комбинаторика'
+            ))
+
+        # Проверка и вставка вопросов
+        cursor.execute("SELECT COUNT(*) FROM questions")
+        if cursor.fetchone()[0] == 0:
+            cursor.execute("""
+                INSERT INTO questions (topic, question, correct_answer, wrong_answers, question_type, category) VALUES
+                (%s, %s, %s, %s, %s, %s),
+                (%s, %s, %s, %s, %s, %s),
+                (%s, %s, %s, %s, %s, %s),
+                (%s, %s, %s, %s, %s, %s)
+            """, (
+                'Логика высказываний', 'Что такое дизъюнкция?', 'Логическое ИЛИ',
+                ['Логическое И', 'Логическое НЕ', 'Импликация'], 'Множественный выбор', 'Логика',
+                'Операции над множествами', 'Что такое объединение множеств?', 'Все элементы обоих множеств',
+                ['Пересечение', 'Разность', 'Дополнение'], 'Множественный выбор', 'Теория множеств',
+                'Основы теории графов', 'Что такое вершина графа?', 'Точка в графе',
+                ['Ребро', 'Цикл', 'Путь'], 'Множественный выбор', 'Графы',
+                'Комбинаторные задачи', 'Сколько способов выбрать 3 книги из 5?', '10',
+                [], 'Открытый вопрос', 'Комбинаторика'
+            ))
+
+        # Проверка и вставка прогресса пользователя
+        cursor.execute("SELECT COUNT(*) FROM user_progress")
+        if cursor.fetchone()[0] == 0:
+            cursor.execute("""
+                INSERT INTO user_progress (user_login, topic, progress) VALUES
+                (%s, %s, %s),
+                (%s, %s, %s)
+            """, ('student', 'Логика высказываний', 50, 'student', 'Операции над множествами', 70))
+
     def get_user(self, login, password, role):
         """Получение пользователя"""
         try:
-            self.cursor.execute("SELECT * FROM users WHERE login=%s AND password=%s AND role=%s", 
-                               (login, password, role))
-            return self.cursor.fetchone()
-        except psycopg2.Error as e:
+            with self._cursor() as cursor:
+                self._execute_prepared(cursor, "get_user", (login, password, role))
+                return cursor.fetchone()
+        except DB_ERRORS as e:
             raise Exception(f"Ошибка при получении пользователя: {str(e)}")
 
     def get_user_info(self, login):
         """Получение информации о пользователе"""
         try:
-            self.cursor.execute("SELECT * FROM users WHERE login=%s", (login,))
-            return self.cursor.fetchone()
-        except psycopg2.Error as e:
+            with self._cursor() as cursor:
+                cursor.execute("SELECT * FROM users WHERE login=%s", (login,))
+                return cursor.fetchone()
+        except DB_ERRORS as e:
             raise Exception(f"Ошибка при получении информации о пользователе: {str(e)}")
 
     def add_user(self, login, password, role, name):
         """Добавление пользователя"""
         try:
-            self.cursor.execute("INSERT INTO users (login, password, role, name) VALUES (%s, %s, %s, %s)", 
-                               (login, password, role, name))
-            self.conn.commit()
-        except psycopg2.Error as e:
-            self.conn.rollback()
+            with self._cursor() as cursor:
+                cursor.execute("INSERT INTO users (login, password, role, name) VALUES (%s, %s, %s, %s)", 
+                              (login, password, role, name))
+        except DB_ERRORS as e:
             raise Exception(f"Ошибка при добавлении пользователя: {str(e)}")
 
     def update_user(self, login, password, role, name):
         """Обновление пользователя"""
         try:
-            query = "UPDATE users SET "
-            params = []
-            if password:
-                query += "password=%s, "
-                params.append(password)
-            if role:
-                query += "role=%s, "
-                params.append(role)
-            if name:
-                query += "name=%s, "
-                params.append(name)
-            query = query.rstrip(", ") + " WHERE login=%s"
-            params.append(login)
-            self.cursor.execute(query, params)
-            self.conn.commit()
-        except psycopg2.Error as e:
-            self.conn.rollback()
+            with self._cursor() as cursor:
+                query = "UPDATE users SET "
+                params = []
+                if password:
+                    query += "password=%s, "
+                    params.append(password)
+                if role:
+                    query += "role=%s, "
+                    params.append(role)
+                if name:
+                    query += "name=%s, "
+                    params.append(name)
+                query = query.rstrip(", ") + " WHERE login=%s"
+                params.append(login)
+                cursor.execute(query, params)
+        except DB_ERRORS as e:
             raise Exception(f"Ошибка при обновлении пользователя: {str(e)}")
 
     def delete_user(self, login):
         """Удаление пользователя"""
         try:
-            self.cursor.execute("DELETE FROM users WHERE login=%s", (login,))
-            self.conn.commit()
-        except psycopg2.Error as e:
-            self.conn.rollback()
+            with self._cursor() as cursor:
+                cursor.execute("DELETE FROM users WHERE login=%s", (login,))
+        except DB_ERRORS as e:
             raise Exception(f"Ошибка при удалении пользователя: {str(e)}")
 
+    def apply_roster(self, users, logins_to_delete=()):
+        """Пакетное создание/обновление и удаление пользователей в одной транзакции
+
+        users - кортежи (login, password, initial_password, role, name) с уже
+        захэшированными паролями. password задает пароль явно; если он пуст,
+        новый пользователь получает initial_password, а у существующего
+        пароль не меняется. Возвращает ({login: создан ли}, множество удаленных).
+        """
+        try:
+            with self._cursor() as cursor:
+                created = {}
+                if users:
+                    rows = execute_values(cursor, """
+                        WITH roster (login, password, initial_password, role, name) AS (VALUES %s)
+                        INSERT INTO users (login, password, role, name)
+                        SELECT login, COALESCE(password, initial_password), role, name FROM roster
+                        ON CONFLICT (login) DO UPDATE SET
+                            role = EXCLUDED.role,
+                            name = EXCLUDED.name,
+                            password = COALESCE(
+                                (SELECT r.password FROM roster r WHERE r.login = EXCLUDED.login), users.password)
+                        RETURNING login, xmax = 0
+                    """, users, page_size=len(users), fetch=True)
+                    created = dict(rows)
+                deleted = set()
+                if logins_to_delete:
+                    cursor.execute("DELETE FROM users WHERE login = ANY(%s) RETURNING login", (list(logins_to_delete),))
+                    deleted = {row[0] for row in cursor.fetchall()}
+                return created, deleted
+        except DB_ERRORS as e:
+            raise Exception(f"Ошибка при загрузке списка пользователей: {str(e)}")
+
     def get_all_users(self):
         """Получение всех пользователей"""
         try:
-            self.cursor.execute("SELECT * FROM users")
-            return self.cursor.fetchall()
-        except psycopg2.Error as e:
+            with self._cursor() as cursor:
+                cursor.execute("SELECT * FROM users")
+                return cursor.fetchall()
+        except DB_ERRORS as e:
+            raise Exception(f"Ошибка при получении списка пользователей: {str(e)}")
+
+    def get_all_users_page(self, after=None, page_size=100):
+        """Страница пользователей; after - id последнего пользователя предыдущей страницы"""
+        try:
+            with self._cursor() as cursor:
+                cursor.execute("SELECT * FROM users WHERE id > %s ORDER BY id LIMIT %s",
+                              (after if after is not None else 0, page_size))
+                return cursor.fetchall()
+        except DB_ERRORS as e:
             raise Exception(f"Ошибка при получении списка пользователей: {str(e)}")
 
     def add_material(self, topic, content, file_path, category):
         """Добавление материала"""
         try:
-            self.cursor.execute("INSERT INTO materials (topic, content, file_path, category) VALUES (%s, %s, %s, %s)", 
-                               (topic, content, file_path, category))
-            self.conn.commit()
-        except psycopg2.Error as e:
-            self.conn.rollback()
+            with self._cursor() as cursor:
+                cursor.execute("INSERT INTO materials (topic, content, file_path, category) VALUES (%s, %s, %s, %s)", 
+                              (topic, content, file_path, category))
+        except DB_ERRORS as e:
             raise Exception(f"Ошибка при добавлении материала: {str(e)}")
 
     def update_material(self, topic, content, file_path, category):
         """Обновление материала"""
         try:
-            self.cursor.execute("UPDATE materials SET content=%s, file_path=%s, category=%s WHERE topic=%s", 
-                               (content, file_path, category, topic))
-            self.conn.commit()
-        except psycopg2.Error as e:
-            self.conn.rollback()
+            with self._cursor() as cursor:
+                cursor.execute("UPDATE materials SET content=%s, file_path=%s, category=%s WHERE topic=%s", 
+                              (content, file_path, category, topic))
+        except DB_ERRORS as e:
             raise Exception(f"Ошибка при обновлении материала: {str(e)}")
 
     def delete_material(self, topic):
         """Удаление материала"""
         try:
-            self.cursor.execute("DELETE FROM materials WHERE topic=%s", (topic,))
-            self.conn.commit()
-        except psycopg2.Error as e:
-            self.conn.rollback()
+            with self._cursor() as cursor:
+                cursor.execute("DELETE FROM materials WHERE topic=%s", (topic,))
+        except DB_ERRORS as e:
             raise Exception(f"Ошибка при удалении материала: {str(e)}")
 
     def get_all_materials(self):
         """Получение всех материалов"""
         try:
-            self.cursor.execute("SELECT * FROM materials")
-            return self.cursor.fetchall()
-        except psycopg2.Error as e:
+            with self._cursor() as cursor:
+                cursor.execute("SELECT * FROM materials")
+                return cursor.fetchall()
+        except DB_ERRORS as e:
+            raise Exception(f"Ошибка при получении материалов: {str(e)}")
+
+    def get_all_materials_page(self, after=None, page_size=100):
+        """Страница материалов; after - id последнего материала предыдущей страницы"""
+        try:
+            with self._cursor() as cursor:
+                cursor.execute("SELECT * FROM materials WHERE id > %s ORDER BY id LIMIT %s",
+                              (after if after is not None else 0, page_size))
+                return cursor.fetchall()
+        except DB_ERRORS as e:
             raise Exception(f"Ошибка при получении материалов: {str(e)}")
 
     def get_materials_by_category(self, category):
         """Получение материалов по категории"""
         try:
-            self.cursor.execute("SELECT * FROM materials WHERE category=%s", (category,))
-            return self.cursor.fetchall()
-        except psycopg2.Error as e:
+            with self._cursor() as cursor:
+                cursor.execute("SELECT * FROM materials WHERE category=%s", (category,))
+                return cursor.fetchall()
+        except DB_ERRORS as e:
             raise Exception(f"Ошибка при получении материалов по категории: {str(e)}")
 
+    def get_material_list_page(self, category=None, after=None, page_size=200):
+        """Страница списка материалов без содержания: (id, topic, category, has_media, file_path)
+
+        Текст content не читается - он загружается get_material при открытии
+        материала. file_path нужен для фоновой подготовки миниатюр. Фильтр по
+        категории и порядок по id идут по индексу (category, id); after - id
+        последней строки предыдущей страницы.
+        """
+        conditions, params = ["id > %s"], [after if after is not None else 0]
+        if category:
+            conditions.append("category = %s")
+            params.append(category)
+        try:
+            with self._cursor() as cursor:
+                cursor.execute("SELECT id, topic, category, COALESCE(file_path, '') <> '' AS has_media, file_path "
+                              f"FROM materials WHERE {' AND '.join(conditions)} ORDER BY id LIMIT %s",
+                              params + [page_size])
+                return cursor.fetchall()
+        except DB_ERRORS as e:
+            raise Exception(f"Ошибка при получении списка материалов: {str(e)}")
+
+    def get_material(self, material_id):
+        """Материал целиком по id (с содержанием); None, если он удален"""
+        try:
+            with self._cursor() as cursor:
+                cursor.execute("SELECT id, topic, content, file_path, category FROM materials WHERE id=%s",
+                              (material_id,))
+                return cursor.fetchone()
+        except DB_ERRORS as e:
+            raise Exception(f"Ошибка при получении материала: {str(e)}")
+
     def add_question(self, topic, question, correct_answer, wrong_answers, question_type, category):
         """Добавление вопроса"""
         try:
-            self.cursor.execute("INSERT INTO questions (topic, question, correct_answer, wrong_answers, question_type, category) VALUES (%s, %s, %s, %s, %s, %s)", 
-                               (topic, question, correct_answer, wrong_answers, question_type, category))
-            self.conn.commit()
-        except psycopg2.Error as e:
-            self.conn.rollback()
+            with self._cursor() as cursor:
+                cursor.execute("INSERT INTO questions (topic, question, correct_answer, wrong_answers, question_type, category) VALUES (%s, %s, %s, %s, %s, %s)", 
+                              (topic, question, correct_answer, wrong_answers, question_type, category))
+        except DB_ERRORS as e:
             raise Exception(f"Ошибка при добавлении вопроса: {str(e)}")
 
+    def import_questions(self, rows):
+        """Массовая загрузка вопросов через COPY во временную таблицу
+
+        rows - итератор кортежей (topic, question, correct_answer, wrong_answers,
+        question_type, category). Дубликаты (по хэшу темы, вопроса и ответа)
+        пропускаются как внутри файла, так и относительно уже загруженных.
+        Все выполняется в одной транзакции; возвращается число добавленных вопросов.
+        """
+        try:
+            with self._cursor() as cursor:
+                cursor.execute("""
+                    CREATE TEMP TABLE question_staging (
+                        topic TEXT,
+                        question TEXT,
+                        correct_answer TEXT,
+                        wrong_answers TEXT,
+                        question_type TEXT,
+                        category TEXT
+                    ) ON COMMIT DROP
+                """)
+                cursor.copy_expert("COPY question_staging FROM STDIN", CopyRowStream(rows), size=65536)
+                cursor.execute("""
+                    INSERT INTO questions (topic, question, correct_answer, wrong_answers, question_type, category)
+                    SELECT topic, question, correct_answer, wrong_answers::text[], question_type, category
+                    FROM question_staging
+                    ON CONFLICT (content_hash) DO NOTHING
+                """)
+                return cursor.rowcount
+        except DB_ERRORS as e:
+            raise Exception(f"Ошибка при импорте вопросов: {str(e)}")
+
+    def get_categories(self):
+        """Получение списка категорий"""
+        try:
+            with self._cursor() as cursor:
+                cursor.execute("SELECT name FROM categories ORDER BY id")
+                return [row[0] for row in cursor.fetchall()]
+        except DB_ERRORS as e:
+            raise Exception(f"Ошибка при получении категорий: {str(e)}")
+
     def get_all_topics(self):
         """Получение всех тем"""
         try:
-            self.cursor.execute("SELECT DISTINCT topic FROM questions")
-            return [row[0] for row in self.cursor.fetchall()]
-        except psycopg2.Error as e:
+            with self._cursor() as cursor:
+                cursor.execute("SELECT DISTINCT topic FROM questions")
+                return [row[0] for row in cursor.fetchall()]
+        except DB_ERRORS as e:
             raise Exception(f"Ошибка при получении тем: {str(e)}")
 
     def get_topics_by_category(self, category):
         """Получение тем по категории"""
         try:
-            self.cursor.execute("SELECT DISTINCT topic FROM questions WHERE category=%s", (category,))
-            return [row[0] for row in self.cursor.fetchall()]
-        except psycopg2.Error as e:
+            with self._cursor() as cursor:
+                cursor.execute("SELECT DISTINCT topic FROM questions WHERE category=%s", (category,))
+                return [row[0] for row in cursor.fetchall()]
+        except DB_ERRORS as e:
             raise Exception(f"Ошибка при получении тем по категории: {str(e)}")
 
     def get_questions_by_topic(self, topic):
         """Получение вопросов по теме"""
         try:
-            self.cursor.execute("SELECT * FROM questions WHERE topic=%s", (topic,))
-            return self.cursor.fetchall()
-        except psycopg2.Error as e:
+            with self._cursor() as cursor:
+                self._execute_prepared(cursor, "get_questions_by_topic", (topic,))
+                return cursor.fetchall()
+        except DB_ERRORS as e:
             raise Exception(f"Ошибка при получении вопросов: {str(e)}")
 
-    def save_test_result(self, user_login, topic, category, correct):
+    def sample_questions(self, topic, k, exclude_correct_for=None, exclude_ids=()):
+        """Случайная выборка k вопросов по теме на стороне PostgreSQL
+
+        Вместо сортировки всей темы по random() берутся случайные точки
+        в диапазоне id, и для каждой индекс (topic, id) находит ближайший
+        вопрос. Если передан exclude_correct_for, пропускаются вопросы,
+        на которые этот пользователь уже ответил верно; вопросы с id из
+        exclude_ids не выбираются. Если точек не хватило (маленькая тема
+        или большие пропуски id), недостающие вопросы добираются из оставшихся.
+        """
+        params = {"topic": topic, "k": k, "probes": k * 4, "login": exclude_correct_for,
+                  "exclude_ids": list(exclude_ids)}
+        exclude = ""
+        if exclude_correct_for:
+            exclude = """AND NOT EXISTS (
+                SELECT 1 FROM test_results r
+                WHERE r.user_login = %(login)s AND r.question_id = q.id AND r.correct
+            )"""
+        if exclude_ids:
+            exclude += " AND q.id <> ALL(%(exclude_ids)s)"
+        try:
+            with self._cursor() as cursor:
+                cursor.execute(f"""
+                    WITH bounds AS (
+                        SELECT MIN(id) AS lo, MAX(id) AS hi FROM questions WHERE topic = %(topic)s
+                    ), probes AS (
+                        SELECT lo + floor(random() * (hi - lo + 1))::int AS pid
+                        FROM bounds, generate_series(1, %(probes)s)
+                        WHERE lo IS NOT NULL
+                    ), picked AS (
+                        SELECT DISTINCT ON (q.id) q.*
+                        FROM probes p
+                        CROSS JOIN LATERAL (
+                            SELECT * FROM questions q
+                            WHERE q.topic = %(topic)s AND q.id >= p.pid {exclude}
+                            ORDER BY q.id
+                            LIMIT 1
+                        ) q
+                    )
+                    SELECT * FROM picked ORDER BY random() LIMIT %(k)s
+                """, params)
+                questions = cursor.fetchall()
+                if len(questions) < k:
+                    params["k"] = k - len(questions)
+                    params["picked"] = [q[0] for q in questions] or [-1]
+                    cursor.execute(f"""
+                        SELECT * FROM questions q
+                        WHERE q.topic = %(topic)s AND q.id <> ALL(%(picked)s) {exclude}
+                        ORDER BY random()
+                        LIMIT %(k)s
+                    """, params)
+                    questions.extend(cursor.fetchall())
+                return questions
+        except DB_ERRORS as e:
+            raise Exception(f"Ошибка при выборке вопросов: {str(e)}")
+
+    def sample_mixed_questions(self, category, per_topic=2, total=5):
+        """Смешанная выборка вопросов по всем темам категории одним запросом
+
+        Темы категории перечисляются прыжками по индексу (category, topic, id),
+        в каждой теме берутся случайные вопросы так же, как в sample_questions,
+        затем оконная функция по случайному ключу оставляет не больше
+        per_topic вопросов на тему, а из них - total вопросов всего.
+        """
+        params = {"category": category, "per_topic": per_topic, "probes": per_topic * 3, "total": total}
+        try:
+            with self._cursor() as cursor:
+                cursor.execute("""
+                    WITH RECURSIVE topics AS (
+                        (SELECT topic FROM questions WHERE category = %(category)s ORDER BY topic LIMIT 1)
+                        UNION ALL
+                        SELECT (SELECT q.topic FROM questions q
+                                WHERE q.category = %(category)s AND q.topic > t.topic
+                                ORDER BY q.topic LIMIT 1)
+                        FROM topics t
+                        WHERE t.topic IS NOT NULL
+                    ), bounds AS (
+                        SELECT t.topic,
+                               (SELECT MIN(id) FROM questions q WHERE q.category = %(category)s AND q.topic = t.topic) AS lo,
+                               (SELECT MAX(id) FROM questions q WHERE q.category = %(category)s AND q.topic = t.topic) AS hi
+                        FROM topics t
+                        WHERE t.topic IS NOT NULL
+                    ), probes AS (
+                        SELECT b.topic, b.lo + floor(random() * (b.hi - b.lo + 1))::int AS pid
+                        FROM bounds b, generate_series(1, %(probes)s)
+                    ), candidates AS (
+                        SELECT DISTINCT ON (q.id) q.*
+                        FROM probes p
+                        CROSS JOIN LATERAL (
+                            SELECT * FROM questions q
+                            WHERE q.category = %(category)s AND q.topic = p.topic AND q.id >= p.pid
+                            ORDER BY q.id
+                            LIMIT 1
+                        ) q
+                    ), ranked AS (
+                        SELECT c.*, row_number() OVER (PARTITION BY c.topic ORDER BY random()) AS rn
+                        FROM candidates c
+                    )
+                    SELECT id, topic, question, correct_answer, wrong_answers, question_type, category
+                    FROM ranked
+                    WHERE rn <= %(per_topic)s
+                    ORDER BY random()
+                    LIMIT %(total)s
+                """, params)
+                return cursor.fetchall()
+        except DB_ERRORS as e:
+            raise Exception(f"Ошибка при выборке смешанного теста: {str(e)}")
+
+    def save_test_result(self, user_login, topic, category, correct, question_id=None):
         """Сохранение результата теста"""
         try:
-            self.cursor.execute("INSERT INTO test_results (user_login, topic, category, correct, timestamp) VALUES (%s, %s, %s, %s, %s)", 
-                               (user_login, topic, category, correct, datetime.now()))
-            self.conn.commit()
-        except psycopg2.Error as e:
-            self.conn.rollback()
+            with self._cursor() as cursor:
+                self._execute_prepared(cursor, "save_test_result",
+                                       (user_login, topic, category, correct, datetime.now(), question_id))
+                self._update_topic_stats(cursor, [(user_login, topic, category, correct)])
+        except DB_ERRORS as e:
             raise Exception(f"Ошибка при сохранении результата теста: {str(e)}")
 
-    def get_user_results(self, user_login):
-        """Получение результатов пользователя"""
+    def save_test_results(self, results):
+        """Сохранение пачки результатов теста одним запросом
+
+        results - список кортежей (user_login, topic, category, correct, timestamp,
+        question_id, client_id). Ответы с уже записанным client_id (повторная
+        отправка из журнала ResultWriter) пропускаются и не учитываются в
+        статистике. Возвращает число записанных ответов.
+        """
+        if not results:
+            return 0
+        try:
+            with self._cursor() as cursor:
+                inserted = execute_values(cursor, """
+                    INSERT INTO test_results (user_login, topic, category, correct, timestamp, question_id, client_id)
+                    VALUES %s
+                    ON CONFLICT (client_id, timestamp) DO NOTHING
+                    RETURNING user_login, topic, category, correct
+                """, results, page_size=1000, fetch=True)
+                if inserted:
+                    self._update_topic_stats(cursor, inserted)
+                return len(inserted)
+        except DB_ERRORS as e:
+            raise Exception(f"Ошибка при сохранении результатов теста: {str(e)}")
+
+    def _update_topic_stats(self, cursor, results):
+        """Инкрементальное обновление сводной статистики в текущей транзакции
+
+        results - строки, начинающиеся с (user_login, topic, category, correct).
+        """
+        totals = {}
+        for row in results:
+            key = (row[0], row[1])
+            attempts, correct_count = totals.get(key, (0, 0))
+            totals[key] = (attempts + 1, correct_count + (1 if row[3] else 0))
+        execute_values(cursor, """
+            INSERT INTO user_topic_stats (user_login, topic, attempts, correct_count) VALUES %s
+            ON CONFLICT (user_login, topic) DO UPDATE SET
+                attempts = user_topic_stats.attempts + EXCLUDED.attempts,
+                correct_count = user_topic_stats.correct_count + EXCLUDED.correct_count
+        """, [(login, topic, attempts, correct_count) for (login, topic), (attempts, correct_count) in totals.items()])
+
+    def _rebuild_topic_stats(self, cursor):
+        """Пересчет сводной статистики по всей истории test_results"""
+        cursor.execute("DELETE FROM user_topic_stats")
+        cursor.execute("""
+            INSERT INTO user_topic_stats (user_login, topic, attempts, correct_count)
+            SELECT user_login, topic, COUNT(*), COUNT(*) FILTER (WHERE correct)
+            FROM test_results
+            GROUP BY user_login, topic
+        """)
+
+    def _create_partition(self, cursor, month):
+        """Создание секции test_results за месяц; возвращает имя или None, если она уже есть
+
+        Строки этого месяца, попавшие в секцию по умолчанию, переносятся в новую.
+        """
+        month = month_start(month)
+        name = f"test_results_{month:%Y_%m}"
+        cursor.execute("SELECT to_regclass(%s)", (name,))
+        if cursor.fetchone()[0] is not None:
+            return None
+        table = sql.Identifier(name)
+        cursor.execute(sql.SQL("CREATE TABLE {} (LIKE test_results INCLUDING DEFAULTS)").format(table))
+        cursor.execute(sql.SQL("""
+            WITH moved AS (
+                DELETE FROM test_results_default WHERE timestamp >= %s AND timestamp < %s RETURNING *
+            )
+            INSERT INTO {} SELECT * FROM moved
+        """).format(table), (month, next_month(month)))
+        cursor.execute(sql.SQL("ALTER TABLE test_results ATTACH PARTITION {} FOR VALUES FROM (%s) TO (%s)")
+                       .format(table), (month, next_month(month)))
+        return name
+
+    def rebuild_topic_stats(self):
+        """Пересчет сводной статистики по темам"""
+        try:
+            with self._cursor() as cursor:
+                cursor.execute("LOCK TABLE test_results IN SHARE MODE")
+                self._rebuild_topic_stats(cursor)
+                cursor.execute("SELECT COUNT(*) FROM user_topic_stats")
+                return cursor.fetchone()[0]
+        except DB_ERRORS as e:
+            raise Exception(f"Ошибка при пересчете статистики: {str(e)}")
+
+    def get_topic_summary(self, user_login, since=None):
+        """Успешность пользователя по темам: (тема, попыток, верных, процент верных)
+
+        За всю историю читается сводная таблица user_topic_stats; с since
+        результаты агрегируются в базе по индексу (user_login, timestamp)
+        только в секциях за нужные месяцы.
+        """
+        try:
+            with self._cursor() as cursor:
+                if since is None:
+                    cursor.execute("""
+                        SELECT topic, attempts, correct_count,
+                               COALESCE(100.0 * correct_count / NULLIF(attempts, 0), 0)::float
+                        FROM user_topic_stats
+                        WHERE user_login=%s
+                        ORDER BY topic
+                    """, (user_login,))
+                else:
+                    cursor.execute("""
+                        SELECT topic, COUNT(*), SUM(CASE WHEN correct THEN 1 ELSE 0 END),
+                               (100.0 * SUM(CASE WHEN correct THEN 1 ELSE 0 END) / COUNT(*))::float
+                        FROM test_results
+                        WHERE user_login=%s AND timestamp >= %s
+                        GROUP BY topic
+                        ORDER BY topic
+                    """, (user_login, since))
+                return cursor.fetchall()
+        except DB_ERRORS as e:
+            raise Exception(f"Ошибка при получении статистики по темам: {str(e)}")
+
+    def get_cohort_stats(self, role="Студент"):
+        """Сводка по темам для всех пользователей роли: (логин, тема, попыток, верных)"""
+        try:
+            with self._cursor() as cursor:
+                cursor.execute("""
+                    SELECT s.user_login, s.topic, s.attempts, s.correct_count
+                    FROM user_topic_stats s
+                    JOIN users u ON u.login = s.user_login
+                    WHERE u.role=%s AND s.attempts > 0
+                """, (role,))
+                return cursor.fetchall()
+        except DB_ERRORS as e:
+            raise Exception(f"Ошибка при получении статистики группы: {str(e)}")
+
+    def get_most_missed_questions(self, limit=20, since=None, role="Студент"):
+        """Вопросы с наибольшим числом ошибок: (id, тема, вопрос, ответов, ошибок)"""
+        try:
+            with self._cursor() as cursor:
+                cursor.execute("""
+                    SELECT q.id, q.topic, q.question, COUNT(*) AS answers,
+                           SUM(CASE WHEN r.correct THEN 0 ELSE 1 END) AS misses
+                    FROM test_results r
+                    JOIN users u ON u.login = r.user_login
+                    JOIN questions q ON q.id = r.question_id
+                    WHERE u.role=%s AND r.timestamp >= COALESCE(%s::timestamp, '-infinity')
+                    GROUP BY q.id, q.topic, q.question
+                    ORDER BY misses DESC, answers DESC
+                    LIMIT %s
+                """, (role, since, limit))
+                return cursor.fetchall()
+        except DB_ERRORS as e:
+            raise Exception(f"Ошибка при получении трудных вопросов: {str(e)}")
+
+    def get_result_trend(self, user_login, bucket="week", since=None, topic=None):
+        """Динамика результатов по периодам: (начало периода, попыток, верных, процент верных)
+
+        bucket - "day", "week" или "month"; группировка выполняется в базе.
+        """
+        if bucket not in TREND_BUCKETS:
+            raise ValueError(f"Неизвестный период: {bucket}")
+        try:
+            with self._cursor() as cursor:
+                cursor.execute("""
+                    SELECT date_trunc(%s, timestamp)::date AS period, COUNT(*),
+                           SUM(CASE WHEN correct THEN 1 ELSE 0 END),
+                           (100.0 * SUM(CASE WHEN correct THEN 1 ELSE 0 END) / COUNT(*))::float
+                    FROM test_results
+                    WHERE user_login=%s AND timestamp >= COALESCE(%s::timestamp, '-infinity')
+                      AND (%s::text IS NULL OR topic = %s)
+                    GROUP BY period
+                    ORDER BY period
+                """, (bucket, user_login, since, topic, topic))
+                return cursor.fetchall()
+        except DB_ERRORS as e:
+            raise Exception(f"Ошибка при получении динамики результатов: {str(e)}")
+
+    def get_user_results(self, user_login, since=None):
+        """Получение результатов пользователя
+
+        since ограничивает выборку недавними результатами, и тогда читаются
+        только секции test_results за нужные месяцы.
+        """
+        try:
+            with self._cursor() as cursor:
+                self._execute_prepared(cursor, "get_user_results", (user_login, since))
+                return cursor.fetchall()
+        except DB_ERRORS as e:
+            raise Exception(f"Ошибка при получении результатов пользователя: {str(e)}")
+
+    def get_user_results_page(self, user_login, after=None, page_size=100, since=None):
+        """Страница результатов пользователя (новые сначала)
+
+        after - ключ (timestamp, id) последней строки предыдущей страницы,
+        since - необязательная нижняя граница времени.
+        """
         try:
-            self.cursor.execute("SELECT * FROM test_results WHERE user_login=%s ORDER BY timestamp DESC", (user_login,))
-            return self.cursor.fetchall()
-        except psycopg2.Error as e:
+            with self._cursor() as cursor:
+                if after is None:
+                    cursor.execute("SELECT * FROM test_results WHERE user_login=%s "
+                                  "AND timestamp >= COALESCE(%s::timestamp, '-infinity') "
+                                  "ORDER BY timestamp DESC, id DESC LIMIT %s", (user_login, since, page_size))
+                else:
+                    cursor.execute("SELECT * FROM test_results WHERE user_login=%s AND (timestamp, id) < (%s, %s) "
+                                  "AND timestamp >= COALESCE(%s::timestamp, '-infinity') "
+                                  "ORDER BY timestamp DESC, id DESC LIMIT %s",
+                                  (user_login, after[0], after[1], since, page_size))
+                return cursor.fetchall()
+        except DB_ERRORS as e:
             raise Exception(f"Ошибка при получении результатов пользователя: {str(e)}")
 
+    def iter_user_results(self, user_login, batch_size=500, since=None):
+        """Потоковое чтение результатов пользователя через серверный курсор"""
+        return self._iter_query("SELECT * FROM test_results WHERE user_login=%s "
+                                "AND timestamp >= COALESCE(%s::timestamp, '-infinity') ORDER BY timestamp DESC, id DESC",
+                                (user_login, since), batch_size, "Ошибка при чтении результатов пользователя")
+
     def get_weak_topics(self, user_login):
         """Получение слабых тем"""
         try:
-            self.cursor.execute("""
-                SELECT topic, AVG(correct::int) as success_rate
-                FROM test_results
-                WHERE user_login=%s
-                GROUP BY topic
-                HAVING AVG(correct::int) < 0.7
-            """, (user_login,))
-            return [row[0] for row in self.cursor.fetchall()]
-        except psycopg2.Error as e:
+            with self._cursor() as cursor:
+                self._execute_prepared(cursor, "get_weak_topics", (user_login,))
+                return [row[0] for row in cursor.fetchall()]
+        except DB_ERRORS as e:
             raise Exception(f"Ошибка при получении слабых тем: {str(e)}")
 
     def update_progress(self, user_login, topic, progress):
         """Обновление прогресса"""
         try:
-            self.cursor.execute("INSERT INTO user_progress (user_login, topic, progress) VALUES (%s, %s, %s) "
-                               "ON CONFLICT (user_login, topic) DO UPDATE SET progress=%s", 
-                               (user_login, topic, progress, progress))
-            self.conn.commit()
-        except psycopg2.Error as e:
-            self.conn.rollback()
+            with self._cursor() as cursor:
+                cursor.execute("INSERT INTO user_progress (user_login, topic, progress) VALUES (%s, %s, %s) "
+                                   "ON CONFLICT (user_login, topic) DO UPDATE SET progress=%s", 
+                              (user_login, topic, progress, progress))
+        except DB_ERRORS as e:
             raise Exception(f"Ошибка при обновлении прогресса: {str(e)}")
 
     def get_progress(self, user_login):
         """Получение прогресса"""
         try:
-            self.cursor.execute("SELECT topic, progress FROM user_progress WHERE user_login=%s", (user_login,))
-            return self.cursor.fetchall()
-        except psycopg2.Error as e:
+            with self._cursor() as cursor:
+                cursor.execute("SELECT topic, progress FROM user_progress WHERE user_login=%s", (user_login,))
+                return cursor.fetchall()
+        except DB_ERRORS as e:
             raise Exception(f"Ошибка при получении прогресса: {str(e)}")
 
-    def __del__(self):
-        """Закрытие соединения"""
+    def save_logs(self, entries):
+        """Запись пачки событий лога одним запросом
+
+        entries - список кортежей (user_login, action, timestamp, host)
+        """
+        if not entries:
+            return
+        try:
+            with self._cursor() as cursor:
+                execute_values(cursor, "INSERT INTO logs (user_login, action, timestamp, host) VALUES %s",
+                               entries, page_size=1000)
+        except DB_ERRORS as e:
+            raise Exception(f"Ошибка при записи логов: {str(e)}")
+
+    def search_logs(self, user_login=None, text=None, since=None, until=None, after=None, page_size=100):
+        """Страница событий лога со всех машин (новые сначала): (id, timestamp, user_login, host, action)
+
+        Фильтры по пользователю и интервалу [since, until) идут по индексам
+        (user_login, timestamp) и (timestamp); text - подстрока действия без
+        учета регистра. after - ключ (timestamp, id) последней строки
+        предыдущей страницы.
+        """
+        conditions, params = [], []
+        if user_login:
+            conditions.append("user_login = %s")
+            params.append(user_login)
+        if since:
+            conditions.append("timestamp >= %s")
+            params.append(since)
+        if until:
+            conditions.append("timestamp < %s")
+            params.append(until)
+        if text:
+            conditions.append("action ILIKE %s ESCAPE '\\'")
+            params.append("%" + re.sub(r"([\\%_])", r"\\\1", text) + "%")
+        if after is not None:
+            conditions.append("(timestamp, id) < (%s, %s)")
+            params.extend(after)
+        where = "WHERE " + " AND ".join(conditions) if conditions else ""
+        try:
+            with self._cursor() as cursor:
+                cursor.execute(f"SELECT id, timestamp, user_login, host, action FROM logs {where} "
+                              "ORDER BY timestamp DESC, id DESC LIMIT %s", params + [page_size])
+                return cursor.fetchall()
+        except DB_ERRORS as e:
+            raise Exception(f"Ошибка при поиске в логах: {str(e)}")
+
+    def ensure_partitions(self, months_ahead=PARTITION_MONTHS_AHEAD):
+        """Создание секций test_results на текущий и следующие месяцы
+
+        Если все секции уже есть, выполняется один запрос. Возвращает имена созданных секций.
+        """
+        months = [month_start(datetime.now())]
+        for _ in range(months_ahead):
+            months.append(next_month(months[-1]))
+        try:
+            with self._cursor() as cursor:
+                cursor.execute("SELECT relname FROM pg_class WHERE relname = ANY(%s)",
+                              ([f"test_results_{month:%Y_%m}" for month in months],))
+                if len(cursor.fetchall()) == len(months):
+                    return []
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_ID,))
+                created = [self._create_partition(cursor, month) for month in months]
+                return [name for name in created if name]
+        except DB_ERRORS as e:
+            raise Exception(f"Ошибка при создании секций результатов: {str(e)}")
+
+    def list_partitions(self):
+        """Секции test_results: (имя, границы, примерное число строк)"""
         try:
-            if self.cursor:
-                self.cursor.close()
-            if self.conn:
+            with self._cursor() as cursor:
+                cursor.execute("""
+                    SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint
+                    FROM pg_inherits i
+                    JOIN pg_class c ON c.oid = i.inhrelid
+                    WHERE i.inhparent = 'test_results'::regclass
+                    ORDER BY c.relname
+                """)
+                return cursor.fetchall()
+        except DB_ERRORS as e:
+            raise Exception(f"Ошибка при получении списка секций: {str(e)}")
+
+    def archive_partitions(self, before, archive_dir="archive", drop=True):
+        """Выгрузка месячных секций старше before в сжатые CSV и отключение их от test_results
+
+        Каждая секция обрабатывается в своей транзакции: файл сначала
+        полностью записывается, затем секция отключается и (при drop)
+        удаляется. Сводная статистика user_topic_stats сохраняется, но
+        rebuild_topic_stats после архивации учтет только оставшиеся данные.
+        Возвращает список (имя секции, файл, строк).
+        """
+        before = month_start(before)
+        if not os.path.exists(archive_dir):
+            os.makedirs(archive_dir)
+        archived = []
+        try:
+            for name, _, _ in self.list_partitions():
+                match = PARTITION_NAME.match(name)
+                if not match or date(int(match.group(1)), int(match.group(2)), 1) >= before:
+                    continue
+                file_path = os.path.join(archive_dir, f"{name}.csv.gz")
+                table = sql.Identifier(name)
+                with self._cursor() as cursor:
+                    cursor.execute(sql.SQL("LOCK TABLE {} IN SHARE MODE").format(table))
+                    with gzip.open(file_path + ".tmp", "wb") as f:
+                        cursor.copy_expert(sql.SQL("COPY {} TO STDOUT WITH (FORMAT csv, HEADER)")
+                                           .format(table).as_string(cursor), f)
+                        rows = cursor.rowcount
+                    os.replace(file_path + ".tmp", file_path)
+                    cursor.execute(sql.SQL("ALTER TABLE test_results DETACH PARTITION {}").format(table))
+                    if drop:
+                        cursor.execute(sql.SQL("DROP TABLE {}").format(table))
+                archived.append((name, file_path, rows))
+                print(f"Секция {name} выгружена в {file_path}, строк: {rows}")
+            return archived
+        except DB_ERRORS as e:
+            raise Exception(f"Ошибка при архивации результатов: {str(e)}")
+
+    def close(self):
+        """Закрытие соединения или всех соединений пула"""
+        try:
+            if self.pool and not self.pool.closed:
+                self.pool.closeall()
+                print("Пул соединений с базой данных закрыт")
+            if self.conn and not self.conn.closed:
                 self.conn.close()
                 print("Соединение с базой данных закрыто")
-        except psycopg2.Error as e:
+        except DB_ERRORS as e:
             print(f"Ошибка при закрытии соединения: {str(e)}")
+
+    def __del__(self):
+        """Закрытие соединения"""
+        self.close()
+
+
+def _track_method(name, func):
+    """Обертка, запоминающая имя метода для статистики запросов"""
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        previous = getattr(self._local, "method", None)
+        self._local.method = name
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            self._local.method = previous
+    return wrapper
+
+for _name, _func in list(vars(Database).items()):
+    if not _name.startswith("_") and callable(_func):
+        setattr(Database, _name, _track_method(_name, _func))
+
+
+def create_database(backend="postgresql", **kwargs):
+    """Хранилище по названию: "postgresql" (Database) или "sqlite" (SQLiteDatabase)"""
+    if backend == "sqlite":
+        from sqlite_database import SQLiteDatabase
+        return SQLiteDatabase(**kwargs)
+    if backend != "postgresql":
+        raise ValueError(f"Неизвестное хранилище: {backend}")
+    return Database(**kwargs)
+
+
+if __name__ == "__main__":
+    import sys
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == "migrate":
+        db = Database()
+        print(f"Версия схемы: {db.migrate()}")
+        db.close()
+    elif command == "rebuild-stats":
+        db = Database()
+        print(f"Статистика пересчитана, строк: {db.rebuild_topic_stats()}")
+        db.close()
+    elif command == "partitions":
+        db = Database()
+        for name in db.ensure_partitions():
+            print(f"Создана секция {name}")
+        for name, bounds, rows in db.list_partitions():
+            print(f"{name}: {bounds}, ~{rows} строк")
+        db.close()
+    elif command == "archive" and len(sys.argv) > 2:
+        db = Database()
+        before = datetime.strptime(sys.argv[2], "%Y-%m")
+        archived = db.archive_partitions(before, drop="--keep" not in sys.argv[3:])
+        print(f"Архивировано секций: {len(archived)}")
+        db.close()
+    else:
+        print("Использование: python database.py migrate | rebuild-stats | partitions | archive ГГГГ-ММ [--keep]")
@@ -0,0 +1,120 @@
+import itertools
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class DatabaseTask:
+    def __init__(self, task_id, key, generation, on_success, on_error):
+        """Фоновая задача обращения к базе"""
+        self.id = task_id
+        self.key = key
+        self.generation = generation
+        self.on_success = on_success
+        self.on_error = on_error
+        self.cancelled = False
+        self.future = None
+
+class DatabaseWorker:
+    def __init__(self, root, max_workers=4, max_pending=16, poll_interval=30):
+        """Выполнение запросов к базе вне главного цикла Tk
+
+        Функции выполняются в пуле потоков, а результаты передаются обратно
+        через очередь, которую главный цикл опрашивает с помощью root.after,
+        поэтому колбэки всегда вызываются в потоке Tk.
+        """
+        self.root = root
+        self.max_pending = max_pending
+        self.poll_interval = poll_interval
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db")
+        self.results = queue.Queue()
+        self.pending = {}
+        self.generation = 0
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self.closed = False
+        self.root.after(self.poll_interval, self._poll)
+
+    def submit(self, func, *args, on_success=None, on_error=None, key=None):
+        """Запуск func(*args) в фоне
+
+        Задача с тем же key, еще не завершившаяся, отменяется: повторные
+        нажатия не копят одинаковые запросы. Если в очереди уже max_pending
+        задач, новая отклоняется вызовом on_error.
+        """
+        with self.lock:
+            if key is not None:
+                for task in list(self.pending.values()):
+                    if task.key == key:
+                        self._cancel(task)
+            if self.closed or len(self.pending) >= self.max_pending:
+                task = None
+            else:
+                task = DatabaseTask(next(self.ids), key, self.generation, on_success, on_error)
+                self.pending[task.id] = task
+                task.future = self.executor.submit(self._run, task, func, args)
+        if task is None and on_error:
+            on_error(Exception("Слишком много запросов к базе данных, повторите позже"))
+        return task
+
+    def _run(self, task, func, args):
+        """Выполнение задачи в рабочем потоке"""
+        if task.cancelled:
+            self.results.put((task, None, None))
+            return
+        try:
+            self.results.put((task, func(*args), None))
+        except Exception as e:
+            self.results.put((task, None, e))
+
+    def _poll(self):
+        """Доставка результатов в потоке Tk"""
+        while True:
+            try:
+                task, result, error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            with self.lock:
+                self.pending.pop(task.id, None)
+                stale = task.cancelled or task.generation != self.generation
+            if stale:
+                continue
+            try:
+                if error is not None:
+                    if task.on_error:
+                        task.on_error(error)
+                elif task.on_success:
+                    task.on_success(result)
+            except Exception as e:
+                print(f"Ошибка обработки результата запроса: {str(e)}")
+        if not self.closed:
+            self.root.after(self.poll_interval, self._poll)
+
+    def _cancel(self, task):
+        """Отмена задачи (вызывается под блокировкой)"""
+        task.cancelled = True
+        if task.future is not None and task.future.cancel():
+            # Задача не успела начаться и в очередь результатов не попадет
+            self.pending.pop(task.id, None)
+
+    def cancel(self, task):
+        """Отмена одной задачи"""
+        with self.lock:
+            self._cancel(task)
+
+    def cancel_all(self):
+        """Отмена всех задач текущего экрана (при переходе на другой экран)"""
+        with self.lock:
+            self.generation += 1
+            for task in list(self.pending.values()):
+                self._cancel(task)
+
+    def pending_count(self):
+        """Количество незавершенных задач"""
+        with self.lock:
+            return len(self.pending)
+
+    def shutdown(self):
+        """Остановка пула потоков"""
+        self.cancel_all()
+        self.closed = True
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -1,5 +1,6 @@
+import os
 import tkinter as tk
-from tkinter import ttk
+from tkinter import messagebox, ttk
 
 class MainGUI:
     def __init__(self, app):
@@ -10,5 +11,206 @@ class MainGUI:
     
     def clear_frame(self):
         """Очистка главного фрейма"""
+        # Результаты запросов предыдущего экрана больше не нужны
+        self.app.db_worker.cancel_all()
         for widget in self.main_frame.winfo_children():
-            widget.destroy()
\ No newline at end of file
+            widget.destroy()
+
+class LazyTreeview:
+    def __init__(self, parent, columns, headings, fetch_page, row_values, row_key, page_size=100, height=10,
+                 worker=None, logger=None):
+        """Таблица, подгружающая строки страницами по мере прокрутки
+
+        fetch_page(after, page_size) возвращает следующую страницу строк,
+        row_key(row) - ключ, после которого начинается следующая страница,
+        row_values(row) - значения колонок для отображения.
+        Если передан worker (DatabaseWorker), страницы загружаются в фоне;
+        ошибки загрузки показываются пользователю и пишутся в logger.
+        """
+        self.worker = worker
+        self.logger = logger
+        self.fetch_page = fetch_page
+        self.row_values = row_values
+        self.row_key = row_key
+        self.page_size = page_size
+        self.after = None
+        self.exhausted = False
+        self.loading = False
+        self.rows = {}
+        self.generation = 0
+
+        self.frame = tk.Frame(parent)
+        self.tree = ttk.Treeview(self.frame, columns=columns, show="headings", height=height)
+        for column, heading in zip(columns, headings):
+            self.tree.heading(column, text=heading)
+        self.scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self.on_scroll)
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+        self.load_more()
+
+    def pack(self, **kwargs):
+        """Размещение таблицы"""
+        self.frame.pack(**kwargs)
+
+    def on_scroll(self, first, last):
+        """Подгрузка следующей страницы при приближении к концу списка"""
+        self.scrollbar.set(first, last)
+        if float(last) >= 0.9 and not self.exhausted and not self.loading:
+            self.tree.after_idle(self.load_more)
+
+    def load_more(self):
+        """Загрузка следующей страницы"""
+        if self.exhausted or self.loading or not self.tree.winfo_exists():
+            return
+        self.loading = True
+        if self.worker is None:
+            try:
+                rows = self.fetch_page(self.after, self.page_size)
+            finally:
+                self.loading = False
+            self.add_rows(rows)
+        else:
+            generation = self.generation
+            self.worker.submit(self.fetch_page, self.after, self.page_size,
+                               on_success=lambda rows: self.add_rows(rows, generation),
+                               on_error=self.on_load_error)
+
+    def reload(self):
+        """Очистка таблицы и загрузка с первой страницы (например, после смены фильтра)"""
+        self.generation += 1
+        self.tree.delete(*self.tree.get_children())
+        self.rows = {}
+        self.after = None
+        self.exhausted = False
+        self.loading = False
+        self.load_more()
+
+    def on_load_error(self, error):
+        """Ошибка фоновой загрузки страницы"""
+        self.loading = False
+        if self.logger is not None:
+            self.logger.log(f"Ошибка загрузки страницы: {str(error)}")
+        if self.tree.winfo_exists():
+            messagebox.showerror("Ошибка", f"Не удалось загрузить данные: {str(error)}")
+
+    def add_rows(self, rows, generation=None):
+        """Добавление загруженной страницы в таблицу"""
+        if generation is not None and generation != self.generation:
+            # Страница запрошена до reload
+            return
+        self.loading = False
+        if not self.tree.winfo_exists():
+            return
+        for row in rows:
+            iid = self.tree.insert("", "end", values=self.row_values(row))
+            self.rows[iid] = row
+        if rows:
+            self.after = self.row_key(rows[-1])
+        if len(rows) < self.page_size:
+            self.exhausted = True
+
+    def selected_row(self):
+        """Строка, выбранная в таблице"""
+        selection = self.tree.selection()
+        return self.rows.get(selection[0]) if selection else None
+
+class VirtualLogView:
+    def __init__(self, parent, reader, rows=25):
+        """Просмотр лога, в котором в памяти только видимые строки
+
+        reader (LogReader) читает окно из rows записей от текущего смещения;
+        полоса прокрутки соответствует положению смещения в файле, а при
+        фильтре по времени - в найденном по индексу диапазоне.
+        """
+        self.reader = reader
+        self.rows = rows
+        self.match = None
+        self.since = None
+        self.until = None
+        self.start = 0
+        self.end = 0
+        self.top = 0
+
+        self.frame = tk.Frame(parent)
+        columns = ("Time", "User", "Message")
+        self.tree = ttk.Treeview(self.frame, columns=columns, show="headings", height=rows)
+        for column, heading, width in zip(columns, ("Время", "Пользователь", "Сообщение"), (140, 110, 520)):
+            self.tree.heading(column, text=heading)
+            self.tree.column(column, width=width, stretch=column == "Message")
+        self.scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=self.on_scrollbar)
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.bind("<MouseWheel>", lambda event: self.scroll(-1 if event.delta > 0 else 1) or "break")
+        self.tree.bind("<Button-4>", lambda event: self.scroll(-3) or "break")
+        self.tree.bind("<Button-5>", lambda event: self.scroll(3) or "break")
+
+    def pack(self, **kwargs):
+        """Размещение просмотра"""
+        self.frame.pack(**kwargs)
+
+    def set_filter(self, user=None, text=None, since=None, until=None):
+        """Фильтр по пользователю, тексту и интервалу времени; показывает конец выборки"""
+        self.match = self.reader.matcher(user, text) if user or text else None
+        self.since, self.until = since, until
+        self.show_end()
+
+    def _update_range(self):
+        """Диапазон смещений выборки (по индексу времени), лог мог дорасти"""
+        if not os.path.exists(self.reader.log_file):
+            self.start = self.end = 0
+            return
+        self.start = self.reader.offset_for_time(self.since) if self.since else 0
+        self.end = self.reader.offset_for_time(self.until) if self.until else self.reader.size()
+
+    def show_end(self):
+        """Переход к последним записям выборки"""
+        self._update_range()
+        if self.end > self.start:
+            self.top = self.reader.read_backward(self.end, self.rows, self.match, self.start)[1]
+        else:
+            self.top = self.start
+        self.render()
+
+    def show_from(self, offset):
+        """Отображение окна записей начиная со смещения offset"""
+        self.top = min(max(offset, self.start), self.end)
+        self.render()
+
+    def render(self):
+        """Чтение и отображение видимого окна"""
+        self.tree.delete(*self.tree.get_children())
+        if self.end <= self.start:
+            self.scrollbar.set(0, 1)
+            return
+        entries, next_offset = self.reader.read_forward(self.top, self.rows, self.match, self.end)
+        if len(entries) < self.rows and self.top > self.start:
+            # Внизу выборки окно добирается записями выше
+            before, self.top = self.reader.read_backward(self.top, self.rows - len(entries), self.match,
+                                                         self.start)
+            entries = before + entries
+        for _, timestamp, user, message in entries:
+            self.tree.insert("", "end", values=(timestamp or "", user or "", message))
+        span = self.end - self.start
+        first = (entries[0][0] if entries else self.top) - self.start
+        self.scrollbar.set(first / span, (next_offset - self.start) / span)
+
+    def scroll(self, lines):
+        """Прокрутка на lines записей вверх (<0) или вниз (>0)"""
+        if lines > 0:
+            entries, _ = self.reader.read_forward(self.top, lines + 1, self.match, self.end)
+            if len(entries) > lines:
+                self.top = entries[lines][0]
+            elif entries:
+                self.top = entries[-1][0]
+        elif lines < 0 and self.top > self.start:
+            self.top = self.reader.read_backward(self.top, -lines, self.match, self.start)[1]
+        self.render()
+
+    def on_scrollbar(self, action, value, unit=None):
+        """Команды полосы прокрутки: moveto - доля диапазона, scroll - строки или страницы"""
+        if action == "moveto":
+            offset = self.start + int(max(0.0, min(float(value), 1.0)) * (self.end - self.start))
+            self.show_from(self.reader.align(offset) if offset > self.start else self.start)
+        elif action == "scroll":
+            self.scroll(int(value) * (self.rows if unit == "pages" else 1))
@@ -0,0 +1,204 @@
+import bisect
+import os
+import re
+
+# "[2024-01-31 12:00:00] [login] сообщение"; в старых строках пользователя нет
+LOG_LINE = re.compile(r"^\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\] (?:\[([^\]]*)\] )?(.*)$")
+
+class LogReader:
+    def __init__(self, log_file="logs/app.log", index_step=64 * 1024, block_size=64 * 1024,
+                 max_scan=8 * 1024 * 1024):
+        """Чтение лога без загрузки всего файла в память
+
+        Строки читаются от произвольного смещения вперед или назад
+        (tail). Рядом с логом хранится разреженный индекс (файл .idx):
+        время первой строки примерно через каждые index_step байт и ее
+        смещение, поэтому начало интервала времени находится без чтения
+        файла целиком. Индекс дополняется по мере роста файла и
+        перестраивается после ротации. max_scan ограничивает объем,
+        просматриваемый за один вызов при поиске строк по фильтру.
+        """
+        self.log_file = log_file
+        self.index_file = log_file + ".idx"
+        self.index_step = index_step
+        self.block_size = block_size
+        self.max_scan = max_scan
+        self.index = []
+        self.index_times = []
+        self.indexed_to = 0
+        self.inode = None
+
+    @staticmethod
+    def parse_line(line):
+        """Разбор строки: (время, пользователь, сообщение)"""
+        match = LOG_LINE.match(line)
+        if not match:
+            return None, None, line
+        user = match.group(2)
+        return match.group(1), None if user in (None, "-") else user, match.group(3)
+
+    @staticmethod
+    def matcher(user=None, text=None, since=None, until=None):
+        """Фильтр записей по пользователю, тексту сообщения и времени ("ГГГГ-ММ-ДД ЧЧ:ММ:СС")"""
+        text = text.lower() if text else None
+
+        def match(entry):
+            _, timestamp, entry_user, message = entry
+            if user and entry_user != user:
+                return False
+            if text and text not in message.lower():
+                return False
+            if since and (timestamp is None or timestamp < since):
+                return False
+            if until and (timestamp is None or timestamp >= until):
+                return False
+            return True
+        return match
+
+    def size(self):
+        """Текущий размер файла лога"""
+        return os.path.getsize(self.log_file) if os.path.exists(self.log_file) else 0
+
+    def align(self, offset):
+        """Начало первой строки, начинающейся не раньше offset"""
+        if offset <= 0:
+            return 0
+        with open(self.log_file, "rb") as f:
+            f.seek(offset - 1)
+            f.readline()
+            return f.tell()
+
+    def _entry(self, offset, raw):
+        """Запись лога: (смещение, время, пользователь, сообщение)"""
+        return (offset,) + self.parse_line(raw.decode("utf-8", errors="replace").rstrip("\r\n"))
+
+    def _load_index(self):
+        """Чтение индекса с диска; при несовпадении с файлом лога индекс сбрасывается"""
+        stat = os.stat(self.log_file)
+        if self.inode == stat.st_ino and self.indexed_to <= stat.st_size:
+            return
+        self.index, self.index_times, self.indexed_to = [], [], 0
+        self.inode = stat.st_ino
+        if not os.path.exists(self.index_file):
+            return
+        with open(self.index_file, "r", encoding="utf-8") as f:
+            header = f.readline().split()
+            if len(header) != 2 or int(header[0]) != stat.st_ino or int(header[1]) > stat.st_size:
+                return
+            for line in f:
+                timestamp, offset = line.rstrip("\n").rsplit(" ", 1)
+                self.index.append((timestamp, int(offset)))
+            self.index_times = [timestamp for timestamp, _ in self.index]
+            self.indexed_to = int(header[1])
+
+    def refresh_index(self):
+        """Дополнение индекса строками, дописанными с прошлого раза"""
+        if not os.path.exists(self.log_file):
+            return []
+        self._load_index()
+        size = os.path.getsize(self.log_file)
+        if size <= self.indexed_to:
+            return self.index
+        next_mark = self.index[-1][1] + self.index_step if self.index else 0
+        offset = self.indexed_to
+        with open(self.log_file, "rb") as f:
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    # Строка еще дописывается
+                    break
+                if offset >= next_mark:
+                    timestamp = self.parse_line(raw.decode("utf-8", errors="replace"))[0]
+                    if timestamp:
+                        self.index.append((timestamp, offset))
+                        self.index_times.append(timestamp)
+                        next_mark = offset + self.index_step
+                offset += len(raw)
+        self.indexed_to = offset
+        with open(self.index_file + ".tmp", "w", encoding="utf-8") as f:
+            f.write(f"{self.inode} {self.indexed_to}\n")
+            f.writelines(f"{timestamp} {position}\n" for timestamp, position in self.index)
+        os.replace(self.index_file + ".tmp", self.index_file)
+        return self.index
+
+    def offset_for_time(self, timestamp):
+        """Смещение первой строки не раньше timestamp ("ГГГГ-ММ-ДД ЧЧ:ММ:СС")"""
+        self.refresh_index()
+        position = bisect.bisect_left(self.index_times, timestamp) - 1
+        offset = self.index[position][1] if position >= 0 else 0
+        with open(self.log_file, "rb") as f:
+            f.seek(offset)
+            for raw in f:
+                line_time = self.parse_line(raw.decode("utf-8", errors="replace"))[0]
+                if line_time and line_time >= timestamp:
+                    return offset
+                offset += len(raw)
+        return offset
+
+    def read_forward(self, offset, count, match=None, end=None):
+        """До count записей начиная со смещения offset; возвращает (записи, смещение после последней)"""
+        entries = []
+        end = self.size() if end is None else end
+        scanned = 0
+        with open(self.log_file, "rb") as f:
+            f.seek(offset)
+            while offset < end and len(entries) < count and scanned < self.max_scan:
+                raw = f.readline()
+                if not raw:
+                    break
+                entry = self._entry(offset, raw)
+                offset += len(raw)
+                scanned += len(raw)
+                if match is None or match(entry):
+                    entries.append(entry)
+        return entries, offset
+
+    def read_backward(self, offset, count, match=None, start=0):
+        """До count записей, закончившихся до смещения offset (в порядке файла)
+
+        Возвращает (записи, смещение первой из них).
+        """
+        entries = []
+        scanned = 0
+        position = offset
+        with open(self.log_file, "rb") as f:
+            tail = None
+            while position > start and len(entries) < count and scanned < self.max_scan:
+                read_size = min(self.block_size, position - start)
+                position -= read_size
+                f.seek(position)
+                scanned += read_size
+                if tail is None:
+                    # После последнего перевода строки - пусто или недописанная строка
+                    lines = f.read(read_size).split(b"\n")[:-1]
+                    if not lines:
+                        # Недописанная строка длиннее блока - перевод строки ищется в предыдущих блоках
+                        continue
+                else:
+                    lines = (f.read(read_size) + tail).split(b"\n")
+                line_start = position
+                if position > start:
+                    # Начало блока может оказаться серединой строки - она дочитается со следующим блоком
+                    tail = lines.pop(0)
+                    line_start += len(tail) + 1
+                starts = []
+                for raw in lines:
+                    starts.append(line_start)
+                    line_start += len(raw) + 1
+                for raw, line_start in zip(reversed(lines), reversed(starts)):
+                    if not raw:
+                        continue
+                    entry = self._entry(line_start, raw)
+                    if match is None or match(entry):
+                        entries.append(entry)
+                        if len(entries) >= count:
+                            break
+        first = entries[-1][0] if entries else position
+        entries.reverse()
+        return entries, first
+
+    def tail(self, count=100, user=None, text=None):
+        """Последние count записей (с фильтром по пользователю и тексту)"""
+        if not os.path.exists(self.log_file):
+            return []
+        return self.read_backward(self.size(), count, self.matcher(user, text))[0]
@@ -0,0 +1,94 @@
+import queue
+import socket
+import threading
+import time
+
+class DatabaseLogSink:
+    def __init__(self, db, host=None, batch_size=500, flush_interval=2.0, max_queue=10000, max_pending=50000):
+        """Запись событий Logger в таблицу logs
+
+        emit() только кладет запись в очередь; фоновый поток вставляет их
+        многострочными INSERT пачками до batch_size записей или раз в
+        flush_interval секунд. Пока база недоступна, записи копятся (не
+        более max_pending, самые старые отбрасываются) и отправляются
+        при следующей удачной попытке.
+        """
+        self.db = db
+        self.host = host or socket.gethostname()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.pending = []
+        self.lock = threading.Lock()
+        self.dropped = 0
+        self.written = 0
+        self.failures = 0
+        self.last_error = None
+        self.closed = False
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._flush_loop, name="log-sink", daemon=True)
+        self.thread.start()
+
+    def emit(self, timestamp, user_login, action):
+        """Постановка события в очередь (не блокирует вызывающий поток)"""
+        try:
+            self.queue.put_nowait((user_login, action, timestamp, self.host))
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+
+    def flush(self):
+        """Отправка в базу всего, что накоплено; возвращает число записанных событий"""
+        while True:
+            try:
+                self.pending.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        written = 0
+        while self.pending:
+            batch = self.pending[:self.batch_size]
+            try:
+                self.db.save_logs(batch)
+            except Exception as e:
+                self.failures += 1
+                if str(e) != self.last_error:
+                    # Не через Logger: его события снова попали бы сюда
+                    print(f"Ошибка записи логов в базу: {str(e)}")
+                self.last_error = str(e)
+                overflow = len(self.pending) - self.max_pending
+                if overflow > 0:
+                    del self.pending[:overflow]
+                    with self.lock:
+                        self.dropped += overflow
+                break
+            del self.pending[:len(batch)]
+            self.last_error = None
+            written += len(batch)
+        self.written += written
+        return written
+
+    def _flush_loop(self):
+        """Фоновая отправка: по размеру пачки, по интервалу и при остановке"""
+        deadline = time.monotonic() + self.flush_interval
+        while not self.stop_event.is_set():
+            if self.queue.qsize() >= self.batch_size or time.monotonic() >= deadline:
+                self.flush()
+                deadline = time.monotonic() + self.flush_interval
+            self.stop_event.wait(min(0.2, self.flush_interval))
+        self.flush()
+
+    def get_stats(self):
+        """Счетчики записи в базу"""
+        with self.lock:
+            dropped = self.dropped
+        return {"written": self.written, "dropped": dropped, "pending": len(self.pending) + self.queue.qsize(),
+                "failures": self.failures}
+
+    def close(self):
+        """Отправка оставшихся событий и остановка фонового потока"""
+        if self.closed:
+            return
+        self.closed = True
+        self.stop_event.set()
+        self.thread.join(timeout=5)
@@ -1,22 +1,232 @@
+import atexit
+import collections
+import gzip
 import os
+import queue
+import shutil
+import threading
+import time
 from datetime import datetime
 
+from log_reader import LogReader
+
 class Logger:
-    def __init__(self):
-        """Инициализация логгера"""
-        self.log_file = "logs/app.log"
-        if not os.path.exists("logs"):
-            os.makedirs("logs")
-    
+    def __init__(self, log_file="logs/app.log", max_queue=10000, flush_size=100, flush_interval=1.0,
+                 max_bytes=5 * 1024 * 1024, max_age=7 * 24 * 3600, backup_count=10, compress=True):
+        """Инициализация логгера
+
+        log() только кладет строку в ограниченную очередь, а запись в файл
+        выполняет фоновый поток: пачками по flush_size строк или раз в
+        flush_interval секунд. Если очередь переполнена, сообщение
+        отбрасывается и учитывается в счетчике, а не блокирует интерфейс.
+        Файл ротируется при превышении max_bytes или возраста max_age
+        секунд; старые файлы сжимаются (compress), хранятся backup_count штук.
+        Строка лога: "[время] [пользователь] сообщение", где пользователь -
+        значение user на момент вызова log() или "-". Кроме файла события
+        передаются подключенным через add_sink приемникам (например,
+        DatabaseLogSink), у которых своя очередь и свой поток записи.
+        """
+        self.log_file = log_file
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.backup_count = backup_count
+        self.compress = compress
+        self.user = None
+        self.sinks = []
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.lock = threading.Lock()
+        self.dropped = 0
+        self.dropped_reported = 0
+        self.written = 0
+        self.rotations = 0
+        self.file = None
+        self.file_size = 0
+        self.opened_at = None
+        self.closed = False
+        log_dir = os.path.dirname(log_file)
+        if log_dir and not os.path.exists(log_dir):
+            os.makedirs(log_dir)
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._writer_loop, name="logger", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def add_sink(self, sink):
+        """Подключение приемника событий с методами emit(timestamp, user, message) и close()"""
+        self.sinks.append(sink)
+
     def log(self, message):
-        """Запись сообщения в лог"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        with open(self.log_file, "a", encoding="utf-8") as f:
-            f.write(f"[{timestamp}] {message}\n")
-    
-    def get_logs(self):
-        """Получение всех логов"""
-        if os.path.exists(self.log_file):
+        """Запись сообщения в лог (не блокирует вызывающий поток)"""
+        now = datetime.now().replace(microsecond=0)
+        user = self.user
+        try:
+            self.queue.put_nowait(f"[{now:%Y-%m-%d %H:%M:%S}] [{user or '-'}] {message}\n")
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+        for sink in self.sinks:
+            sink.emit(now, user, message)
+
+    def flush(self, timeout=2.0):
+        """Ожидание записи всех сообщений, поставленных в очередь до вызова"""
+        if self.closed or not self.thread.is_alive():
+            return False
+        done = threading.Event()
+        try:
+            self.queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def _open(self):
+        """Открытие текущего файла лога; возраст берется из первой записи"""
+        self.file = open(self.log_file, "a", encoding="utf-8")
+        self.file_size = self.file.tell()
+        self.opened_at = time.time()
+        if self.file_size > 0:
             with open(self.log_file, "r", encoding="utf-8") as f:
-                return f.readlines()
-        return []
\ No newline at end of file
+                first = f.readline()
+            try:
+                self.opened_at = datetime.strptime(first[1:20], "%Y-%m-%d %H:%M:%S").timestamp()
+            except ValueError:
+                self.opened_at = os.path.getmtime(self.log_file)
+
+    def _rotate(self):
+        """Переименование текущего файла, сжатие и удаление лишних старых файлов"""
+        self.file.close()
+        self.file = None
+        rotated = f"{self.log_file}.{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}"
+        os.replace(self.log_file, rotated)
+        if self.compress:
+            with open(rotated, "rb") as src, gzip.open(rotated + ".gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(rotated)
+        self.rotations += 1
+        backups = self._backups()
+        for path in backups[:max(0, len(backups) - self.backup_count)]:
+            os.remove(path)
+        self._open()
+
+    def _backups(self):
+        """Пути ротированных файлов лога, от старых к новым"""
+        prefix = os.path.basename(self.log_file) + "."
+        log_dir = os.path.dirname(self.log_file) or "."
+        return [os.path.join(log_dir, name) for name in sorted(os.listdir(log_dir))
+                if name.startswith(prefix) and name[len(prefix):len(prefix) + 1].isdigit()]
+
+    def _write(self, lines):
+        """Запись пачки строк (в фоновом потоке)"""
+        with self.lock:
+            dropped = self.dropped - self.dropped_reported
+            self.dropped_reported = self.dropped
+        if dropped:
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            lines.append(f"[{timestamp}] [-] Пропущено сообщений лога из-за переполнения очереди: {dropped}\n")
+        if not lines:
+            return
+        if self.file is None:
+            self._open()
+        if self.file_size > 0 and time.time() - self.opened_at >= self.max_age:
+            self._rotate()
+        # Ротация перед строкой, с которой файл превысил бы max_bytes, а не после всей пачки
+        chunk = []
+        for line in lines:
+            size = len(line.encode("utf-8"))
+            if self.file_size > 0 and self.file_size + size > self.max_bytes:
+                self.file.writelines(chunk)
+                chunk = []
+                self._rotate()
+            chunk.append(line)
+            self.file_size += size
+        self.file.writelines(chunk)
+        self.file.flush()
+        self.written += len(lines)
+
+    def _writer_loop(self):
+        """Фоновая запись: по размеру пачки, по интервалу и при остановке"""
+        lines, waiters = [], []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    lines.append(item)
+            except queue.Empty:
+                pass
+            stopping = self.stop_event.is_set()
+            if stopping:
+                while True:
+                    try:
+                        item = self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if isinstance(item, threading.Event):
+                        waiters.append(item)
+                    else:
+                        lines.append(item)
+            if len(lines) >= self.flush_size or waiters or stopping or time.monotonic() >= deadline:
+                try:
+                    self._write(lines)
+                except OSError as e:
+                    print(f"Ошибка записи лога: {str(e)}")
+                lines = []
+                for waiter in waiters:
+                    waiter.set()
+                waiters = []
+                deadline = time.monotonic() + self.flush_interval
+            if stopping:
+                break
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def get_stats(self):
+        """Счетчики логгера"""
+        with self.lock:
+            dropped = self.dropped
+        return {"written": self.written, "dropped": dropped, "queued": self.queue.qsize(),
+                "rotations": self.rotations}
+
+    def close(self):
+        """Запись оставшихся сообщений и остановка фонового потока"""
+        if self.closed:
+            return
+        self.closed = True
+        for sink in self.sinks:
+            sink.close()
+        self.stop_event.set()
+        # Пробуждение потока, ожидающего очередь
+        try:
+            self.queue.put_nowait(threading.Event())
+        except queue.Full:
+            pass
+        self.thread.join(timeout=5)
+
+    def get_logs(self, count=1000, user=None, text=None):
+        """Последние count записей лога: (смещение, время, пользователь, сообщение)
+
+        Если текущий файл пуст (сразу после ротации), записи берутся из последнего
+        ротированного файла; смещения тогда относятся к его несжатому тексту.
+        """
+        self.flush()
+        reader = LogReader(self.log_file)
+        if reader.size() > 0:
+            return reader.tail(count, user, text)
+        backups = self._backups()
+        if not backups:
+            return []
+        match = LogReader.matcher(user, text)
+        entries = collections.deque(maxlen=count)
+        offset = 0
+        opener = gzip.open if backups[-1].endswith(".gz") else open
+        with opener(backups[-1], "rt", encoding="utf-8") as f:
+            for line in f:
+                entry = (offset, *LogReader.parse_line(line.rstrip("\n")))
+                offset += len(line.encode("utf-8"))
+                if match(entry):
+                    entries.append(entry)
+        return list(entries)
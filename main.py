@@ -1,27 +1,35 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import psycopg2
 import os
 import sys
 import random
 import hashlib
-from datetime import datetime
+from datetime import date, datetime, timedelta
 import json
-from PIL import Image, ImageTk
-import vlc
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
 # Импорт модулей приложения
-from gui import MainGUI
-from database import Database
+from gui import MainGUI, LazyTreeview, VirtualLogView
+from database import create_database
 from test_generator import TestGenerator
-from video_player import VideoPlayer
 from animation import AnimationManager
 from file_manager import FileManager
 from report_generator import ReportGenerator
 from settings import SettingsManager
 from logger import Logger
+from log_reader import LogReader
+from log_sink import DatabaseLogSink
+from result_writer import ResultWriter
+from cache import CachedDatabase
+from db_worker import DatabaseWorker
+from question_import import QuestionImporter
+from roster_import import RosterImporter
+from thumbnail_cache import ThumbnailCache
+
+# Период динамики на графиках статистики, недель
+STATS_TREND_WEEKS = 26
+# Аналитика по группе: период для трудных вопросов, дней, и предел подписей на тепловой карте
+COHORT_MISSED_DAYS = 92
+COHORT_MAX_LABELS = 40
 
 # Основной класс приложения
 class DiscreteMathApp:
@@ -30,30 +38,96 @@ class DiscreteMathApp:
         self.root = root
         self.root.title("Обучающее приложение по дискретной математике")
         self.root.geometry("1000x700")
-        self.db = Database()
+        self.settings = SettingsManager(self)
+        if self.settings.get_setting("db_backend") == "sqlite":
+            self.db = CachedDatabase(create_database("sqlite", path=self.settings.get_setting("sqlite_path")))
+        else:
+            self.db = CachedDatabase(create_database(pooled=True, minconn=1, maxconn=5))
+        self.db_worker = DatabaseWorker(self.root)
         self.file_manager = FileManager("data")  
         self.logger = Logger()
         self.current_user = None
         self.current_role = None
-        self.settings = SettingsManager(self)
         self.gui = MainGUI(self)
         self.test_generator = TestGenerator(self.db)
-        self.video_player = VideoPlayer(self.root)
+        self.result_writer = ResultWriter(self.db)
+        # Видеоплеер (vlc) и аналитика группы (numpy) создаются при первом обращении
+        self._video_player = None
+        self._cohort_analytics = None
+        # Миниатюры изображений материалов (PIL загружается при первом показе)
+        self.thumbnails = ThumbnailCache()
         self.animation_manager = AnimationManager(self)
         self.report_generator = ReportGenerator()
         
         # Роли пользователей
         self.roles = ["Администратор", "Преподаватель", "Студент"]
         self.setup_database()
+        # События лога со всех машин собираются в таблице logs
+        self.logger.add_sink(DatabaseLogSink(self.db))
         self.apply_settings()
         self.show_login_screen()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         self.logger.log("Приложение запущено")
+
+    @property
+    def video_player(self):
+        """Видеоплеер; модуль и окно проигрывателя создаются при первом обращении, libvlc - при первом воспроизведении"""
+        if self._video_player is None:
+            from video_player import VideoPlayer
+            self._video_player = VideoPlayer(self.root)
+        return self._video_player
+    
+    @property
+    def cohort_analytics(self):
+        """Аналитика по группе; подписывается на изменения результатов с момента создания"""
+        if self._cohort_analytics is None:
+            from cohort_analytics import CohortAnalytics
+            self._cohort_analytics = CohortAnalytics(self.db)
+        return self._cohort_analytics
+    
+    def on_close(self):
+        """Завершение работы приложения"""
+        self.db_worker.shutdown()
+        self.result_writer.close()
+        if self._video_player is not None:
+            self._video_player.close()
+        self.thumbnails.close()
+        self.logger.log("Приложение закрыто")
+        self.logger.close()
+        self.db.close()
+        self.root.destroy()
+    
+    def run_db(self, func, *args, on_success=None, on_error=None, key=None):
+        """Выполнение запроса к базе в фоне; on_success и on_error вызываются в потоке Tk"""
+        def report_error(e):
+            messagebox.showerror("Ошибка", f"Ошибка обращения к базе данных: {str(e)}")
+            self.logger.log(f"Ошибка обращения к базе данных: {str(e)}")
+        return self.db_worker.submit(func, *args, on_success=on_success, on_error=on_error or report_error, key=key)
+    
+    def fill_combobox(self, combobox, func, *args, key, head=(), on_loaded=None):
+        """Заполнение выпадающего списка результатом запроса в фоне
+
+        До прихода результата список недоступен; head - значения перед
+        загруженными, on_loaded(values) вызывается после заполнения.
+        """
+        combobox.config(state="disabled")
+        
+        def fill(values):
+            if not combobox.winfo_exists():
+                return
+            values = list(head) + list(values)
+            combobox.config(values=values, state="readonly")
+            if on_loaded:
+                on_loaded(values)
+        
+        return self.run_db(func, *args, on_success=fill, key=key)
     
     def setup_database(self):
         """Инициализация базы данных"""
         try:
-            self.db.create_tables()
-            self.db.insert_test_data()
+            self.db.migrate()
+            for name in self.db.ensure_partitions():
+                self.logger.log(f"Создана секция результатов {name}")
             self.logger.log("База данных успешно инициализирована")
         except Exception as e:
             messagebox.showerror("Ошибка", f"Не удалось инициализировать базу данных: {str(e)}")
@@ -70,6 +144,7 @@ class DiscreteMathApp:
     def show_login_screen(self):
         """Экран входа"""
         self.gui.clear_frame()
+        self.logger.user = None
         tk.Label(self.gui.main_frame, text="Вход в систему", font=("Arial", 18, "bold")).pack(pady=30)
         
         tk.Label(self.gui.main_frame, text="Логин:", font=("Arial", 12)).pack()
@@ -94,15 +169,19 @@ class DiscreteMathApp:
     def login(self, login, password, role):
         """Аутентификация пользователя"""
         hashed_password = hashlib.sha256(password.encode()).hexdigest()
-        user = self.db.get_user(login, hashed_password, role)
-        if user:
-            self.current_user = user[1]
-            self.current_role = user[3]
-            self.logger.log(f"Успешный вход: {self.current_user} ({self.current_role})")
-            self.show_main_menu()
-        else:
-            messagebox.showerror("Ошибка", "Неверный логин, пароль или роль")
-            self.logger.log(f"Неуспешная попытка входа: {login}, роль: {role}")
+        
+        def on_user(user):
+            if user:
+                self.current_user = user[1]
+                self.current_role = user[3]
+                self.logger.user = self.current_user
+                self.logger.log(f"Успешный вход: {self.current_user} ({self.current_role})")
+                self.show_main_menu()
+            else:
+                messagebox.showerror("Ошибка", "Неверный логин, пароль или роль")
+                self.logger.log(f"Неуспешная попытка входа: {login}, роль: {role}")
+        
+        self.run_db(self.db.get_user, login, hashed_password, role, on_success=on_user, key="login")
     
     def show_main_menu(self):
         """Главное меню"""
@@ -151,8 +230,14 @@ class DiscreteMathApp:
                  command=self.show_delete_user).pack(pady=10)
         tk.Button(self.gui.main_frame, text="Список пользователей", font=("Arial", 12), 
                  command=self.show_user_list).pack(pady=10)
+        tk.Button(self.gui.main_frame, text="Загрузить список из CSV", font=("Arial", 12), 
+                 command=self.show_roster_import).pack(pady=10)
         tk.Button(self.gui.main_frame, text="Логи системы", font=("Arial", 12), 
                  command=self.show_logs).pack(pady=10)
+        tk.Button(self.gui.main_frame, text="Поиск по логам всех машин", font=("Arial", 12), 
+                 command=self.show_log_search).pack(pady=10)
+        tk.Button(self.gui.main_frame, text="Статистика запросов", font=("Arial", 12), 
+                 command=self.show_query_stats).pack(pady=10)
         tk.Button(self.gui.main_frame, text="Назад", font=("Arial", 12), 
                  command=self.show_main_menu).pack(pady=10)
         self.logger.log("Открыта панель администратора")
@@ -188,24 +273,26 @@ class DiscreteMathApp:
     def add_user(self, login, password, role, name):
         """Сохранение нового пользователя"""
         hashed_password = hashlib.sha256(password.encode()).hexdigest()
-        try:
-            self.db.add_user(login, hashed_password, role, name)
+        
+        def on_success(_):
             messagebox.showinfo("Успех", "Пользователь добавлен")
             self.logger.log(f"Добавлен пользователь: {login}")
             self.show_admin_panel()
-        except Exception as e:
+        
+        def on_error(e):
             messagebox.showerror("Ошибка", f"Не удалось добавить пользователя: {str(e)}")
             self.logger.log(f"Ошибка добавления пользователя {login}: {str(e)}")
+        
+        self.run_db(self.db.add_user, login, hashed_password, role, name,
+                    on_success=on_success, on_error=on_error, key="save_user")
     
     def show_edit_user(self):
         """Редактирование пользователя"""
         self.gui.clear_frame()
         tk.Label(self.gui.main_frame, text="Редактировать пользователя", font=("Arial", 18, "bold")).pack(pady=30)
         
-        users = self.db.get_all_users()
         tk.Label(self.gui.main_frame, text="Выберите пользователя:", font=("Arial", 12)).pack()
-        user_combobox = ttk.Combobox(self.gui.main_frame, values=[u[1] for u in users], state="readonly", font=("Arial", 12))
-        user_combobox.pack(pady=10)
+        user_tree = self.user_picker()
         
         tk.Label(self.gui.main_frame, text="Новый пароль:", font=("Arial", 12)).pack()
         password_entry = tk.Entry(self.gui.main_frame, show="*", font=("Arial", 12))
@@ -220,8 +307,14 @@ class DiscreteMathApp:
         name_entry = tk.Entry(self.gui.main_frame, font=("Arial", 12))
         name_entry.pack(pady=10)
         
-        tk.Button(self.gui.main_frame, text="Сохранить", font=("Arial", 12), 
-                 command=lambda: self.edit_user(user_combobox.get(), password_entry.get(), role_combobox.get(), name_entry.get())).pack(pady=20)
+        def save():
+            user = user_tree.selected_row()
+            if not user:
+                messagebox.showerror("Ошибка", "Выберите пользователя")
+                return
+            self.edit_user(user[1], password_entry.get(), role_combobox.get(), name_entry.get())
+        
+        tk.Button(self.gui.main_frame, text="Сохранить", font=("Arial", 12), command=save).pack(pady=20)
         tk.Button(self.gui.main_frame, text="Назад", font=("Arial", 12), 
                  command=self.show_admin_panel).pack(pady=10)
         self.logger.log("Открыт экран редактирования пользователя")
@@ -229,76 +322,283 @@ class DiscreteMathApp:
     def edit_user(self, login, password, role, name):
         """Сохранение изменений пользователя"""
         hashed_password = hashlib.sha256(password.encode()).hexdigest() if password else None
-        try:
-            self.db.update_user(login, hashed_password, role, name)
+        
+        def on_success(_):
             messagebox.showinfo("Успех", "Пользователь обновлен")
             self.logger.log(f"Обновлен пользователь: {login}")
             self.show_admin_panel()
-        except Exception as e:
+        
+        def on_error(e):
             messagebox.showerror("Ошибка", f"Не удалось обновить пользователя: {str(e)}")
             self.logger.log(f"Ошибка обновления пользователя {login}: {str(e)}")
+        
+        self.run_db(self.db.update_user, login, hashed_password, role, name,
+                    on_success=on_success, on_error=on_error, key="save_user")
     
     def show_delete_user(self):
         """Удаление пользователя"""
         self.gui.clear_frame()
         tk.Label(self.gui.main_frame, text="Удалить пользователя", font=("Arial", 18, "bold")).pack(pady=30)
         
-        users = self.db.get_all_users()
         tk.Label(self.gui.main_frame, text="Выберите пользователя:", font=("Arial", 12)).pack()
-        user_combobox = ttk.Combobox(self.gui.main_frame, values=[u[1] for u in users], state="readonly", font=("Arial", 12))
-        user_combobox.pack(pady=10)
+        user_tree = self.user_picker()
         
-        tk.Button(self.gui.main_frame, text="Удалить", font=("Arial", 12), 
-                 command=lambda: self.delete_user(user_combobox.get())).pack(pady=20)
+        def delete():
+            user = user_tree.selected_row()
+            if not user:
+                messagebox.showerror("Ошибка", "Выберите пользователя")
+                return
+            self.delete_user(user[1])
+        
+        tk.Button(self.gui.main_frame, text="Удалить", font=("Arial", 12), command=delete).pack(pady=20)
         tk.Button(self.gui.main_frame, text="Назад", font=("Arial", 12), 
                  command=self.show_admin_panel).pack(pady=10)
         self.logger.log("Открыт экран удаления пользователя")
     
     def delete_user(self, login):
         """Удаление пользователя"""
-        try:
-            self.db.delete_user(login)
+        def on_success(_):
             messagebox.showinfo("Успех", "Пользователь удален")
             self.logger.log(f"Удален пользователь: {login}")
             self.show_admin_panel()
-        except Exception as e:
+        
+        def on_error(e):
             messagebox.showerror("Ошибка", f"Не удалось удалить пользователя: {str(e)}")
             self.logger.log(f"Ошибка удаления пользователя {login}: {str(e)}")
+        
+        self.run_db(self.db.delete_user, login, on_success=on_success, on_error=on_error, key="save_user")
+    
+    def user_picker(self):
+        """Таблица выбора пользователя; пользователи подгружаются страницами"""
+        tree = LazyTreeview(self.gui.main_frame, ("Login", "Name"), ("Логин", "Имя"),
+                            self.db.get_all_users_page, lambda u: (u[1], u[4]), lambda u: u[0], height=6,
+                            worker=self.db_worker, logger=self.logger)
+        tree.pack(fill="x", pady=10)
+        return tree
     
     def show_user_list(self):
         """Список пользователей"""
         self.gui.clear_frame()
         tk.Label(self.gui.main_frame, text="Список пользователей", font=("Arial", 18, "bold")).pack(pady=30)
         
-        users = self.db.get_all_users()
-        tree = ttk.Treeview(self.gui.main_frame, columns=("Login", "Role", "Name"), show="headings")
-        tree.heading("Login", text="Логин")
-        tree.heading("Role", text="Роль")
-        tree.heading("Name", text="Имя")
+        tree = LazyTreeview(self.gui.main_frame, ("Login", "Role", "Name"), ("Логин", "Роль", "Имя"),
+                            self.db.get_all_users_page, lambda u: (u[1], u[3], u[4]), lambda u: u[0],
+                            worker=self.db_worker, logger=self.logger)
         tree.pack(fill="both", expand=True, pady=10)
         
-        for user in users:
-            tree.insert("", "end", values=(user[1], user[3], user[2]))
-        
         tk.Button(self.gui.main_frame, text="Назад", font=("Arial", 12), 
                  command=self.show_admin_panel).pack(pady=10)
         self.logger.log("Открыт список пользователей")
     
+    def show_roster_import(self):
+        """Массовая загрузка пользователей из CSV"""
+        self.gui.clear_frame()
+        tk.Label(self.gui.main_frame, text="Загрузка списка пользователей", font=("Arial", 18, "bold")).pack(pady=30)
+        tk.Label(self.gui.main_frame, text="CSV с колонками login, name, role и необязательными password, action (delete - удалить)", 
+                font=("Arial", 10)).pack()
+        
+        summary_label = tk.Label(self.gui.main_frame, text="", font=("Arial", 12))
+        summary_label.pack(pady=10)
+        columns = ("Line", "Login", "Status", "Password", "Message")
+        headings = ("Строка", "Логин", "Результат", "Выданный пароль", "Сообщение")
+        tree = ttk.Treeview(self.gui.main_frame, columns=columns, show="headings")
+        for column, heading in zip(columns, headings):
+            tree.heading(column, text=heading)
+            tree.column(column, width=80 if column == "Line" else 160)
+        tree.pack(fill="both", expand=True, pady=10)
+        importer = RosterImporter(self.db)
+        last_report = {}
+        
+        def on_success(report):
+            last_report.clear()
+            last_report.update(report)
+            tree.delete(*tree.get_children())
+            for entry in report["rows"]:
+                tree.insert("", "end", values=(entry["line"], entry["login"], entry["status"],
+                                               entry["password"], entry["message"]))
+            summary_label.config(text=f"Создано: {report['created']}, обновлено: {report['updated']}, "
+                                      f"удалено: {report['deleted']}, ошибок: {report['errors']} "
+                                      f"({report['seconds']:.2f} с)")
+            self.logger.log(f"Загружен список пользователей {report['file']}: создано {report['created']}, "
+                            f"обновлено {report['updated']}, удалено {report['deleted']}, ошибок {report['errors']}")
+        
+        def load():
+            file_path = filedialog.askopenfilename(filetypes=[("CSV", "*.csv")])
+            if file_path:
+                summary_label.config(text="Загрузка...")
+                self.run_db(importer.import_file, file_path, (self.current_user,), on_success=on_success,
+                            key="roster_import")
+        
+        def save():
+            if not last_report:
+                messagebox.showwarning("Предупреждение", "Сначала загрузите список")
+                return
+            file_path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV", "*.csv")],
+                                                     initialfile=f"roster_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
+            if file_path:
+                importer.save_report(last_report, file_path)
+                messagebox.showinfo("Успех", f"Отчет сохранен: {file_path}")
+        
+        tk.Button(self.gui.main_frame, text="Выбрать файл", font=("Arial", 12), command=load).pack(pady=5)
+        tk.Button(self.gui.main_frame, text="Сохранить отчет", font=("Arial", 12), command=save).pack(pady=5)
+        tk.Button(self.gui.main_frame, text="Назад", font=("Arial", 12), 
+                 command=self.show_admin_panel).pack(pady=10)
+        self.logger.log("Открыт экран загрузки списка пользователей")
+    
     def show_logs(self):
         """Просмотр логов системы"""
         self.gui.clear_frame()
         tk.Label(self.gui.main_frame, text="Логи системы", font=("Arial", 18, "bold")).pack(pady=30)
+        self.logger.log("Открыт просмотр логов")
+        self.logger.flush()
+        
+        filters = tk.Frame(self.gui.main_frame)
+        filters.pack(pady=5)
+        tk.Label(filters, text="Пользователь:", font=("Arial", 10)).grid(row=0, column=0, padx=3)
+        user_entry = tk.Entry(filters, width=14)
+        user_entry.grid(row=0, column=1, padx=3)
+        tk.Label(filters, text="Действие:", font=("Arial", 10)).grid(row=0, column=2, padx=3)
+        text_entry = tk.Entry(filters, width=20)
+        text_entry.grid(row=0, column=3, padx=3)
+        tk.Label(filters, text="С (ГГГГ-ММ-ДД):", font=("Arial", 10)).grid(row=1, column=0, padx=3)
+        since_entry = tk.Entry(filters, width=14)
+        since_entry.grid(row=1, column=1, padx=3)
+        tk.Label(filters, text="По (ГГГГ-ММ-ДД):", font=("Arial", 10)).grid(row=1, column=2, padx=3)
+        until_entry = tk.Entry(filters, width=20)
+        until_entry.grid(row=1, column=3, padx=3)
+        
+        view = VirtualLogView(self.gui.main_frame, LogReader(self.logger.log_file))
+        
+        def apply_filter():
+            try:
+                since = until = None
+                if since_entry.get().strip():
+                    since = datetime.strptime(since_entry.get().strip(), "%Y-%m-%d").strftime("%Y-%m-%d %H:%M:%S")
+                if until_entry.get().strip():
+                    # Дата "по" включительно
+                    until = (datetime.strptime(until_entry.get().strip(), "%Y-%m-%d")
+                             + timedelta(days=1)).strftime("%Y-%m-%d %H:%M:%S")
+            except ValueError:
+                messagebox.showerror("Ошибка", "Дата должна быть в формате ГГГГ-ММ-ДД")
+                return
+            view.set_filter(user_entry.get().strip() or None, text_entry.get().strip() or None, since, until)
+        
+        tk.Button(filters, text="Применить", font=("Arial", 10), command=apply_filter).grid(row=0, column=4, padx=5)
+        tk.Button(filters, text="В конец", font=("Arial", 10),
+                 command=lambda: (self.logger.flush(), view.show_end())).grid(row=1, column=4, padx=5)
+        view.pack(fill="both", expand=True, padx=10, pady=10)
+        view.set_filter()
         
-        logs = self.logger.get_logs()
-        text_area = tk.Text(self.gui.main_frame, height=20, width=80, font=("Arial", 10))
-        text_area.pack(pady=10)
-        for log in logs:
-            text_area.insert(tk.END, f"{log}\n")
-        text_area.config(state="disabled")
+        tk.Button(self.gui.main_frame, text="Назад", font=("Arial", 12), 
+                 command=self.show_admin_panel).pack(pady=10)
+    
+    def show_log_search(self):
+        """Поиск по логам всех машин в базе данных"""
+        self.gui.clear_frame()
+        tk.Label(self.gui.main_frame, text="Поиск по логам", font=("Arial", 18, "bold")).pack(pady=30)
+        
+        filters = tk.Frame(self.gui.main_frame)
+        filters.pack(pady=5)
+        tk.Label(filters, text="Пользователь:", font=("Arial", 10)).grid(row=0, column=0, padx=3)
+        user_entry = tk.Entry(filters, width=14)
+        user_entry.grid(row=0, column=1, padx=3)
+        tk.Label(filters, text="Действие:", font=("Arial", 10)).grid(row=0, column=2, padx=3)
+        text_entry = tk.Entry(filters, width=20)
+        text_entry.grid(row=0, column=3, padx=3)
+        tk.Label(filters, text="С (ГГГГ-ММ-ДД):", font=("Arial", 10)).grid(row=1, column=0, padx=3)
+        since_entry = tk.Entry(filters, width=14)
+        since_entry.grid(row=1, column=1, padx=3)
+        tk.Label(filters, text="По (ГГГГ-ММ-ДД):", font=("Arial", 10)).grid(row=1, column=2, padx=3)
+        until_entry = tk.Entry(filters, width=20)
+        until_entry.grid(row=1, column=3, padx=3)
+        
+        # Значения фильтра читаются в потоке Tk, страницы загружаются в фоне
+        query = {"user_login": None, "text": None, "since": None, "until": None}
+        
+        def fetch_page(after, size):
+            return self.db.search_logs(after=after, page_size=size, **query)
+        
+        def apply_filter():
+            try:
+                since = datetime.strptime(since_entry.get().strip(), "%Y-%m-%d") if since_entry.get().strip() else None
+                until = (datetime.strptime(until_entry.get().strip(), "%Y-%m-%d") + timedelta(days=1)
+                         if until_entry.get().strip() else None)
+            except ValueError:
+                messagebox.showerror("Ошибка", "Дата должна быть в формате ГГГГ-ММ-ДД")
+                return
+            query.update(user_login=user_entry.get().strip() or None, text=text_entry.get().strip() or None,
+                         since=since, until=until)
+            tree.reload()
+        
+        tk.Button(filters, text="Найти", font=("Arial", 10), command=apply_filter).grid(row=0, column=4, padx=5)
+        tree = LazyTreeview(self.gui.main_frame, ("Time", "User", "Host", "Action"),
+                            ("Время", "Пользователь", "Компьютер", "Действие"),
+                            fetch_page, lambda r: (r[1], r[2] or "", r[3] or "", r[4]), lambda r: (r[1], r[0]),
+                            height=15, worker=self.db_worker, logger=self.logger)
+        tree.pack(fill="both", expand=True, padx=10, pady=10)
         
         tk.Button(self.gui.main_frame, text="Назад", font=("Arial", 12), 
                  command=self.show_admin_panel).pack(pady=10)
-        self.logger.log("Открыт просмотр логов")
+        self.logger.log("Открыт поиск по логам")
+    
+    def show_query_stats(self):
+        """Статистика запросов к базе данных"""
+        self.gui.clear_frame()
+        tk.Label(self.gui.main_frame, text="Статистика запросов", font=("Arial", 18, "bold")).pack(pady=30)
+        
+        columns = ("Method", "Calls", "Avg", "P95", "Max", "Rows", "Errors")
+        headings = ("Метод", "Вызовов", "Среднее, мс", "p95, мс", "Макс, мс", "Строк", "Ошибок")
+        tree = ttk.Treeview(self.gui.main_frame, columns=columns, show="headings")
+        for column, heading in zip(columns, headings):
+            tree.heading(column, text=heading)
+            tree.column(column, width=90 if column != "Method" else 220)
+        tree.pack(fill="both", expand=True, pady=10)
+        cache_label = tk.Label(self.gui.main_frame, font=("Arial", 10))
+        cache_label.pack()
+        diagnostics_label = tk.Label(self.gui.main_frame, font=("Arial", 10))
+        diagnostics_label.pack()
+        
+        def refresh():
+            tree.delete(*tree.get_children())
+            stats = self.db.get_query_stats()
+            for method, s in sorted(stats.items(), key=lambda item: -item[1]["avg_ms"] * item[1]["calls"]):
+                tree.insert("", "end", values=(method, s["calls"], f"{s['avg_ms']:.2f}", s["p95_ms"],
+                                               f"{s['max_ms']:.2f}", s["rows"], s["errors"]))
+            # Попадания в кэш справочников - обращения, не дошедшие до базы
+            cache = self.db.get_cache_stats()
+            cache_label.config(text=f"Кэш справочников: попаданий {cache['hits']}, промахов {cache['misses']} "
+                                    f"({cache['hit_rate']:.0%}), записей {cache['size']}/{cache['max_size']}, "
+                                    f"вытеснено {cache['evictions']}")
+            # Модуль графиков (matplotlib) мог еще не загружаться
+            charts_module = sys.modules.get("charts")
+            if charts_module is None:
+                diagnostics_label.config(text="Графики в этом сеансе не открывались")
+                return
+            charts = charts_module.get_chart_stats()
+            memory = f"{charts['memory_mb']:.0f} МБ" if charts["memory_mb"] is not None else "н/д"
+            diagnostics_label.config(text=f"Графики: открыто {charts['live']}, создано {charts['created']}, "
+                                          f"закрыто {charts['closed']}, фигур pyplot {charts['pyplot_figures']}; "
+                                          f"память процесса: {memory}")
+        
+        def export():
+            file_path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON", "*.json")],
+                                                     initialfile=f"query_stats_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+            if file_path:
+                self.db.dump_query_stats(file_path)
+                messagebox.showinfo("Успех", f"Статистика сохранена: {file_path}")
+                self.logger.log(f"Статистика запросов сохранена: {file_path}")
+        
+        def reset():
+            self.db.reset_query_stats()
+            refresh()
+        
+        refresh()
+        tk.Button(self.gui.main_frame, text="Обновить", font=("Arial", 12), command=refresh).pack(pady=5)
+        tk.Button(self.gui.main_frame, text="Экспорт в JSON", font=("Arial", 12), command=export).pack(pady=5)
+        tk.Button(self.gui.main_frame, text="Сбросить", font=("Arial", 12), command=reset).pack(pady=5)
+        tk.Button(self.gui.main_frame, text="Назад", font=("Arial", 12), 
+                 command=self.show_admin_panel).pack(pady=10)
+        self.logger.log("Открыта статистика запросов")
     
     def show_material_management(self):
         """Управление учебными материалами"""
@@ -337,9 +637,9 @@ class DiscreteMathApp:
                  command=lambda: file_entry.insert(0, filedialog.askopenfilename())).pack(pady=10)
         
         tk.Label(self.gui.main_frame, text="Категория:", font=("Arial", 12)).pack()
-        category_combobox = ttk.Combobox(self.gui.main_frame, values=["Логика", "Теория множеств", "Графы", "Комбинаторика"], 
-                                        state="readonly", font=("Arial", 12))
+        category_combobox = ttk.Combobox(self.gui.main_frame, state="readonly", font=("Arial", 12))
         category_combobox.pack(pady=10)
+        self.fill_combobox(category_combobox, self.db.get_categories, key="categories")
         
         tk.Button(self.gui.main_frame, text="Сохранить", font=("Arial", 12), 
                  command=lambda: self.add_material(topic_entry.get(), content_text.get("1.0", tk.END), 
@@ -350,25 +650,30 @@ class DiscreteMathApp:
     
     def add_material(self, topic, content, file_path, category):
         """Сохранение материала"""
-        try:
+        def save():
             saved_path = self.file_manager.save_file(file_path, os.path.basename(file_path)) if file_path else ""
             self.db.add_material(topic, content, saved_path, category)
+        
+        def on_success(_):
             messagebox.showinfo("Успех", "Материал добавлен")
             self.logger.log(f"Добавлен материал: {topic}")
             self.show_material_management()
-        except Exception as e:
+        
+        def on_error(e):
             messagebox.showerror("Ошибка", f"Не удалось добавить материал: {str(e)}")
             self.logger.log(f"Ошибка добавления материала {topic}: {str(e)}")
+        
+        self.run_db(save, on_success=on_success, on_error=on_error, key="save_material")
     
     def show_edit_material(self):
         """Редактирование материала"""
         self.gui.clear_frame()
         tk.Label(self.gui.main_frame, text="Редактировать материал", font=("Arial", 18, "bold")).pack(pady=30)
         
-        materials = self.db.get_all_materials()
         tk.Label(self.gui.main_frame, text="Выберите материал:", font=("Arial", 12)).pack()
-        material_combobox = ttk.Combobox(self.gui.main_frame, values=[m[1] for m in materials], state="readonly", font=("Arial", 12))
+        material_combobox = ttk.Combobox(self.gui.main_frame, state="readonly", font=("Arial", 12))
         material_combobox.pack(pady=10)
+        material_ids = {}
         
         tk.Label(self.gui.main_frame, text="Новое содержание:", font=("Arial", 12)).pack()
         content_text = tk.Text(self.gui.main_frame, height=10, width=60, font=("Arial", 12))
@@ -381,9 +686,27 @@ class DiscreteMathApp:
                  command=lambda: file_entry.insert(0, filedialog.askopenfilename())).pack(pady=10)
         
         tk.Label(self.gui.main_frame, text="Категория:", font=("Arial", 12)).pack()
-        category_combobox = ttk.Combobox(self.gui.main_frame, values=["Логика", "Теория множеств", "Графы", "Комбинаторика"], 
-                                        state="readonly", font=("Arial", 12))
+        category_combobox = ttk.Combobox(self.gui.main_frame, state="readonly", font=("Arial", 12))
         category_combobox.pack(pady=10)
+        self.fill_combobox(category_combobox, self.db.get_categories, key="categories")
+        
+        # Список - без содержания; содержание выбранного материала загружается при выборе
+        def show_topics(materials):
+            material_ids.update((m[1], m[0]) for m in materials)
+            material_combobox.config(values=[m[1] for m in materials])
+        
+        def fill_material(material):
+            if material is None or not content_text.winfo_exists():
+                return
+            content_text.delete("1.0", tk.END)
+            content_text.insert(tk.END, material[2] or "")
+            file_entry.delete(0, tk.END)
+            file_entry.insert(0, material[3] or "")
+            category_combobox.set(material[4] or "")
+        
+        material_combobox.bind("<<ComboboxSelected>>", lambda e: self.run_db(
+            self.db.get_material, material_ids[material_combobox.get()], on_success=fill_material, key="material"))
+        self.run_db(self.load_material_list, on_success=show_topics, key="materials")
         
         tk.Button(self.gui.main_frame, text="Сохранить", font=("Arial", 12), 
                  command=lambda: self.edit_material(material_combobox.get(), content_text.get("1.0", tk.END), 
@@ -394,25 +717,38 @@ class DiscreteMathApp:
     
     def edit_material(self, topic, content, file_path, category):
         """Сохранение изменений материала"""
-        try:
-            saved_path = self.file_manager.save_file(file_path, os.path.basename(file_path)) if file_path else ""
+        def save():
+            if not file_path:
+                saved_path = ""
+            elif os.path.dirname(os.path.abspath(file_path)) == os.path.abspath(self.file_manager.base_dir):
+                # Файл уже лежит в каталоге материалов (путь подставлен из текущего материала)
+                saved_path = file_path
+            else:
+                saved_path = self.file_manager.save_file(file_path, os.path.basename(file_path))
             self.db.update_material(topic, content, saved_path, category)
+        
+        def on_success(_):
             messagebox.showinfo("Успех", "Материал обновлен")
             self.logger.log(f"Обновлен материал: {topic}")
             self.show_material_management()
-        except Exception as e:
+        
+        def on_error(e):
             messagebox.showerror("Ошибка", f"Не удалось обновить материал: {str(e)}")
             self.logger.log(f"Ошибка обновления материала {topic}: {str(e)}")
+        
+        self.run_db(save, on_success=on_success, on_error=on_error, key="save_material")
     
     def show_delete_material(self):
         """Удаление материала"""
         self.gui.clear_frame()
         tk.Label(self.gui.main_frame, text="Удалить материал", font=("Arial", 18, "bold")).pack(pady=30)
         
-        materials = self.db.get_all_materials()
         tk.Label(self.gui.main_frame, text="Выберите материал:", font=("Arial", 12)).pack()
-        material_combobox = ttk.Combobox(self.gui.main_frame, values=[m[1] for m in materials], state="readonly", font=("Arial", 12))
+        material_combobox = ttk.Combobox(self.gui.main_frame, state="readonly", font=("Arial", 12))
         material_combobox.pack(pady=10)
+        self.run_db(self.load_material_list,
+                    on_success=lambda materials: material_combobox.config(values=[m[1] for m in materials]),
+                    key="materials")
         
         tk.Button(self.gui.main_frame, text="Удалить", font=("Arial", 12), 
                  command=lambda: self.delete_material(material_combobox.get())).pack(pady=20)
@@ -422,29 +758,28 @@ class DiscreteMathApp:
     
     def delete_material(self, topic):
         """Удаление материала"""
-        try:
-            self.db.delete_material(topic)
+        def on_success(_):
             messagebox.showinfo("Успех", "Материал удален")
             self.logger.log(f"Удален материал: {topic}")
             self.show_material_management()
-        except Exception as e:
+        
+        def on_error(e):
             messagebox.showerror("Ошибка", f"Не удалось удалить материал: {str(e)}")
             self.logger.log(f"Ошибка удаления материала {topic}: {str(e)}")
+        
+        self.run_db(self.db.delete_material, topic, on_success=on_success, on_error=on_error, key="save_material")
     
     def show_material_list(self):
         """Список материалов"""
         self.gui.clear_frame()
         tk.Label(self.gui.main_frame, text="Список материалов", font=("Arial", 18, "bold")).pack(pady=30)
         
-        materials = self.db.get_all_materials()
-        tree = ttk.Treeview(self.gui.main_frame, columns=("Topic", "Category"), show="headings")
-        tree.heading("Topic", text="Тема")
-        tree.heading("Category", text="Категория")
+        tree = LazyTreeview(self.gui.main_frame, ("Topic", "Category"), ("Тема", "Категория"),
+                            lambda after, size: self.db.get_material_list_page(None, after, size),
+                            lambda r: (r[1], r[2]), lambda r: r[0], page_size=200,
+                            worker=self.db_worker, logger=self.logger)
         tree.pack(fill="both", expand=True, pady=10)
         
-        for material in materials:
-            tree.insert("", "end", values=(material[1], material[4]))
-        
         tk.Button(self.gui.main_frame, text="Назад", font=("Arial", 12), 
                  command=self.show_material_management).pack(pady=10)
         self.logger.log("Открыт список материалов")
@@ -455,32 +790,66 @@ class DiscreteMathApp:
         tk.Label(self.gui.main_frame, text="Учебные материалы", font=("Arial", 18, "bold")).pack(pady=30)
         
         tk.Label(self.gui.main_frame, text="Фильтр по категории:", font=("Arial", 12)).pack()
-        category_combobox = ttk.Combobox(self.gui.main_frame, values=["Все", "Логика", "Теория множеств", "Графы", "Комбинаторика"], 
-                                        state="readonly", font=("Arial", 12))
+        category_combobox = ttk.Combobox(self.gui.main_frame, state="readonly", font=("Arial", 12))
         category_combobox.set("Все")
         category_combobox.pack(pady=10)
+        self.fill_combobox(category_combobox, self.db.get_categories, key="categories", head=["Все"])
         
-        materials_frame = tk.Frame(self.gui.main_frame)
-        materials_frame.pack(fill="both", expand=True)
+        # Фильтр читается в потоке Tk, страницы списка загружаются в фоне
+        query = {"category": None}
+        
+        def fetch_page(after, size):
+            rows = self.db.get_material_list_page(query["category"], after, size)
+            # Миниатюры готовятся в фоне, пока пользователь выбирает материал
+            self.thumbnails.prewarm([r[4] for r in rows if r[4] and r[4].endswith((".jpg", ".png"))])
+            return rows
+        
+        tree = LazyTreeview(self.gui.main_frame, ("Topic", "Category", "Media"), ("Тема", "Категория", "Файл"),
+                            fetch_page, lambda r: (r[1], r[2], "Да" if r[3] else ""), lambda r: r[0],
+                            page_size=200, height=15, worker=self.db_worker, logger=self.logger)
+        tree.pack(fill="both", expand=True, padx=10, pady=10)
+        
+        def open_selected():
+            material = tree.selected_row()
+            if not material:
+                messagebox.showerror("Ошибка", "Выберите материал")
+                return
+            self.open_material(material[0])
         
         def update_materials():
-            for widget in materials_frame.winfo_children():
-                widget.destroy()
-            materials = self.db.get_all_materials() if category_combobox.get() == "Все" else self.db.get_materials_by_category(category_combobox.get())
-            for material in materials:
-                frame = tk.Frame(materials_frame)
-                frame.pack(fill="x", pady=5)
-                tk.Label(frame, text=f"Тема: {material[1]} ({material[4]})", font=("Arial", 12)).pack(side="left")
-                tk.Button(frame, text="Открыть", font=("Arial", 12), 
-                         command=lambda m=material: self.show_material_content(m)).pack(side="right")
+            category = category_combobox.get()
+            query["category"] = None if category == "Все" else category
+            tree.reload()
         
         category_combobox.bind("<<ComboboxSelected>>", lambda e: update_materials())
-        update_materials()
+        tree.tree.bind("<Double-1>", lambda e: open_selected())
         
+        tk.Button(self.gui.main_frame, text="Открыть", font=("Arial", 12), 
+                 command=open_selected).pack(pady=5)
         tk.Button(self.gui.main_frame, text="Назад", font=("Arial", 12), 
                  command=self.show_main_menu).pack(pady=10)
         self.logger.log("Открыт экран просмотра материалов")
     
+    def load_material_list(self, category=None, page_size=500):
+        """Весь список материалов без содержания (id, topic, category, has_media, file_path); для run_db"""
+        materials, after = [], None
+        while True:
+            page = self.db.get_material_list_page(category, after, page_size)
+            materials.extend(page)
+            if len(page) < page_size:
+                return materials
+            after = page[-1][0]
+    
+    def open_material(self, material_id):
+        """Загрузка содержания материала в фоне и его показ"""
+        def show(material):
+            if material is None:
+                messagebox.showerror("Ошибка", "Материал не найден")
+                self.show_materials()
+                return
+            self.show_material_content(material)
+        self.run_db(self.db.get_material, material_id, on_success=show, key="material")
+    
     def show_material_content(self, material):
         """Отображение содержания материала"""
         self.gui.clear_frame()
@@ -493,14 +862,17 @@ class DiscreteMathApp:
         
         if material[3] and os.path.exists(material[3]):
             if material[3].endswith((".jpg", ".png")):
-                img = Image.open(material[3])
-                img = img.resize((300, 300), Image.LANCZOS)
-                photo = ImageTk.PhotoImage(img)
-                tk.Label(self.gui.main_frame, image=photo).pack(pady=10)
-                tk.Label(self.gui.main_frame, image=photo).image = photo
+                try:
+                    photo = self.thumbnails.get_photo(material[3])
+                    image_label = tk.Label(self.gui.main_frame, image=photo)
+                    image_label.image = photo
+                    image_label.pack(pady=10)
+                except Exception as e:
+                    tk.Label(self.gui.main_frame, text=f"Не удалось открыть изображение: {str(e)}",
+                             font=("Arial", 12)).pack(pady=10)
             elif material[3].endswith((".mp4", ".avi")):
                 tk.Button(self.gui.main_frame, text="Воспроизвести видео", font=("Arial", 12), 
-                         command=lambda: self.video_player.play_video(material[3])).pack(pady=10)
+                         command=lambda: self.video_player.play(material[3])).pack(pady=10)
         
         tk.Button(self.gui.main_frame, text="Назад", font=("Arial", 12), 
                  command=self.show_materials).pack(pady=10)
@@ -534,29 +906,56 @@ class DiscreteMathApp:
         wrong_answers_entry.pack(pady=10)
         
         tk.Label(self.gui.main_frame, text="Категория:", font=("Arial", 12)).pack()
-        category_combobox = ttk.Combobox(self.gui.main_frame, values=["Логика", "Теория множеств", "Графы", "Комбинаторика"], 
-                                        state="readonly", font=("Arial", 12))
+        category_combobox = ttk.Combobox(self.gui.main_frame, state="readonly", font=("Arial", 12))
         category_combobox.pack(pady=10)
+        self.fill_combobox(category_combobox, self.db.get_categories, key="categories")
         
         tk.Button(self.gui.main_frame, text="Добавить вопрос", font=("Arial", 12), 
                  command=lambda: self.add_question(topic_entry.get(), question_text.get("1.0", tk.END), 
                                                   correct_answer_entry.get(), wrong_answers_entry.get(), 
                                                   type_combobox.get(), category_combobox.get())).pack(pady=20)
+        tk.Button(self.gui.main_frame, text="Импорт банка вопросов", font=("Arial", 12), 
+                 command=self.import_questions).pack(pady=10)
         tk.Button(self.gui.main_frame, text="Назад", font=("Arial", 12), 
                  command=self.show_main_menu).pack(pady=10)
         self.logger.log("Открыт экран создания теста")
     
+    def import_questions(self):
+        """Импорт банка вопросов из файла"""
+        file_path = filedialog.askopenfilename(filetypes=[("Банк вопросов", "*.csv *.json *.jsonl *.xlsx")])
+        if not file_path:
+            return
+        
+        def on_success(report):
+            text = (f"Строк в файле: {report['rows']}\n"
+                    f"Добавлено: {report['inserted']}\n"
+                    f"Дубликатов: {report['duplicates']}\n"
+                    f"С ошибками: {report['invalid']}\n"
+                    f"Скорость: {report['rows_per_second']:.0f} строк/с")
+            if report["errors"]:
+                text += "\n\n" + "\n".join(report["errors"])
+            messagebox.showinfo("Импорт вопросов", text)
+            self.logger.log(f"Импорт вопросов из {file_path}: добавлено {report['inserted']}, "
+                            f"дубликатов {report['duplicates']}, ошибок {report['invalid']}, "
+                            f"{report['seconds']:.2f} с")
+        
+        self.run_db(QuestionImporter(self.db).import_file, file_path, on_success=on_success, key="import_questions")
+    
     def add_question(self, topic, question, correct_answer, wrong_answers, question_type, category):
         """Добавление вопроса"""
-        try:
-            wrong_answers = wrong_answers.split(",") if question_type == "Множественный выбор" else []
-            self.db.add_question(topic, question.strip(), correct_answer, wrong_answers, question_type, category)
+        wrong_answers = wrong_answers.split(",") if question_type == "Множественный выбор" else []
+        
+        def on_success(_):
             messagebox.showinfo("Успех", "Вопрос добавлен")
             self.logger.log(f"Добавлен вопрос: {topic}, тип: {question_type}")
             self.show_test_creation()
-        except Exception as e:
+        
+        def on_error(e):
             messagebox.showerror("Ошибка", f"Не удалось добавить вопрос: {str(e)}")
             self.logger.log(f"Ошибка добавления вопроса {topic}: {str(e)}")
+        
+        self.run_db(self.db.add_question, topic, question.strip(), correct_answer, wrong_answers, question_type,
+                    category, on_success=on_success, on_error=on_error, key="save_question")
     
     def show_test_selection(self):
         """Выбор теста"""
@@ -564,20 +963,25 @@ class DiscreteMathApp:
         tk.Label(self.gui.main_frame, text="Выберите тест", font=("Arial", 18, "bold")).pack(pady=30)
         
         tk.Label(self.gui.main_frame, text="Категория:", font=("Arial", 12)).pack()
-        category_combobox = ttk.Combobox(self.gui.main_frame, values=["Все", "Логика", "Теория множеств", "Графы", "Комбинаторика"], 
-                                        state="readonly", font=("Arial", 12))
+        category_combobox = ttk.Combobox(self.gui.main_frame, state="readonly", font=("Arial", 12))
         category_combobox.set("Все")
         category_combobox.pack(pady=10)
+        self.fill_combobox(category_combobox, self.db.get_categories, key="categories", head=["Все"])
         
         tk.Label(self.gui.main_frame, text="Тема:", font=("Arial", 12)).pack()
         topic_combobox = ttk.Combobox(self.gui.main_frame, state="readonly", font=("Arial", 12))
         topic_combobox.pack(pady=10)
         
+        def select_first(topics):
+            topic_combobox.set(topics[0] if topics else "")
+        
         def update_topics():
-            topics = self.db.get_all_topics() if category_combobox.get() == "Все" else self.db.get_topics_by_category(category_combobox.get())
-            topic_combobox["values"] = topics
-            if topics:
-                topic_combobox.set(topics[0])
+            category = category_combobox.get()
+            if category == "Все":
+                self.fill_combobox(topic_combobox, self.db.get_all_topics, key="topics", on_loaded=select_first)
+            else:
+                self.fill_combobox(topic_combobox, self.db.get_topics_by_category, category, key="topics",
+                                   on_loaded=select_first)
         
         category_combobox.bind("<<ComboboxSelected>>", lambda e: update_topics())
         update_topics()
@@ -594,7 +998,11 @@ class DiscreteMathApp:
             messagebox.showerror("Ошибка", "Выберите тему")
             self.logger.log("Ошибка: не выбрана тема для теста")
             return
-        questions = self.test_generator.generate_test(topic)
+        self.run_db(self.test_generator.generate_test, topic, self.current_user,
+                    on_success=lambda questions: self.begin_test(topic, questions), key="generate_test")
+    
+    def begin_test(self, topic, questions):
+        """Показ первого вопроса сгенерированного теста"""
         if not questions:
             messagebox.showerror("Ошибка", "Нет вопросов по данной теме")
             self.logger.log(f"Ошибка: нет вопросов для темы {topic}")
@@ -649,7 +1057,7 @@ class DiscreteMathApp:
         else:
             messagebox.showerror("Ошибка", f"Правильный ответ: {question[3]}")
         
-        self.db.save_test_result(self.current_user, question[1], question[5], is_correct)
+        self.result_writer.add(self.current_user, question[1], question[5], is_correct, question[0])
         self.logger.log(f"Ответ на вопрос {question[2][:30]}...: {'верный' if is_correct else 'неверный'}")
         self.current_question += 1
         self.show_question()
@@ -667,11 +1075,27 @@ class DiscreteMathApp:
         tk.Label(self.gui.main_frame, text=f"Результат: {self.correct_answers}/{len(self.questions)} ({score:.2f}%)", 
                 font=("Arial", 18, "bold")).pack(pady=30)
         
-        weak_topics = self.db.get_weak_topics(self.current_user)
-        if weak_topics:
-            tk.Label(self.gui.main_frame, text="Слабые темы:", font=("Arial", 14, "bold")).pack(pady=10)
-            for topic in weak_topics:
-                tk.Label(self.gui.main_frame, text=topic, font=("Arial", 12), fg="red").pack()
+        # Ответы записываются в базу и слабые темы загружаются в фоне; список заполняется по готовности
+        weak_topics = []
+        weak_frame = tk.Frame(self.gui.main_frame)
+        weak_frame.pack()
+        
+        def save_and_load_weak_topics(login):
+            try:
+                self.result_writer.flush()
+            except Exception as e:
+                # Ответы остаются в журнале и будут записаны позже
+                self.logger.log(f"Ошибка сохранения результатов теста: {str(e)}")
+            return self.db.get_weak_topics(login)
+        
+        def show_weak_topics(topics):
+            weak_topics.extend(topics)
+            if topics and weak_frame.winfo_exists():
+                tk.Label(weak_frame, text="Слабые темы:", font=("Arial", 14, "bold")).pack(pady=10)
+                for topic in topics:
+                    tk.Label(weak_frame, text=topic, font=("Arial", 12), fg="red").pack()
+        
+        self.run_db(save_and_load_weak_topics, self.current_user, on_success=show_weak_topics, key="weak_topics")
         
         tk.Button(self.gui.main_frame, text="Экспорт в .docx", font=("Arial", 12), 
                  command=lambda: self.report_generator.export_to_docx(self.current_user, score, weak_topics)).pack(pady=10)
@@ -688,43 +1112,59 @@ class DiscreteMathApp:
         self.gui.clear_frame()
         tk.Label(self.gui.main_frame, text="Статистика тестов", font=("Arial", 18, "bold")).pack(pady=30)
         
-        results = self.db.get_user_results(self.current_user)
-        topics = list(set([r[2] for r in results]))
-        success_rates = []
-        
-        for topic in topics:
-            topic_results = [r[3] for r in results if r[2] == topic]
-            success_rate = sum(1 for r in topic_results if r) / len(topic_results) * 100 if topic_results else 0
-            success_rates.append(success_rate)
+        chart_frame = tk.Frame(self.gui.main_frame)
+        chart_frame.pack(pady=10)
+        loading_label = tk.Label(chart_frame, text="Загрузка...", font=("Arial", 12))
+        loading_label.pack()
         
-        fig, ax = plt.subplots()
-        ax.bar(topics, success_rates)
-        ax.set_ylabel("Успешность (%)")
-        ax.set_title("Успешность по темам")
-        plt.xticks(rotation=45)
+        def draw_chart(data):
+            from charts import ChartView
+            loading_label.destroy()
+            chart = ChartView(chart_frame, ncols=2, figsize=(10, 4))
+            chart.pack()
+            self.draw_user_stats(chart, *data, "Успешность по темам")
         
-        canvas = FigureCanvasTkAgg(fig, master=self.gui.main_frame)
-        canvas.draw()
-        canvas.get_tk_widget().pack(pady=10)
+        self.run_db(self.load_user_stats, self.current_user, on_success=draw_chart, key="test_stats")
         
         tk.Button(self.gui.main_frame, text="Назад", font=("Arial", 12), 
                  command=self.show_test_results).pack(pady=10)
         self.logger.log("Открыта статистика тестов")
     
+    def load_user_stats(self, login):
+        """Сводка по темам и понедельная динамика за полгода (агрегируются в базе)"""
+        since = datetime.now() - timedelta(weeks=STATS_TREND_WEEKS)
+        return (self.db.get_topic_summary(login),
+                self.db.get_result_trend(login, "week", since))
+    
+    def draw_user_stats(self, chart, summary, trend, title):
+        """Успешность по темам и ее динамика по неделям на графике из двух осей"""
+        chart.set_bars(0, [s[0] for s in summary], [s[3] for s in summary], title=title,
+                       ylabel="Успешность (%)", ylim=(0, 100))
+        chart.set_line(1, [t[0] for t in trend], [t[3] for t in trend], title="По неделям", ylim=(0, 100))
+    
     def show_video_player(self):
         """Воспроизведение видео"""
         self.gui.clear_frame()
         tk.Label(self.gui.main_frame, text="Видеоуроки", font=("Arial", 18, "bold")).pack(pady=30)
         
-        materials = self.db.get_all_materials()
-        videos = [m for m in materials if m[3] and m[3].endswith((".mp4", ".avi"))]
+        videos_frame = tk.Frame(self.gui.main_frame)
+        videos_frame.pack(fill="x")
+        loading_label = tk.Label(videos_frame, text="Загрузка...", font=("Arial", 12))
+        loading_label.pack(pady=10)
+        
+        def show_videos(materials):
+            loading_label.destroy()
+            videos = [m for m in materials if m[4] and m[4].endswith((".mp4", ".avi"))]
+            for video in videos:
+                frame = tk.Frame(videos_frame)
+                frame.pack(fill="x", pady=5)
+                tk.Label(frame, text=video[1], font=("Arial", 12)).pack(side="left")
+                tk.Button(frame, text="Воспроизвести", font=("Arial", 12), 
+                         command=lambda v=video[4]: self.video_player.play(v)).pack(side="right")
+            # После первого просмотра libvlc загружен - остальные видео списка разбираются заранее
+            self.video_player.prepare([video[4] for video in videos])
         
-        for video in videos:
-            frame = tk.Frame(self.gui.main_frame)
-            frame.pack(fill="x", pady=5)
-            tk.Label(frame, text=video[1], font=("Arial", 12)).pack(side="left")
-            tk.Button(frame, text="Воспроизвести", font=("Arial", 12), 
-                     command=lambda v=video[3]: self.video_player.play_video(v)).pack(side="right")
+        self.run_db(self.load_material_list, on_success=show_videos, key="materials")
         
         tk.Button(self.gui.main_frame, text="Назад", font=("Arial", 12), 
                  command=self.show_main_menu).pack(pady=10)
@@ -750,22 +1190,60 @@ class DiscreteMathApp:
         self.gui.clear_frame()
         tk.Label(self.gui.main_frame, text="Личный кабинет", font=("Arial", 18, "bold")).pack(pady=30)
         
-        user_info = self.db.get_user_info(self.current_user)
-        tk.Label(self.gui.main_frame, text=f"Логин: {user_info[1]}", font=("Arial", 12)).pack(pady=5)
-        tk.Label(self.gui.main_frame, text=f"Роль: {user_info[3]}", font=("Arial", 12)).pack(pady=5)
-        tk.Label(self.gui.main_frame, text=f"Имя: {user_info[4]}", font=("Arial", 12)).pack(pady=5)
+        info_frame = tk.Frame(self.gui.main_frame)
+        info_frame.pack()
+        loading_label = tk.Label(info_frame, text="Загрузка...", font=("Arial", 12))
+        loading_label.pack(pady=5)
+        
+        def show_info(user_info):
+            loading_label.destroy()
+            tk.Label(info_frame, text=f"Логин: {user_info[1]}", font=("Arial", 12)).pack(pady=5)
+            tk.Label(info_frame, text=f"Роль: {user_info[3]}", font=("Arial", 12)).pack(pady=5)
+            tk.Label(info_frame, text=f"Имя: {user_info[4]}", font=("Arial", 12)).pack(pady=5)
+        
+        self.run_db(self.db.get_user_info, self.current_user, on_success=show_info, key="user_info")
         
-        results = self.db.get_user_results(self.current_user)
         tk.Label(self.gui.main_frame, text="Результаты тестов:", font=("Arial", 14, "bold")).pack(pady=10)
-        tree = ttk.Treeview(self.gui.main_frame, columns=("Topic", "Correct", "Date"), show="headings")
-        tree.heading("Topic", text="Тема")
-        tree.heading("Correct", text="Правильно")
-        tree.heading("Date", text="Дата")
+        # Недавние результаты читаются только из секций за нужные месяцы
+        periods = {"За месяц": 31, "За 3 месяца": 92, "За год": 366, "За все время": None}
+        period_combobox = ttk.Combobox(self.gui.main_frame, values=list(periods), state="readonly", font=("Arial", 12))
+        period_combobox.set("За 3 месяца")
+        period_combobox.pack(pady=5)
+        
+        # Фильтр читается в потоке Tk, страницы результатов загружаются в фоне
+        query = {"since": None}
+        
+        def update_period():
+            days = periods[period_combobox.get()]
+            query["since"] = datetime.now() - timedelta(days=days) if days else None
+        
+        def fetch_page(after, size):
+            return self.db.get_user_results_page(self.current_user, after, size, query["since"])
+        
+        update_period()
+        tree = LazyTreeview(self.gui.main_frame, ("Topic", "Correct", "Date"), ("Тема", "Правильно", "Дата"),
+                            fetch_page, lambda r: (r[2], "Да" if r[4] else "Нет", r[5]), lambda r: (r[5], r[0]),
+                            worker=self.db_worker, logger=self.logger)
         tree.pack(fill="both", expand=True, pady=10)
         
-        for result in results:
-            tree.insert("", "end", values=(result[2], "Да" if result[3] else "Нет", result[4]))
+        def reload_results():
+            update_period()
+            tree.reload()
+        
+        period_combobox.bind("<<ComboboxSelected>>", lambda e: reload_results())
         
+        def export_history():
+            def on_success(file_path):
+                messagebox.showinfo("Успех", f"История сохранена: {file_path}")
+                self.logger.log(f"Экспортирована история результатов: {file_path}")
+            
+            # Вся история читается с сервера порциями и сразу пишется в файл
+            self.run_db(lambda: self.report_generator.export_results_history(
+                self.current_user, self.db.iter_user_results(self.current_user)),
+                on_success=on_success, key="export_history")
+        
+        tk.Button(self.gui.main_frame, text="Экспорт истории в .xlsx", font=("Arial", 12), 
+                 command=export_history).pack(pady=10)
         tk.Button(self.gui.main_frame, text="Изменить пароль", font=("Arial", 12), 
                  command=self.show_change_password).pack(pady=10)
         tk.Button(self.gui.main_frame, text="Назад", font=("Arial", 12), 
@@ -798,14 +1276,18 @@ class DiscreteMathApp:
             self.logger.log("Ошибка: пароли не совпадают при изменении")
             return
         hashed_password = hashlib.sha256(password.encode()).hexdigest()
-        try:
-            self.db.update_user(self.current_user, hashed_password, None, None)
+        
+        def on_success(_):
             messagebox.showinfo("Успех", "Пароль изменен")
             self.logger.log(f"Изменен пароль для {self.current_user}")
             self.show_user_profile()
-        except Exception as e:
+        
+        def on_error(e):
             messagebox.showerror("Ошибка", f"Не удалось изменить пароль: {str(e)}")
             self.logger.log(f"Ошибка изменения пароля для {self.current_user}: {str(e)}")
+        
+        self.run_db(self.db.update_user, self.current_user, hashed_password, None, None,
+                    on_success=on_success, on_error=on_error, key="save_user")
     
     def show_settings(self):
         """Настройки приложения"""
@@ -852,41 +1334,137 @@ class DiscreteMathApp:
         self.gui.clear_frame()
         tk.Label(self.gui.main_frame, text="Аналитика результатов", font=("Arial", 18, "bold")).pack(pady=30)
         
-        users = self.db.get_all_users()
         tk.Label(self.gui.main_frame, text="Выберите пользователя:", font=("Arial", 12)).pack()
-        user_combobox = ttk.Combobox(self.gui.main_frame, values=[u[1] for u in users], state="readonly", font=("Arial", 12))
-        user_combobox.pack(pady=10)
+        user_tree = self.user_picker()
         
         def show_user_stats():
-            results = self.db.get_user_results(user_combobox.get())
-            topics = list(set([r[2] for r in results]))
-            success_rates = []
-            
-            for topic in topics:
-                topic_results = [r[3] for r in results if r[2] == topic]
-                success_rate = sum(1 for r in topic_results if r) / len(topic_results) * 100 if topic_results else 0
-                success_rates.append(success_rate)
-            
-            fig, ax = plt.subplots()
-            ax.bar(topics, success_rates)
-            ax.set_ylabel("Успешность (%)")
-            ax.set_title(f"Успешность по темам для {user_combobox.get()}")
-            plt.xticks(rotation=45)
-            
-            for widget in self.gui.main_frame.winfo_children():
-                if isinstance(widget, FigureCanvasTkAgg):
-                    widget.destroy()
-            
-            canvas = FigureCanvasTkAgg(fig, master=self.gui.main_frame)
-            canvas.draw()
-            canvas.get_tk_widget().pack(pady=10)
+            user = user_tree.selected_row()
+            if not user:
+                messagebox.showerror("Ошибка", "Выберите пользователя")
+                return
+            self.run_db(self.load_user_stats, user[1], on_success=lambda data: draw_chart(user, *data),
+                        key="user_stats")
+        
+        # График создается один раз на экран и обновляется при выборе другого пользователя
+        chart = {}
+        
+        def draw_chart(user, summary, trend):
+            if "view" not in chart:
+                from charts import ChartView
+                chart["view"] = ChartView(chart_frame, ncols=2, figsize=(10, 4))
+                chart["view"].pack()
+            self.draw_user_stats(chart["view"], summary, trend, f"Успешность по темам для {user[1]}")
         
         tk.Button(self.gui.main_frame, text="Показать статистику", font=("Arial", 12), 
                  command=show_user_stats).pack(pady=10)
+        tk.Button(self.gui.main_frame, text="Аналитика по группе", font=("Arial", 12), 
+                 command=self.show_cohort_analytics).pack(pady=10)
         tk.Button(self.gui.main_frame, text="Назад", font=("Arial", 12), 
                  command=self.show_main_menu).pack(pady=10)
+        chart_frame = tk.Frame(self.gui.main_frame)
+        chart_frame.pack(pady=10)
         self.logger.log("Открыт экран аналитики")
     
+    def show_cohort_analytics(self):
+        """Аналитика по всей группе: тепловая карта студент x тема, распределение и трудные вопросы"""
+        self.gui.clear_frame()
+        tk.Label(self.gui.main_frame, text="Аналитика по группе", font=("Arial", 18, "bold")).pack(pady=10)
+        
+        controls = tk.Frame(self.gui.main_frame)
+        controls.pack(pady=5)
+        orders = {"Сначала слабые": "score", "По алфавиту": "name"}
+        tk.Label(controls, text="Порядок:", font=("Arial", 10)).pack(side="left", padx=3)
+        order_combobox = ttk.Combobox(controls, values=list(orders), state="readonly", width=16)
+        order_combobox.set("Сначала слабые")
+        order_combobox.pack(side="left", padx=3)
+        tk.Label(controls, text="Категория:", font=("Arial", 10)).pack(side="left", padx=3)
+        category_combobox = ttk.Combobox(controls, values=["Все"], state="readonly", width=24)
+        category_combobox.set("Все")
+        category_combobox.pack(side="left", padx=3)
+        
+        chart_frame = tk.Frame(self.gui.main_frame)
+        chart_frame.pack(fill="both", expand=True)
+        loading_label = tk.Label(chart_frame, text="Загрузка...", font=("Arial", 12))
+        loading_label.pack()
+        
+        tk.Label(self.gui.main_frame, text=f"Чаще всего ошибаются (за {COHORT_MISSED_DAYS} дней):",
+                 font=("Arial", 12, "bold")).pack()
+        missed_tree = ttk.Treeview(self.gui.main_frame, columns=("Topic", "Question", "Answers", "Misses"),
+                                   show="headings", height=5)
+        for column, heading, width in (("Topic", "Тема", 160), ("Question", "Вопрос", 480),
+                                       ("Answers", "Ответов", 80), ("Misses", "Ошибок", 80)):
+            missed_tree.heading(column, text=heading)
+            missed_tree.column(column, width=width)
+        missed_tree.pack(fill="x", padx=10, pady=5)
+        
+        state = {"matrix": None, "topics": None}
+        from charts import ChartView
+        chart = ChartView(chart_frame, ncols=2, figsize=(11, 4.5), width_ratios=[3, 1])
+        
+        def render(*_):
+            matrix = state["matrix"]
+            if matrix is None:
+                return
+            if state["topics"] is not None:
+                matrix = matrix.select(topics=state["topics"])
+            order = orders[order_combobox.get()]
+            self.draw_cohort(chart, matrix.sorted(students=order, topics=order))
+        
+        def show_data(data):
+            matrix, missed = data
+            loading_label.destroy()
+            chart.pack(fill="both", expand=True)
+            state["matrix"] = matrix
+            for row in missed:
+                missed_tree.insert("", "end", values=(row[1], row[2], row[3], row[4]))
+            render()
+        
+        def select_category(_):
+            category = category_combobox.get()
+            if category == "Все":
+                state["topics"] = None
+                render()
+                return
+            
+            def show_topics(topics):
+                state["topics"] = topics
+                render()
+            self.run_db(self.db.get_topics_by_category, category, on_success=show_topics, key="cohort_topics")
+        
+        order_combobox.bind("<<ComboboxSelected>>", render)
+        category_combobox.bind("<<ComboboxSelected>>", select_category)
+        self.run_db(self.db.get_categories, on_success=lambda categories: category_combobox.configure(
+            values=["Все"] + list(categories)), key="cohort_categories")
+        since = date.today() - timedelta(days=COHORT_MISSED_DAYS)
+        self.run_db(self.cohort_analytics.get, since, on_success=show_data, key="cohort")
+        
+        tk.Button(self.gui.main_frame, text="Назад", font=("Arial", 12), 
+                 command=self.show_analytics).pack(pady=10)
+        self.logger.log("Открыта аналитика по группе")
+    
+    def draw_cohort(self, chart, matrix):
+        """Тепловая карта успешности студент x тема и распределение общего результата"""
+        ax = chart.axes[0]
+        chart.set_image(0, matrix.rates, colorbar_label="Успешность (%)", cmap="RdYlGn", vmin=0, vmax=100)
+        # Подписи осей читаемы только для небольших групп
+        if matrix.shape[0] <= COHORT_MAX_LABELS:
+            ax.set_yticks(range(matrix.shape[0]), matrix.logins, fontsize=7)
+            ax.set_ylabel("")
+        else:
+            ax.set_yticks([])
+            ax.set_ylabel(f"Студенты ({matrix.shape[0]})")
+        if matrix.shape[1] <= COHORT_MAX_LABELS:
+            ax.set_xticks(range(matrix.shape[1]), matrix.topics, fontsize=7, rotation=90)
+            ax.set_xlabel("")
+        else:
+            ax.set_xticks([])
+            ax.set_xlabel(f"Темы ({matrix.shape[1]})")
+        ax.set_title("Успешность по темам")
+        counts, edges = matrix.score_distribution()
+        chart.set_bars(1, [f"{low:.0f}-{high:.0f}" for low, high in zip(edges[:-1], edges[1:])], counts,
+                       title="Распределение", ylabel="Студентов")
+        chart.redraw(layout=True)
+    
     def show_help(self):
         """Справка по системе"""
         self.gui.clear_frame()
@@ -909,6 +1487,17 @@ class DiscreteMathApp:
         self.logger.log("Открыт экран справки")
 
 if __name__ == "__main__":
+    # python main.py --profile-startup [файл] - профиль времени запуска и импортов
+    if "--profile-startup" in sys.argv:
+        from startup_profile import run_profile
+        run_profile(*sys.argv[sys.argv.index("--profile-startup") + 1:][:1])
+        sys.exit(0)
     root = tk.Tk()
     app = DiscreteMathApp(root)
+    if "--startup-probe" in sys.argv:
+        from startup_profile import report_ready
+        root.update()
+        report_ready()
+        app.on_close()
+        sys.exit(0)
     root.mainloop()
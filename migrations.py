@@ -0,0 +1,253 @@
+# migrations.py
+# Упорядоченные шаги миграции схемы. Каждый шаг идемпотентен, чтобы его можно
+# было безопасно применить к базе, созданной старой версией приложения.
+
+from datetime import timedelta
+
+# На сколько месяцев вперед заранее создаются секции test_results
+PARTITION_MONTHS_AHEAD = 3
+
+# Схема первой версии приложения. Не меняется: новые таблицы, колонки и индексы
+# добавляются только следующими шагами, чтобы новая и обновленная базы совпадали
+BASE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS users (
+        id SERIAL PRIMARY KEY,
+        login VARCHAR(50) UNIQUE,
+        password VARCHAR(64),
+        role VARCHAR(20),
+        name VARCHAR(100)
+    );
+    CREATE INDEX IF NOT EXISTS idx_users_login ON users(login);
+    CREATE TABLE IF NOT EXISTS materials (
+        id SERIAL PRIMARY KEY,
+        topic VARCHAR(100),
+        content TEXT,
+        file_path VARCHAR(255),
+        category VARCHAR(50)
+    );
+    CREATE INDEX IF NOT EXISTS idx_materials_topic ON materials(topic);
+    CREATE TABLE IF NOT EXISTS questions (
+        id SERIAL PRIMARY KEY,
+        topic VARCHAR(100),
+        question TEXT,
+        correct_answer VARCHAR(255),
+        wrong_answers TEXT[],
+        question_type VARCHAR(50),
+        category VARCHAR(50)
+    );
+    CREATE INDEX IF NOT EXISTS idx_questions_topic ON questions(topic);
+    CREATE TABLE IF NOT EXISTS test_results (
+        id SERIAL PRIMARY KEY,
+        user_login VARCHAR(50),
+        topic VARCHAR(100),
+        category VARCHAR(50),
+        correct BOOLEAN,
+        timestamp TIMESTAMP
+    );
+    CREATE INDEX IF NOT EXISTS idx_test_results_user ON test_results(user_login);
+    CREATE TABLE IF NOT EXISTS categories (
+        id SERIAL PRIMARY KEY,
+        name VARCHAR(50) UNIQUE
+    );
+    CREATE TABLE IF NOT EXISTS user_progress (
+        id SERIAL PRIMARY KEY,
+        user_login VARCHAR(50),
+        topic VARCHAR(100),
+        progress INTEGER
+    );
+    CREATE TABLE IF NOT EXISTS logs (
+        id SERIAL PRIMARY KEY,
+        user_login VARCHAR(50),
+        action TEXT,
+        timestamp TIMESTAMP
+    );
+"""
+
+def create_base_schema(db, cursor):
+    """Базовые таблицы приложения (схема первой версии)"""
+    cursor.execute(BASE_SCHEMA)
+
+def insert_seed_data(db, cursor):
+    """Тестовые пользователи, категории, материалы и вопросы"""
+    db._insert_test_data(cursor)
+
+def add_query_indexes(db, cursor):
+    """Индексы под частые запросы"""
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_test_results_user_time ON test_results(user_login, timestamp DESC);
+        CREATE INDEX IF NOT EXISTS idx_test_results_user_topic ON test_results(user_login, topic);
+        CREATE INDEX IF NOT EXISTS idx_questions_category_topic ON questions(category, topic);
+        CREATE INDEX IF NOT EXISTS idx_materials_category ON materials(category);
+        -- Покрываются уникальным ограничением и составным индексом
+        DROP INDEX IF EXISTS idx_users_login;
+        DROP INDEX IF EXISTS idx_test_results_user;
+    """)
+
+def add_unique_constraints(db, cursor):
+    """Уникальность прогресса по (пользователь, тема) для ON CONFLICT"""
+    cursor.execute("""
+        DELETE FROM user_progress a
+        USING user_progress b
+        WHERE a.user_login = b.user_login AND a.topic = b.topic AND a.id < b.id
+    """)
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_user_progress_user_topic ON user_progress(user_login, topic)
+    """)
+
+def add_question_sampling(db, cursor):
+    """Связь результатов с вопросами и индексы для выборки вопросов"""
+    cursor.execute("""
+        ALTER TABLE test_results ADD COLUMN IF NOT EXISTS question_id INTEGER;
+        CREATE INDEX IF NOT EXISTS idx_questions_topic_id ON questions(topic, id);
+        DROP INDEX IF EXISTS idx_questions_topic;
+        CREATE INDEX IF NOT EXISTS idx_test_results_user_question ON test_results(user_login, question_id)
+            WHERE correct;
+    """)
+
+def add_mixed_test_index(db, cursor):
+    """Индекс для смешанных тестов по категории"""
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_questions_category_topic_id ON questions(category, topic, id);
+        DROP INDEX IF EXISTS idx_questions_category_topic;
+    """)
+
+def add_keyset_indexes(db, cursor):
+    """Индекс для постраничного чтения результатов по (timestamp, id)"""
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_test_results_user_time_id ON test_results(user_login, timestamp DESC, id DESC);
+        DROP INDEX IF EXISTS idx_test_results_user_time;
+    """)
+
+def add_question_content_hash(db, cursor):
+    """Хэш содержимого вопроса для дедупликации при импорте"""
+    cursor.execute("""
+        ALTER TABLE questions ADD COLUMN IF NOT EXISTS content_hash TEXT
+            GENERATED ALWAYS AS (md5(coalesce(topic, '') || chr(31) || coalesce(question, '') || chr(31)
+                                     || coalesce(correct_answer, ''))) STORED
+    """)
+    # Ответы на удаляемые дубликаты переносятся на оставшийся вопрос
+    cursor.execute("""
+        WITH dups AS (
+            SELECT id, MIN(id) OVER (PARTITION BY content_hash) AS keep_id FROM questions
+        )
+        UPDATE test_results r SET question_id = d.keep_id
+        FROM dups d
+        WHERE r.question_id = d.id AND d.id <> d.keep_id
+    """)
+    cursor.execute("""
+        DELETE FROM questions q USING questions k
+        WHERE q.content_hash = k.content_hash AND q.id > k.id
+    """)
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS uq_questions_content_hash ON questions(content_hash)")
+
+def partition_test_results(db, cursor):
+    """Перевод test_results на помесячные секции по timestamp
+
+    В секционированной таблице timestamp обязателен, поэтому строкам без
+    времени присваивается 'epoch' (1970-01-01) и они попадают в секцию по
+    умолчанию; их количество выводится при миграции.
+    """
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('test_results')")
+    if cursor.fetchone()[0] == "p":
+        return
+    cursor.execute("""
+        ALTER TABLE test_results RENAME TO test_results_unpartitioned;
+        ALTER INDEX test_results_pkey RENAME TO test_results_unpartitioned_pkey;
+        CREATE TABLE test_results (
+            id INTEGER NOT NULL DEFAULT nextval('test_results_id_seq'),
+            user_login VARCHAR(50),
+            topic VARCHAR(100),
+            category VARCHAR(50),
+            correct BOOLEAN,
+            timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            question_id INTEGER,
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp);
+        CREATE TABLE test_results_default PARTITION OF test_results DEFAULT;
+    """)
+    # Секции под месяцы, за которые уже есть данные, и под ближайшие месяцы
+    cursor.execute("""
+        SELECT DISTINCT date_trunc('month', timestamp)::date FROM test_results_unpartitioned
+        WHERE timestamp IS NOT NULL
+    """)
+    months = {row[0] for row in cursor.fetchall()}
+    cursor.execute("SELECT date_trunc('month', now())::date")
+    month = cursor.fetchone()[0]
+    for _ in range(PARTITION_MONTHS_AHEAD + 1):
+        months.add(month)
+        month = (month + timedelta(days=32)).replace(day=1)
+    for month in sorted(months):
+        db._create_partition(cursor, month)
+    cursor.execute("SELECT COUNT(*) FROM test_results_unpartitioned WHERE timestamp IS NULL")
+    without_time = cursor.fetchone()[0]
+    if without_time:
+        print(f"Результатов без времени: {without_time}, им присвоено время 'epoch' (секция по умолчанию)")
+    cursor.execute("""
+        INSERT INTO test_results (id, user_login, topic, category, correct, timestamp, question_id)
+        SELECT id, user_login, topic, category, correct, COALESCE(timestamp, 'epoch'), question_id
+        FROM test_results_unpartitioned
+    """)
+    cursor.execute("""
+        ALTER SEQUENCE test_results_id_seq OWNED BY test_results.id;
+        DROP TABLE test_results_unpartitioned;
+        CREATE INDEX idx_test_results_user_topic ON test_results(user_login, topic);
+        CREATE INDEX idx_test_results_user_time_id ON test_results(user_login, timestamp DESC, id DESC);
+        CREATE INDEX idx_test_results_user_question ON test_results(user_login, question_id) WHERE correct;
+    """)
+
+def add_log_indexes(db, cursor):
+    """Машина-источник в logs и индексы для поиска по пользователю и времени"""
+    cursor.execute("""
+        ALTER TABLE logs ADD COLUMN IF NOT EXISTS host VARCHAR(100);
+        CREATE INDEX IF NOT EXISTS idx_logs_user_time ON logs(user_login, timestamp DESC, id DESC);
+        CREATE INDEX IF NOT EXISTS idx_logs_time ON logs(timestamp DESC, id DESC);
+    """)
+
+def add_material_list_index(db, cursor):
+    """Индекс для постраничного списка материалов по категории"""
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_materials_category_id ON materials(category, id);
+    """)
+
+def add_result_client_id(db, cursor):
+    """Идентификатор ответа от клиента, чтобы повторная отправка из журнала не дублировала строки"""
+    # В уникальный индекс секционированной таблицы должен входить ключ секционирования
+    cursor.execute("""
+        ALTER TABLE test_results ADD COLUMN IF NOT EXISTS client_id UUID;
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_test_results_client_id ON test_results(client_id, timestamp);
+    """)
+
+def add_topic_stats(db, cursor):
+    """Сводная статистика по темам, обновляемая вместе с test_results"""
+    cursor.execute("SELECT to_regclass('user_topic_stats')")
+    if cursor.fetchone()[0] is not None:
+        # В базах, созданных до заморозки базовой схемы, таблица появилась в шаге 1
+        return
+    cursor.execute("""
+        CREATE TABLE user_topic_stats (
+            user_login VARCHAR(50),
+            topic VARCHAR(100),
+            attempts INTEGER NOT NULL DEFAULT 0,
+            correct_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_login, topic)
+        )
+    """)
+    db._rebuild_topic_stats(cursor)
+
+MIGRATIONS = [
+    (1, "Базовая схема", create_base_schema),
+    (2, "Тестовые данные", insert_seed_data),
+    (3, "Индексы для частых запросов", add_query_indexes),
+    (4, "Уникальные ограничения user_progress", add_unique_constraints),
+    (5, "Выборка вопросов на стороне базы", add_question_sampling),
+    (6, "Индекс для смешанных тестов", add_mixed_test_index),
+    (7, "Индекс для постраничного чтения результатов", add_keyset_indexes),
+    (8, "Хэш содержимого вопросов", add_question_content_hash),
+    (9, "Помесячные секции test_results", partition_test_results),
+    (10, "Индексы таблицы логов", add_log_indexes),
+    (11, "Индекс списка материалов", add_material_list_index),
+    (12, "Идентификатор ответа от клиента", add_result_client_id),
+    (13, "Сводная статистика по темам", add_topic_stats),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
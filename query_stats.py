@@ -0,0 +1,213 @@
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+try:
+    import psycopg2.extensions
+    import psycopg2.extras
+except ImportError:
+    # Без драйвера PostgreSQL (только SQLite) курсор PostgreSQL не используется
+    psycopg2 = None
+
+# Верхние границы корзин гистограммы задержек, мс
+BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float("inf")]
+
+# Только такие запросы можно безопасно выполнять через EXPLAIN ANALYZE
+READ_ONLY_QUERY = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+WRITE_KEYWORD = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE)\b", re.IGNORECASE)
+# Строковые литералы в плане: туда подставлены значения параметров
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+# Числовые литералы (не части имен вроде test_results_2024_09 и не $1)
+NUMBER_LITERAL = re.compile(r"(?<![\w$.])[-+]?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?(?![\w.])")
+
+def mask_literals(query):
+    """Замена строковых и числовых литералов в тексте запроса на ?"""
+    return NUMBER_LITERAL.sub("?", STRING_LITERAL.sub("'?'", query))
+
+def execute_values(cursor, query, argslist, **kwargs):
+    """psycopg2.extras.execute_values, при котором в журнал медленных запросов попадает шаблон
+
+    execute_values подставляет значения в текст запроса (mogrify) и вызывает
+    execute без параметров, поэтому курсору передается исходный шаблон.
+    """
+    cursor.template = query
+    try:
+        return psycopg2.extras.execute_values(cursor, query, argslist, **kwargs)
+    finally:
+        cursor.template = None
+
+class QueryStats:
+    def __init__(self, slow_threshold_ms=200, slow_log_file="logs/slow_queries.log", explain_slow=False):
+        """Сбор статистики запросов к базе данных по методам Database"""
+        self.slow_threshold_ms = slow_threshold_ms
+        self.slow_log_file = slow_log_file
+        self.explain_slow = explain_slow
+        self.lock = threading.Lock()
+        self.methods = {}
+        self.slow_count = 0
+        self.started = datetime.now()
+        log_dir = os.path.dirname(slow_log_file)
+        if log_dir and not os.path.exists(log_dir):
+            os.makedirs(log_dir)
+
+    def _method_stats(self, method):
+        """Счетчики одного метода (создаются при первом обращении)"""
+        stats = self.methods.get(method)
+        if stats is None:
+            stats = {"calls": 0, "errors": 0, "rows": 0, "total_ms": 0.0, "max_ms": 0.0,
+                     "buckets": [0] * len(BUCKETS_MS)}
+            self.methods[method] = stats
+        return stats
+
+    def record(self, method, duration_ms, rows, error=False):
+        """Учет одного выполненного запроса"""
+        with self.lock:
+            stats = self._method_stats(method)
+            stats["calls"] += 1
+            stats["total_ms"] += duration_ms
+            stats["max_ms"] = max(stats["max_ms"], duration_ms)
+            if error:
+                stats["errors"] += 1
+            elif rows and rows > 0:
+                stats["rows"] += rows
+            for i, bound in enumerate(BUCKETS_MS):
+                if duration_ms <= bound:
+                    stats["buckets"][i] += 1
+                    break
+
+    def is_slow(self, duration_ms):
+        """Превышает ли запрос порог медленного"""
+        return self.slow_threshold_ms is not None and duration_ms >= self.slow_threshold_ms
+
+    def can_explain(self, query):
+        """Можно ли выполнить EXPLAIN ANALYZE без побочных эффектов"""
+        return self.explain_slow and bool(READ_ONLY_QUERY.match(query)) and not WRITE_KEYWORD.search(query)
+
+    def redact(self, params):
+        """Замена значений параметров их типами"""
+        if params is None:
+            return None
+        if isinstance(params, dict):
+            return {key: f"<{type(value).__name__}>" for key, value in params.items()}
+        if isinstance(params, (list, tuple)):
+            return [f"<{type(value).__name__}>" for value in params]
+        return f"<{type(params).__name__}>"
+
+    def log_slow(self, method, query, params, duration_ms, rows, plan=None):
+        """Запись медленного запроса в журнал
+
+        Без params значения могли быть подставлены прямо в текст (execute_values,
+        mogrify), поэтому литералы в тексте заменяются на ?.
+        """
+        if params is None:
+            query = mask_literals(query)
+        entry = {
+            "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "method": method,
+            "duration_ms": round(duration_ms, 3),
+            "rows": rows,
+            "query": " ".join(query.split()),
+            "params": self.redact(params),
+        }
+        if plan:
+            entry["plan"] = plan
+        with self.lock:
+            self.slow_count += 1
+            with open(self.slow_log_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def _percentile(self, buckets, calls, fraction):
+        """Оценка перцентиля по гистограмме (верхняя граница корзины)"""
+        if not calls:
+            return 0.0
+        target = calls * fraction
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, buckets):
+            seen += count
+            if seen >= target:
+                return bound
+        return BUCKETS_MS[-1]
+
+    def get_stats(self):
+        """Сводка по методам: вызовы, задержки, строки, ошибки"""
+        with self.lock:
+            result = {}
+            for method, stats in sorted(self.methods.items()):
+                calls = stats["calls"]
+                result[method] = {
+                    "calls": calls,
+                    "errors": stats["errors"],
+                    "rows": stats["rows"],
+                    "avg_ms": stats["total_ms"] / calls if calls else 0.0,
+                    "p50_ms": self._percentile(stats["buckets"], calls, 0.5),
+                    "p95_ms": self._percentile(stats["buckets"], calls, 0.95),
+                    "max_ms": stats["max_ms"],
+                    "histogram": {("inf" if bound == float("inf") else str(bound)): count
+                                  for bound, count in zip(BUCKETS_MS, stats["buckets"])},
+                }
+            return result
+
+    def dump_json(self, file_path, extra=None):
+        """Сохранение статистики в JSON"""
+        data = {
+            "since": self.started.strftime("%Y-%m-%d %H:%M:%S"),
+            "dumped_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "slow_threshold_ms": self.slow_threshold_ms,
+            "slow_queries": self.slow_count,
+            "methods": self.get_stats(),
+        }
+        if extra:
+            data.update(extra)
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
+        return file_path
+
+    def reset(self):
+        """Сброс накопленной статистики"""
+        with self.lock:
+            self.methods = {}
+            self.slow_count = 0
+            self.started = datetime.now()
+
+class InstrumentedCursor(psycopg2.extensions.cursor if psycopg2 is not None else object):
+    """Курсор, замеряющий каждый execute; method и stats задает Database._cursor"""
+    method = "unknown"
+    stats = None
+    # Шаблон запроса до подстановки значений (задает execute_values этого модуля)
+    template = None
+
+    def execute(self, query, vars=None):
+        if self.stats is None:
+            return super().execute(query, vars)
+        started = time.perf_counter()
+        try:
+            result = super().execute(query, vars)
+        except Exception:
+            self.stats.record(self.method, (time.perf_counter() - started) * 1000, 0, error=True)
+            raise
+        duration_ms = (time.perf_counter() - started) * 1000
+        self.stats.record(self.method, duration_ms, self.rowcount)
+        if self.stats.is_slow(duration_ms):
+            text = query.decode() if isinstance(query, bytes) else str(query)
+            plan = None
+            if self.name is None and self.stats.can_explain(text):
+                plan = self._explain(text, vars)
+            self.stats.log_slow(self.method, self.template or text, vars, duration_ms, self.rowcount, plan)
+        return result
+
+    def _explain(self, query, vars):
+        """План выполнения медленного запроса (отдельным курсором того же соединения)"""
+        with self.connection.cursor() as cursor:
+            # Точка сохранения, чтобы сбой EXPLAIN не прервал основную транзакцию
+            cursor.execute("SAVEPOINT explain_slow_query")
+            try:
+                cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT TEXT) " + query, vars)
+                plan = [STRING_LITERAL.sub("'?'", row[0]) for row in cursor.fetchall()]
+                cursor.execute("RELEASE SAVEPOINT explain_slow_query")
+                return plan
+            except psycopg2.Error as e:
+                cursor.execute("ROLLBACK TO SAVEPOINT explain_slow_query")
+                return [f"EXPLAIN не выполнен: {str(e)}"]
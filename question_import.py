@@ -0,0 +1,96 @@
+import csv
+import json
+import os
+import time
+
+QUESTION_TYPES = ["Множественный выбор", "Открытый вопрос"]
+COLUMNS = ["topic", "question", "correct_answer", "wrong_answers", "question_type", "category"]
+# Ограничения длины из схемы таблицы questions
+MAX_LENGTHS = {"topic": 100, "correct_answer": 255, "question_type": 50, "category": 50}
+
+class QuestionImporter:
+    def __init__(self, db, max_errors=20):
+        """Массовый импорт банка вопросов из CSV, JSON/JSONL или XLSX
+
+        Ожидаемые колонки: topic, question, correct_answer, wrong_answers,
+        question_type, category. В CSV и XLSX неправильные ответы
+        разделяются точкой с запятой, в JSON это может быть список.
+        """
+        self.db = db
+        self.max_errors = max_errors
+
+    def read_rows(self, file_path):
+        """Потоковое чтение строк файла в виде словарей"""
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension == ".csv":
+            with open(file_path, "r", encoding="utf-8-sig", newline="") as f:
+                yield from csv.DictReader(f)
+        elif extension == ".jsonl":
+            with open(file_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+        elif extension == ".json":
+            with open(file_path, "r", encoding="utf-8") as f:
+                yield from json.load(f)
+        elif extension == ".xlsx":
+            import openpyxl
+            wb = openpyxl.load_workbook(file_path, read_only=True)
+            try:
+                rows = wb.active.iter_rows(values_only=True)
+                header = [str(h).strip() if h is not None else "" for h in next(rows, [])]
+                for values in rows:
+                    yield dict(zip(header, values))
+            finally:
+                wb.close()
+        else:
+            raise ValueError(f"Неподдерживаемый формат файла: {extension}")
+
+    def normalize(self, raw):
+        """Проверка и приведение строки; возвращает (кортеж, ошибка)"""
+        row = {column: raw.get(column) for column in COLUMNS}
+        for column in ("topic", "question", "correct_answer", "question_type", "category"):
+            value = row[column]
+            row[column] = str(value).strip() if value is not None else ""
+        wrong_answers = row["wrong_answers"]
+        if isinstance(wrong_answers, str):
+            wrong_answers = [a.strip() for a in wrong_answers.split(";") if a.strip()]
+        elif wrong_answers is None:
+            wrong_answers = []
+        else:
+            wrong_answers = [str(a).strip() for a in wrong_answers if str(a).strip()]
+        if not row["topic"] or not row["question"] or not row["correct_answer"]:
+            return None, "не заполнены тема, вопрос или правильный ответ"
+        if not row["question_type"]:
+            row["question_type"] = QUESTION_TYPES[0] if wrong_answers else QUESTION_TYPES[1]
+        if row["question_type"] not in QUESTION_TYPES:
+            return None, f"неизвестный тип вопроса '{row['question_type']}'"
+        for column, limit in MAX_LENGTHS.items():
+            if len(row[column]) > limit:
+                return None, f"поле {column} длиннее {limit} символов"
+        return (row["topic"], row["question"], row["correct_answer"], wrong_answers,
+                row["question_type"], row["category"] or None), None
+
+    def import_file(self, file_path):
+        """Импорт файла; возвращает отчет с количеством строк и скоростью"""
+        report = {"file": file_path, "rows": 0, "valid": 0, "invalid": 0, "inserted": 0, "duplicates": 0,
+                  "errors": []}
+
+        def valid_rows():
+            for number, raw in enumerate(self.read_rows(file_path), start=1):
+                report["rows"] += 1
+                row, error = self.normalize(raw)
+                if error:
+                    report["invalid"] += 1
+                    if len(report["errors"]) < self.max_errors:
+                        report["errors"].append(f"Строка {number}: {error}")
+                    continue
+                report["valid"] += 1
+                yield row
+
+        started = time.perf_counter()
+        report["inserted"] = self.db.import_questions(valid_rows())
+        report["duplicates"] = report["valid"] - report["inserted"]
+        report["seconds"] = time.perf_counter() - started
+        report["rows_per_second"] = report["rows"] / report["seconds"] if report["seconds"] else 0.0
+        return report
@@ -1,5 +1,3 @@
-from docx import Document
-import openpyxl
 from datetime import datetime
 import os
 
@@ -13,6 +11,8 @@ class ReportGenerator:
     def export_to_docx(self, user_login, score, weak_topics):
         """Экспорт отчета в .docx"""
         try:
+            # python-docx загружается только при первом экспорте
+            from docx import Document
             doc = Document()
             doc.add_heading(f"Отчет по результатам теста для {user_login}", 0)
             doc.add_paragraph(f"Дата: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -32,6 +32,7 @@ class ReportGenerator:
     def export_to_xlsx(self, user_login, score, weak_topics):
         """Экспорт отчета в .xlsx"""
         try:
+            import openpyxl
             wb = openpyxl.Workbook()
             ws = wb.active
             ws.title = "Отчет"
@@ -52,4 +53,24 @@ class ReportGenerator:
             wb.save(file_path)
             return file_path
         except Exception as e:
-            raise Exception(f"Ошибка при создании .xlsx отчета: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Ошибка при создании .xlsx отчета: {str(e)}")
+    
+    def export_results_history(self, user_login, results):
+        """Экспорт всей истории ответов в .xlsx
+
+        results - итератор строк test_results (например, iter_user_results):
+        строки пишутся по одной в режиме write_only и не копятся в памяти.
+        """
+        try:
+            import openpyxl
+            wb = openpyxl.Workbook(write_only=True)
+            ws = wb.create_sheet("История")
+            ws.append(["Тема", "Категория", "Правильно", "Дата"])
+            for row in results:
+                ws.append([row[2], row[3], "Да" if row[4] else "Нет", row[5]])
+            
+            file_path = os.path.join(self.reports_dir, f"history_{user_login}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx")
+            wb.save(file_path)
+            return file_path
+        except Exception as e:
+            raise Exception(f"Ошибка при экспорте истории результатов: {str(e)}")
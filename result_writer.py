@@ -0,0 +1,117 @@
+import json
+import os
+import threading
+import uuid
+from datetime import datetime
+
+class ResultWriter:
+    def __init__(self, db, journal_file="pending_results.jsonl", max_batch=100, flush_interval=10):
+        """Инициализация буферизованной записи результатов тестов
+
+        Ответы копятся в памяти и одновременно дописываются в локальный журнал,
+        поэтому при аварийном закрытии приложения они не теряются и будут
+        записаны в базу при следующем запуске. У каждого ответа есть client_id:
+        если сбой случился после записи пачки, но до очистки журнала, повторно
+        отправленные ответы база пропускает.
+        """
+        self.db = db
+        self.journal_file = journal_file
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.replay_journal()
+        self.thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self.thread.start()
+
+    def replay_journal(self):
+        """Загрузка ответов, не записанных в базу в прошлый раз"""
+        if not os.path.exists(self.journal_file):
+            return
+        with open(self.journal_file, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    item = json.loads(line)
+                except ValueError:
+                    # Последняя строка могла быть записана не полностью
+                    continue
+                # В журналах прежней версии client_id нет
+                self.buffer.append((item["user_login"], item["topic"], item["category"], item["correct"],
+                                    datetime.fromisoformat(item["timestamp"]), item.get("question_id"),
+                                    item.get("client_id") or str(uuid.uuid4())))
+        if self.buffer:
+            print(f"Восстановлено неотправленных ответов: {len(self.buffer)}")
+
+    def _journal_line(self, row):
+        """Строка журнала для одного ответа"""
+        return json.dumps({"user_login": row[0], "topic": row[1], "category": row[2],
+                           "correct": row[3], "timestamp": row[4].isoformat(), "question_id": row[5],
+                           "client_id": row[6]},
+                          ensure_ascii=False) + "\n"
+
+    def add(self, user_login, topic, category, correct, question_id=None):
+        """Добавление ответа в буфер"""
+        row = (user_login, topic, category, correct, datetime.now(), question_id, str(uuid.uuid4()))
+        with self.lock:
+            self.buffer.append(row)
+            with open(self.journal_file, "a", encoding="utf-8") as f:
+                f.write(self._journal_line(row))
+                f.flush()
+                os.fsync(f.fileno())
+            full = len(self.buffer) >= self.max_batch
+        if full:
+            threading.Thread(target=self.flush, daemon=True).start()
+
+    def flush(self):
+        """Запись накопленных ответов в базу одним запросом"""
+        with self.flush_lock:
+            with self.lock:
+                batch = list(self.buffer)
+            if not batch:
+                return 0
+            self.db.save_test_results(batch)
+            with self.lock:
+                del self.buffer[:len(batch)]
+                self._rewrite_journal()
+            return len(batch)
+
+    def _rewrite_journal(self):
+        """Перезапись журнала оставшимися ответами"""
+        if not self.buffer:
+            if os.path.exists(self.journal_file):
+                os.remove(self.journal_file)
+            return
+        tmp_file = self.journal_file + ".tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            for row in self.buffer:
+                f.write(self._journal_line(row))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.journal_file)
+
+    def pending(self):
+        """Количество ответов, ожидающих записи"""
+        with self.lock:
+            return len(self.buffer)
+
+    def _flush_loop(self):
+        """Периодическая запись буфера в фоновом потоке"""
+        while not self.stop_event.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Ошибка фоновой записи результатов: {str(e)}")
+
+    def close(self):
+        """Остановка фоновой записи и финальный сброс буфера"""
+        self.stop_event.set()
+        try:
+            self.flush()
+        except Exception as e:
+            # Ответы остаются в журнале и будут записаны при следующем запуске
+            print(f"Ошибка записи результатов при завершении: {str(e)}")
@@ -0,0 +1,117 @@
+import csv
+import hashlib
+import secrets
+import time
+
+ROLES = ["Администратор", "Преподаватель", "Студент"]
+ACTIONS = {"": "upsert", "upsert": "upsert", "add": "upsert", "delete": "delete", "remove": "delete"}
+# Ограничения длины из схемы таблицы users
+MAX_LENGTHS = {"login": 50, "role": 20, "name": 100}
+REPORT_COLUMNS = ["line", "login", "status", "password", "message"]
+
+def hash_password(password):
+    """Хэш пароля в том же виде, в каком его проверяет вход в систему"""
+    return hashlib.sha256(password.encode()).hexdigest()
+
+class RosterImporter:
+    def __init__(self, db, password_length=10):
+        """Массовое создание, обновление и удаление учетных записей по CSV
+
+        Колонки: login, name, role и необязательные password и action
+        (пусто/upsert - создать или обновить, delete - удалить). Новым
+        пользователям без пароля выдается сгенерированный пароль, у
+        существующих пароль без явного значения не меняется.
+        """
+        self.db = db
+        self.password_length = password_length
+
+    def read_rows(self, file_path):
+        """Чтение строк CSV; разделитель (запятая или точка с запятой) определяется автоматически"""
+        with open(file_path, "r", encoding="utf-8-sig", newline="") as f:
+            sample = f.read(4096)
+            f.seek(0)
+            try:
+                dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+            except csv.Error:
+                dialect = csv.excel
+            return list(csv.DictReader(f, dialect=dialect))
+
+    def normalize(self, raw):
+        """Проверка строки; возвращает (действие, login, password, role, name, ошибка)"""
+        row = {key.strip().lower(): (value or "").strip() for key, value in raw.items() if key}
+        login, name, role = row.get("login", ""), row.get("name", ""), row.get("role", "")
+        action = ACTIONS.get(row.get("action", "").lower())
+        if action is None:
+            return None, login, None, None, None, f"неизвестное действие '{row['action']}'"
+        if not login:
+            return None, login, None, None, None, "не указан логин"
+        if action == "upsert":
+            if role not in ROLES:
+                return None, login, None, None, None, f"неизвестная роль '{role}'"
+            for column, value in (("login", login), ("role", role), ("name", name)):
+                if len(value) > MAX_LENGTHS[column]:
+                    return None, login, None, None, None, f"поле {column} длиннее {MAX_LENGTHS[column]} символов"
+        return action, login, row.get("password") or None, role, name, None
+
+    def import_file(self, file_path, protected=()):
+        """Применение списка к базе; возвращает отчет по каждой строке
+
+        Логины из protected (например, текущий администратор) не удаляются.
+        """
+        started = time.perf_counter()
+        report = {"file": file_path, "rows": [], "created": 0, "updated": 0, "deleted": 0, "errors": 0}
+        upserts, deletes, entries, seen = [], [], {}, set()
+        for number, raw in enumerate(self.read_rows(file_path), start=2):
+            action, login, password, role, name, error = self.normalize(raw)
+            entry = {"line": number, "login": login, "status": "ошибка", "password": "", "message": error or ""}
+            report["rows"].append(entry)
+            if error is None and login in seen:
+                error = entry["message"] = "логин повторяется в файле"
+            if error is None and action == "delete" and login in protected:
+                error = entry["message"] = "нельзя удалить текущего пользователя"
+            if error is not None:
+                report["errors"] += 1
+                continue
+            seen.add(login)
+            entries[login] = entry
+            if action == "delete":
+                deletes.append(login)
+            else:
+                initial = None if password else secrets.token_urlsafe(self.password_length)[:self.password_length]
+                upserts.append([login, password, initial, role, name])
+        # Хэширование паролей (заданных и сгенерированных); sha256 короткой строки
+        # занимает микросекунды и держит GIL, поэтому пул потоков ничего не ускоряет
+        hashes = {password: hash_password(password) for row in upserts for password in row[1:3] if password}
+        rows = [(login, hashes.get(password), hashes.get(initial), role, name)
+                for login, password, initial, role, name in upserts]
+        if rows or deletes:
+            created, deleted = self.db.apply_roster(rows, deletes)
+        else:
+            created, deleted = {}, set()
+        for login, password, initial, role, name in upserts:
+            entry = entries[login]
+            if created.get(login):
+                entry["status"] = "создан"
+                entry["password"] = password or initial
+                report["created"] += 1
+            else:
+                entry["status"] = "обновлен"
+                entry["password"] = password or ""
+                report["updated"] += 1
+        for login in deletes:
+            entry = entries[login]
+            if login in deleted:
+                entry["status"] = "удален"
+                report["deleted"] += 1
+            else:
+                entry["status"] = "не найден"
+        report["seconds"] = time.perf_counter() - started
+        return report
+
+    def save_report(self, report, file_path):
+        """Сохранение отчета в CSV (с выданными паролями)"""
+        with open(file_path, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=REPORT_COLUMNS)
+            writer.writeheader()
+            writer.writerows(report["rows"])
+        return file_path
@@ -9,7 +9,10 @@ class SettingsManager:
         self.default_settings = {
             "theme": "light",
             "font_size": 12,
-            "language": "Русский"
+            "language": "Русский",
+            # Хранилище: "postgresql" (сервер) или "sqlite" (локальный файл sqlite_path)
+            "db_backend": "postgresql",
+            "sqlite_path": "discrete_math.db"
         }
         self.settings = self.load_settings()
     
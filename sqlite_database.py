@@ -0,0 +1,570 @@
+# sqlite_database.py
+# Встроенное хранилище на SQLite с тем же набором методов, что и Database,
+# для однопользовательских установок и работы без сервера PostgreSQL.
+import csv
+import gzip
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+
+from database import Database, PREPARED_STATEMENTS, TREND_BUCKETS, _track_method, month_start, next_month
+
+# Версия схемы SQLite (PRAGMA user_version); схема создается сразу в актуальном виде
+SQLITE_SCHEMA_VERSION = 4
+
+# Замены в тексте запросов PostgreSQL: параметры psycopg2 и приведения типов
+PLACEHOLDER = re.compile(r"%\((\w+)\)s|%s|%%")
+TYPE_CAST = re.compile(r"::\w+(\[\])?")
+# "колонка ILIKE параметр": LIKE в SQLite не учитывает регистр только для латиницы
+ILIKE = re.compile(r"([\w.]+) ILIKE (%\(\w+\)s|%s)")
+
+# Типы колонок: TEXT[] хранится как JSON, BOOLEAN - как 0/1, TIMESTAMP - как ISO-строка
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_converter("TIMESTAMP", lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter("BOOLEAN", lambda value: bool(int(value)))
+sqlite3.register_converter("TEXT_ARRAY", lambda value: json.loads(value.decode()))
+
+# Начало периода для динамики результатов (аналог date_trunc); неделя начинается с понедельника
+TREND_PERIODS = {
+    "day": "date(timestamp)",
+    "week": "date(timestamp, '-6 days', 'weekday 1')",
+    "month": "strftime('%Y-%m-01', timestamp)",
+}
+
+def translate_query(query):
+    """Перевод запроса из синтаксиса psycopg2/PostgreSQL в SQLite"""
+    # Сравнение через casefold, зарегистрированную соединением, - без учета регистра и для кириллицы
+    query = ILIKE.sub(r"casefold(\1) LIKE casefold(\2)", query)
+    def placeholder(match):
+        if match.group(0) == "%%":
+            return "%"
+        return f":{match.group(1)}" if match.group(1) else "?"
+    query = PLACEHOLDER.sub(placeholder, query)
+    return TYPE_CAST.sub("", query).replace("'-infinity'", "''")
+
+def adapt_value(value):
+    """Списки (колонки TEXT[]) передаются в SQLite как JSON"""
+    return json.dumps(value, ensure_ascii=False) if isinstance(value, list) else value
+
+def md5(value):
+    """md5 для вычисляемой колонки questions.content_hash"""
+    return hashlib.md5(value.encode("utf-8")).hexdigest() if value is not None else None
+
+def casefold(value):
+    """Приведение строки к одному регистру (Unicode) для ILIKE"""
+    return value.casefold() if isinstance(value, str) else value
+
+class SQLiteCursor:
+    def __init__(self, cursor, stats, method, translations):
+        """Курсор SQLite, принимающий запросы в синтаксисе psycopg2 и учитывающий их в статистике"""
+        self.cursor = cursor
+        self.stats = stats
+        self.method = method
+        self.translations = translations
+        self.itersize = None
+
+    def _params(self, params):
+        """Приведение параметров запроса"""
+        if params is None:
+            return ()
+        if isinstance(params, dict):
+            return {key: adapt_value(value) for key, value in params.items()}
+        return [adapt_value(value) for value in params]
+
+    def _translate(self, query):
+        """Перевод запроса с кэшированием по тексту"""
+        translated = self.translations.get(query)
+        if translated is None:
+            translated = self.translations[query] = translate_query(query)
+        return translated
+
+    def _timed(self, run, query, params):
+        """Выполнение с замером времени для query_stats"""
+        started = time.perf_counter()
+        try:
+            run()
+        except Exception:
+            self.stats.record(self.method, (time.perf_counter() - started) * 1000, 0, error=True)
+            raise
+        duration_ms = (time.perf_counter() - started) * 1000
+        self.stats.record(self.method, duration_ms, self.cursor.rowcount)
+        if self.stats.is_slow(duration_ms):
+            self.stats.log_slow(self.method, query, params, duration_ms, self.cursor.rowcount)
+
+    def execute(self, query, params=None):
+        translated = self._translate(query)
+        self._timed(lambda: self.cursor.execute(translated, self._params(params)), translated, params)
+
+    def executemany(self, query, rows):
+        translated = self._translate(query)
+        self._timed(lambda: self.cursor.executemany(translated, (self._params(row) for row in rows)),
+                    translated, None)
+
+    @property
+    def rowcount(self):
+        return self.cursor.rowcount
+
+    @property
+    def connection(self):
+        return self.cursor.connection
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    def fetchmany(self, size=None):
+        return self.cursor.fetchmany(size or self.cursor.arraysize)
+
+    def __iter__(self):
+        return iter(self.cursor)
+
+class SQLiteDatabase(Database):
+    def __init__(self, path="discrete_math.db", busy_timeout=5, slow_query_ms=200,
+                 slow_log_file="logs/slow_queries.log"):
+        """Подключение к файлу базы SQLite
+
+        База работает в режиме WAL (чтение не блокируется записью), все
+        обращения идут через одно соединение, сериализованное блокировкой,
+        а каждый вызов метода выполняется одной транзакцией. Запросы
+        Database переводятся в синтаксис SQLite автоматически; методы,
+        опирающиеся на возможности PostgreSQL, переопределены.
+        """
+        self._init_common(path, False, 1, busy_timeout, slow_query_ms, slow_log_file,
+                          explain_slow=False, prepare_statements=False)
+        self._translations = {}
+        try:
+            directory = os.path.dirname(path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            self.conn = sqlite3.connect(path, timeout=busy_timeout, isolation_level=None,
+                                        check_same_thread=False, detect_types=sqlite3.PARSE_DECLTYPES,
+                                        cached_statements=256)
+            self.conn.create_function("md5", 1, md5, deterministic=True)
+            self.conn.create_function("casefold", 1, casefold, deterministic=True)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            print("Подключение к базе данных SQLite успешно установлено")
+        except sqlite3.Error as e:
+            raise Exception(f"Ошибка подключения к базе данных: {str(e)}")
+
+    def _acquire(self):
+        """Захват единственного соединения"""
+        started = time.perf_counter()
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self._stats["waits"] += 1
+            if not self._slots.acquire(timeout=self.checkout_timeout):
+                raise sqlite3.OperationalError("Истекло время ожидания соединения")
+        with self._stats_lock:
+            self._stats["checkouts"] += 1
+            self._stats["in_use"] += 1
+            self._stats["max_in_use"] = max(self._stats["max_in_use"], self._stats["in_use"])
+            self._stats["wait_time"] += time.perf_counter() - started
+        return self.conn
+
+    def _release(self, conn, broken=False):
+        """Освобождение соединения"""
+        with self._stats_lock:
+            self._stats["in_use"] -= 1
+        self._slots.release()
+
+    @contextmanager
+    def _cursor(self, name=None, method=None):
+        """Курсор на время одного вызова в явной транзакции
+
+        Курсор SQLite и так читает строки по мере обхода, поэтому name
+        (серверный курсор в PostgreSQL) не нужен и игнорируется.
+        """
+        conn = self._acquire()
+        try:
+            cursor = SQLiteCursor(conn.cursor(), self.query_stats, method or self._current_method(),
+                                  self._translations)
+            conn.execute("BEGIN")
+            try:
+                yield cursor
+                conn.execute("COMMIT")
+            except BaseException as e:
+                if isinstance(e, Exception):
+                    with self._stats_lock:
+                        self._stats["errors"] += 1
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+        finally:
+            self._release(conn)
+
+    def _execute_prepared(self, cursor, name, params):
+        """Частые запросы: модуль sqlite3 сам кэширует подготовленные выражения"""
+        cursor.execute(PREPARED_STATEMENTS[name], params)
+
+    def get_pool_stats(self):
+        """Статистика единственного соединения"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["pooled"] = False
+        stats["maxconn"] = 1
+        stats["open_connections"] = 1 if self.conn is not None else 0
+        stats["idle_connections"] = stats["open_connections"] - stats["in_use"]
+        stats["avg_wait_ms"] = stats["wait_time"] / stats["checkouts"] * 1000 if stats["checkouts"] else 0.0
+        return stats
+
+    def get_schema_version(self):
+        """Текущая версия схемы SQLite"""
+        try:
+            with self._cursor() as cursor:
+                cursor.execute("PRAGMA user_version")
+                return cursor.fetchone()[0]
+        except sqlite3.Error as e:
+            raise Exception(f"Ошибка при получении версии схемы: {str(e)}")
+
+    def migrate(self):
+        """Создание схемы и тестовых данных в новой базе или обновление схемы прежней версии"""
+        version = self.get_schema_version()
+        if version >= SQLITE_SCHEMA_VERSION:
+            return SQLITE_SCHEMA_VERSION
+        try:
+            with self._cursor() as cursor:
+                if version == 0:
+                    self._create_tables(cursor)
+                    self._insert_test_data(cursor)
+                else:
+                    # Версия 1: в logs нет колонки host, версия 2: в test_results нет client_id,
+                    # версия 3: client_id уникален без timestamp; индексы и остальное создается IF NOT EXISTS
+                    if version < 2:
+                        cursor.execute("ALTER TABLE logs ADD COLUMN host VARCHAR(100)")
+                    if version < 3:
+                        cursor.execute("ALTER TABLE test_results ADD COLUMN client_id VARCHAR(36)")
+                    cursor.execute("DROP INDEX IF EXISTS uq_test_results_client_id")
+                    self._create_tables(cursor)
+                cursor.execute(f"PRAGMA user_version = {SQLITE_SCHEMA_VERSION}")
+            if version == 0:
+                print(f"Создана схема SQLite версии {SQLITE_SCHEMA_VERSION}")
+            else:
+                print(f"Схема SQLite обновлена до версии {SQLITE_SCHEMA_VERSION}")
+            return SQLITE_SCHEMA_VERSION
+        except sqlite3.Error as e:
+            raise Exception(f"Ошибка при миграции схемы: {str(e)}")
+
+    def _create_tables(self, cursor):
+        """Схема SQLite, соответствующая последней миграции PostgreSQL"""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY,
+                login VARCHAR(50) UNIQUE,
+                password VARCHAR(64),
+                role VARCHAR(20),
+                name VARCHAR(100)
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS materials (
+                id INTEGER PRIMARY KEY,
+                topic VARCHAR(100),
+                content TEXT,
+                file_path VARCHAR(255),
+                category VARCHAR(50)
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_materials_topic ON materials(topic)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_materials_category ON materials(category)")
+        # content_hash вычисляется функцией md5, которую регистрирует это соединение
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS questions (
+                id INTEGER PRIMARY KEY,
+                topic VARCHAR(100),
+                question TEXT,
+                correct_answer VARCHAR(255),
+                wrong_answers TEXT_ARRAY,
+                question_type VARCHAR(50),
+                category VARCHAR(50),
+                content_hash TEXT GENERATED ALWAYS AS (md5(coalesce(topic, '') || char(31) || coalesce(question, '')
+                                                           || char(31) || coalesce(correct_answer, ''))) STORED
+            )
+        """)
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS uq_questions_content_hash ON questions(content_hash)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_questions_topic_id ON questions(topic, id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_questions_category_topic_id ON questions(category, topic, id)")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS test_results (
+                id INTEGER PRIMARY KEY,
+                user_login VARCHAR(50),
+                topic VARCHAR(100),
+                category VARCHAR(50),
+                correct BOOLEAN,
+                timestamp TIMESTAMP,
+                question_id INTEGER,
+                client_id VARCHAR(36)
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_test_results_user_topic ON test_results(user_login, topic)")
+        # Ключ повторной записи тот же, что в PostgreSQL, где уникальный индекс секционированной
+        # таблицы обязан включать ключ секционирования timestamp
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS uq_test_results_client_id "
+                       "ON test_results(client_id, timestamp)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_test_results_user_time_id "
+                       "ON test_results(user_login, timestamp DESC, id DESC)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_test_results_user_question "
+                       "ON test_results(user_login, question_id) WHERE correct")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS categories (
+                id INTEGER PRIMARY KEY,
+                name VARCHAR(50) UNIQUE
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS user_progress (
+                id INTEGER PRIMARY KEY,
+                user_login VARCHAR(50),
+                topic VARCHAR(100),
+                progress INTEGER
+            )
+        """)
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS uq_user_progress_user_topic ON user_progress(user_login, topic)")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS logs (
+                id INTEGER PRIMARY KEY,
+                user_login VARCHAR(50),
+                action TEXT,
+                timestamp TIMESTAMP,
+                host VARCHAR(100)
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_logs_user_time ON logs(user_login, timestamp DESC, id DESC)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_logs_time ON logs(timestamp DESC, id DESC)")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS user_topic_stats (
+                user_login VARCHAR(50),
+                topic VARCHAR(100),
+                attempts INTEGER NOT NULL DEFAULT 0,
+                correct_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_login, topic)
+            )
+        """)
+
+    def apply_roster(self, users, logins_to_delete=()):
+        """Пакетное создание/обновление и удаление пользователей в одной транзакции"""
+        try:
+            with self._cursor() as cursor:
+                created = {}
+                if users:
+                    logins = [user[0] for user in users]
+                    cursor.execute(f"SELECT login FROM users WHERE login IN ({', '.join(['%s'] * len(logins))})",
+                                   logins)
+                    existing = {row[0] for row in cursor.fetchall()}
+                    cursor.executemany("""
+                        INSERT INTO users (login, password, role, name) VALUES (%s, COALESCE(%s, %s), %s, %s)
+                        ON CONFLICT (login) DO UPDATE SET
+                            role = excluded.role,
+                            name = excluded.name,
+                            password = COALESCE(%s, users.password)
+                    """, [(login, password, initial, role, name, password)
+                          for login, password, initial, role, name in users])
+                    created = {login: login not in existing for login in logins}
+                deleted = set()
+                if logins_to_delete:
+                    logins = list(logins_to_delete)
+                    cursor.execute(f"DELETE FROM users WHERE login IN ({', '.join(['%s'] * len(logins))}) "
+                                   "RETURNING login", logins)
+                    deleted = {row[0] for row in cursor.fetchall()}
+                return created, deleted
+        except sqlite3.Error as e:
+            raise Exception(f"Ошибка при загрузке списка пользователей: {str(e)}")
+
+    def import_questions(self, rows):
+        """Массовая загрузка вопросов одной транзакцией; дубликаты пропускаются"""
+        try:
+            with self._cursor() as cursor:
+                before = cursor.connection.total_changes
+                cursor.executemany("""
+                    INSERT INTO questions (topic, question, correct_answer, wrong_answers, question_type, category)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (content_hash) DO NOTHING
+                """, rows)
+                return cursor.connection.total_changes - before
+        except sqlite3.Error as e:
+            raise Exception(f"Ошибка при импорте вопросов: {str(e)}")
+
+    def sample_questions(self, topic, k, exclude_correct_for=None, exclude_ids=()):
+        """Случайная выборка k вопросов по теме
+
+        В локальной базе темы небольшие, поэтому достаточно ORDER BY random().
+        """
+        exclude = ""
+        params = [topic]
+        if exclude_correct_for:
+            exclude = """AND NOT EXISTS (
+                SELECT 1 FROM test_results r
+                WHERE r.user_login = %s AND r.question_id = q.id AND r.correct
+            )"""
+            params.append(exclude_correct_for)
+        if exclude_ids:
+            exclude += f" AND q.id NOT IN ({', '.join(['%s'] * len(exclude_ids))})"
+            params.extend(exclude_ids)
+        try:
+            with self._cursor() as cursor:
+                cursor.execute(f"SELECT * FROM questions q WHERE q.topic = %s {exclude} ORDER BY random() LIMIT %s",
+                               params + [k])
+                return cursor.fetchall()
+        except sqlite3.Error as e:
+            raise Exception(f"Ошибка при выборке вопросов: {str(e)}")
+
+    def sample_mixed_questions(self, category, per_topic=2, total=5):
+        """Смешанная выборка: не больше per_topic вопросов на тему, всего total"""
+        try:
+            with self._cursor() as cursor:
+                cursor.execute("""
+                    SELECT id, topic, question, correct_answer, wrong_answers, question_type, category
+                    FROM (
+                        SELECT q.*, row_number() OVER (PARTITION BY q.topic ORDER BY random()) AS rn
+                        FROM questions q
+                        WHERE q.category = %s
+                    )
+                    WHERE rn <= %s
+                    ORDER BY random()
+                    LIMIT %s
+                """, (category, per_topic, total))
+                return cursor.fetchall()
+        except sqlite3.Error as e:
+            raise Exception(f"Ошибка при выборке смешанного теста: {str(e)}")
+
+    def save_test_results(self, results):
+        """Сохранение пачки результатов теста одной транзакцией; уже записанные client_id пропускаются"""
+        if not results:
+            return 0
+        try:
+            with self._cursor() as cursor:
+                inserted = []
+                for row in results:
+                    cursor.execute("INSERT INTO test_results (user_login, topic, category, correct, timestamp, "
+                                   "question_id, client_id) VALUES (%s, %s, %s, %s, %s, %s, %s) "
+                                   "ON CONFLICT (client_id, timestamp) DO NOTHING", row)
+                    if cursor.rowcount == 1:
+                        inserted.append(row)
+                if inserted:
+                    self._update_topic_stats(cursor, inserted)
+                return len(inserted)
+        except sqlite3.Error as e:
+            raise Exception(f"Ошибка при сохранении результатов теста: {str(e)}")
+
+    def save_logs(self, entries):
+        """Запись пачки событий лога одной транзакцией"""
+        if not entries:
+            return
+        try:
+            with self._cursor() as cursor:
+                cursor.executemany("INSERT INTO logs (user_login, action, timestamp, host) VALUES (%s, %s, %s, %s)",
+                                   entries)
+        except sqlite3.Error as e:
+            raise Exception(f"Ошибка при записи логов: {str(e)}")
+
+    def _update_topic_stats(self, cursor, results):
+        """Инкрементальное обновление сводной статистики в текущей транзакции"""
+        totals = {}
+        for row in results:
+            key = (row[0], row[1])
+            attempts, correct_count = totals.get(key, (0, 0))
+            totals[key] = (attempts + 1, correct_count + (1 if row[3] else 0))
+        cursor.executemany("""
+            INSERT INTO user_topic_stats (user_login, topic, attempts, correct_count) VALUES (%s, %s, %s, %s)
+            ON CONFLICT (user_login, topic) DO UPDATE SET
+                attempts = user_topic_stats.attempts + excluded.attempts,
+                correct_count = user_topic_stats.correct_count + excluded.correct_count
+        """, [(login, topic, attempts, correct_count) for (login, topic), (attempts, correct_count) in totals.items()])
+
+    def rebuild_topic_stats(self):
+        """Пересчет сводной статистики по темам"""
+        try:
+            with self._cursor() as cursor:
+                self._rebuild_topic_stats(cursor)
+                cursor.execute("SELECT COUNT(*) FROM user_topic_stats")
+                return cursor.fetchone()[0]
+        except sqlite3.Error as e:
+            raise Exception(f"Ошибка при пересчете статистики: {str(e)}")
+
+    def get_result_trend(self, user_login, bucket="week", since=None, topic=None):
+        """Динамика результатов по периодам (date_trunc заменен функциями даты SQLite)"""
+        if bucket not in TREND_BUCKETS:
+            raise ValueError(f"Неизвестный период: {bucket}")
+        period = TREND_PERIODS[bucket]
+        try:
+            with self._cursor() as cursor:
+                cursor.execute(f"""
+                    SELECT {period} AS period, COUNT(*), SUM(CASE WHEN correct THEN 1 ELSE 0 END),
+                           100.0 * SUM(CASE WHEN correct THEN 1 ELSE 0 END) / COUNT(*)
+                    FROM test_results
+                    WHERE user_login=%s AND timestamp >= COALESCE(%s, '')
+                      AND (%s IS NULL OR topic = %s)
+                    GROUP BY period
+                    ORDER BY period
+                """, (user_login, since, topic, topic))
+                return [(date.fromisoformat(row[0]),) + tuple(row[1:]) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            raise Exception(f"Ошибка при получении динамики результатов: {str(e)}")
+
+    def ensure_partitions(self, months_ahead=0):
+        """В SQLite таблица результатов не секционируется"""
+        return []
+
+    def list_partitions(self):
+        """В SQLite таблица результатов не секционируется"""
+        return []
+
+    def archive_partitions(self, before, archive_dir="archive", drop=True):
+        """Выгрузка результатов старше месяца before в сжатые CSV по месяцам
+
+        Файлы называются так же, как секции в PostgreSQL. При drop
+        выгруженные строки удаляются из test_results.
+        """
+        before = month_start(before)
+        if not os.path.exists(archive_dir):
+            os.makedirs(archive_dir)
+        archived = []
+        try:
+            with self._cursor() as cursor:
+                cursor.execute("SELECT MIN(timestamp) FROM test_results WHERE timestamp < %s", (before,))
+                oldest = cursor.fetchone()[0]
+            month = month_start(datetime.fromisoformat(oldest)) if oldest else before
+            while month < before:
+                name = f"test_results_{month:%Y_%m}"
+                file_path = os.path.join(archive_dir, f"{name}.csv.gz")
+                with self._cursor() as cursor:
+                    cursor.execute("SELECT * FROM test_results WHERE timestamp >= %s AND timestamp < %s ORDER BY id",
+                                   (month, next_month(month)))
+                    rows = cursor.fetchall()
+                    if rows:
+                        with gzip.open(file_path + ".tmp", "wt", encoding="utf-8", newline="") as f:
+                            writer = csv.writer(f)
+                            writer.writerow([column[0] for column in cursor.cursor.description])
+                            writer.writerows(rows)
+                        os.replace(file_path + ".tmp", file_path)
+                        if drop:
+                            cursor.execute("DELETE FROM test_results WHERE timestamp >= %s AND timestamp < %s",
+                                           (month, next_month(month)))
+                        archived.append((name, file_path, len(rows)))
+                        print(f"Результаты за {month:%Y-%m} выгружены в {file_path}, строк: {len(rows)}")
+                month = next_month(month)
+            return archived
+        except sqlite3.Error as e:
+            raise Exception(f"Ошибка при архивации результатов: {str(e)}")
+
+    def close(self):
+        """Закрытие соединения"""
+        try:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+                print("Соединение с базой данных SQLite закрыто")
+        except sqlite3.Error as e:
+            print(f"Ошибка при закрытии соединения: {str(e)}")
+
+
+for _name, _func in list(vars(SQLiteDatabase).items()):
+    if not _name.startswith("_") and callable(_func):
+        setattr(SQLiteDatabase, _name, _track_method(_name, _func))
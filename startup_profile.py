@@ -0,0 +1,67 @@
+# startup_profile.py
+# Профиль запуска: приложение запускается в отдельном процессе с -X importtime,
+# время до показа экрана входа и разбивка времени импорта записываются в файл.
+import os
+import re
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+# Строка отчета -X importtime: "import time: self [us] | cumulative | imported package"
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+# Метка, которую печатает дочерний процесс, когда экран входа отрисован
+READY_MARK = "STARTUP_READY_MS="
+
+def parse_importtime(output):
+    """Строки -X importtime: список (модуль, собственное время, с вложенными, глубина), мкс"""
+    modules = []
+    for line in output.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return modules
+
+def report_ready():
+    """Вызывается дочерним процессом после отрисовки экрана входа"""
+    t0 = float(os.environ.get("STARTUP_PROBE_T0", time.time()))
+    print(f"{READY_MARK}{(time.time() - t0) * 1000:.1f}", flush=True)
+
+def run_profile(output_file="startup_profile.txt", script=None, top=25):
+    """Запуск приложения с -X importtime и запись отчета; возвращает время до экрана входа, мс"""
+    script = script or os.path.abspath(sys.argv[0])
+    env = dict(os.environ, STARTUP_PROBE_T0=repr(time.time()))
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", script, "--startup-probe"],
+                            capture_output=True, text=True, env=env)
+    wall_ms = (time.perf_counter() - started) * 1000
+    ready_ms = None
+    for line in result.stdout.splitlines():
+        if line.startswith(READY_MARK):
+            ready_ms = float(line[len(READY_MARK):])
+    modules = parse_importtime(result.stderr)
+    top_level = [m for m in modules if m[3] == 0]
+    import_ms = sum(m[2] for m in top_level) / 1000
+
+    lines = [f"Профиль запуска {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+             f"Python {sys.version.split()[0]}, {sys.platform}",
+             f"Процесс целиком (с выходом): {wall_ms:.0f} мс",
+             f"До отрисовки экрана входа: {ready_ms:.0f} мс" if ready_ms is not None
+             else f"Экран входа не был показан (код возврата {result.returncode})",
+             f"Импорт модулей: {import_ms:.0f} мс, модулей: {len(modules)}",
+             "",
+             f"Верхний уровень, по времени с вложенными (top {top}), мс:"]
+    for name, _, cumulative_us, _ in sorted(top_level, key=lambda m: -m[2])[:top]:
+        lines.append(f"  {cumulative_us / 1000:9.1f}  {name}")
+    lines += ["", f"Все модули, по собственному времени (top {top}), мс:"]
+    for name, self_us, _, _ in sorted(modules, key=lambda m: -m[1])[:top]:
+        lines.append(f"  {self_us / 1000:9.1f}  {name}")
+    if result.returncode != 0:
+        lines += ["", "Вывод ошибок приложения:", *[l for l in result.stderr.splitlines()
+                                                  if not l.startswith("import time:")][-20:]]
+    with open(output_file, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    print("\n".join(lines[:5]))
+    print(f"Отчет записан в {output_file}")
+    return ready_ms
@@ -1,23 +1,26 @@
-import random
-
 class TestGenerator:
-    def __init__(self, db):
+    # Производственный класс, а не набор тестов pytest
+    __test__ = False
+
+    def __init__(self, db, questions_per_test=5):
         """Инициализация генератора тестов"""
         self.db = db
+        self.questions_per_test = questions_per_test
     
-    def generate_test(self, topic):
-        """Генерация теста по теме"""
-        questions = self.db.get_questions_by_topic(topic)
-        if len(questions) < 5:
-            return questions
-        return random.sample(questions, 5)
+    def generate_test(self, topic, user_login=None):
+        """Генерация теста по теме
+
+        Если указан пользователь, в первую очередь берутся вопросы,
+        на которые он еще не ответил верно.
+        """
+        k = self.questions_per_test
+        questions = self.db.sample_questions(topic, k, exclude_correct_for=user_login)
+        if user_login and len(questions) < k:
+            # Добор из остальных вопросов темы без уже выбранных
+            picked = [q[0] for q in questions]
+            questions.extend(self.db.sample_questions(topic, k - len(questions), exclude_ids=picked))
+        return questions
     
-    def generate_mixed_test(self, category):
+    def generate_mixed_test(self, category, per_topic=2, total=None):
         """Генерация смешанного теста по категории"""
-        questions = []
-        topics = self.db.get_topics_by_category(category)
-        for topic in topics:
-            topic_questions = self.db.get_questions_by_topic(topic)
-            if topic_questions:
-                questions.extend(random.sample(topic_questions, min(len(topic_questions), 2)))
-        return random.sample(questions, min(len(questions), 5))
\ No newline at end of file
+        return self.db.sample_mixed_questions(category, per_topic, total or self.questions_per_test)
@@ -0,0 +1,25 @@
+from log_reader import LogReader
+
+def write_log(path, lines, unterminated=""):
+    with open(path, "w", encoding="utf-8") as f:
+        for line in lines:
+            f.write(line + "\n")
+        f.write(unterminated)
+
+def test_read_backward_skips_unterminated_line_longer_than_block(tmp_path):
+    log_file = tmp_path / "app.log"
+    lines = [f"[2024-01-31 12:00:0{i}] [admin] Событие {i}" for i in range(5)]
+    write_log(log_file, lines, unterminated="x" * 200)
+    reader = LogReader(str(log_file), block_size=64)
+    entries, first = reader.read_backward(reader.size(), 3)
+    assert [entry[3] for entry in entries] == ["Событие 2", "Событие 3", "Событие 4"]
+    assert first == entries[0][0]
+    with open(log_file, "rb") as f:
+        f.seek(first)
+        assert f.readline().decode("utf-8").rstrip("\n") == lines[2]
+
+def test_read_backward_only_unterminated_line(tmp_path):
+    log_file = tmp_path / "app.log"
+    write_log(log_file, [], unterminated="x" * 200)
+    reader = LogReader(str(log_file), block_size=64)
+    assert reader.read_backward(reader.size(), 3) == ([], 0)
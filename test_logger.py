@@ -0,0 +1,37 @@
+import os
+
+from logger import Logger
+
+def log_files(tmp_path):
+    return sorted(name for name in os.listdir(tmp_path) if name.startswith("app.log"))
+
+def write_messages(logger, count):
+    for i in range(count):
+        logger.log(f"Сообщение номер {i:03d}")
+    assert logger.flush()
+
+def test_rotates_before_max_bytes_is_exceeded(tmp_path):
+    logger = Logger(log_file=str(tmp_path / "app.log"), max_bytes=300, backup_count=100, compress=False,
+                    flush_size=1000, flush_interval=60)
+    write_messages(logger, 40)
+    logger.close()
+    files = log_files(tmp_path)
+    assert logger.get_stats()["rotations"] == len(files) - 1 > 1
+    for name in files:
+        assert os.path.getsize(tmp_path / name) <= 300
+    # Ни одна строка не потеряна при ротации посреди пачки
+    lines = []
+    for name in files[1:] + files[:1]:
+        with open(tmp_path / name, encoding="utf-8") as f:
+            lines.extend(f.read().splitlines())
+    assert [line[-3:] for line in lines] == [f"{i:03d}" for i in range(40)]
+
+def test_rotation_keeps_backup_count_compressed_files(tmp_path):
+    logger = Logger(log_file=str(tmp_path / "app.log"), max_bytes=200, backup_count=2, compress=True,
+                    flush_size=1000, flush_interval=60)
+    write_messages(logger, 40)
+    logger.close()
+    assert logger.get_stats()["rotations"] > 2
+    backups = [name for name in log_files(tmp_path) if name != "app.log"]
+    assert len(backups) == 2
+    assert all(name.endswith(".gz") for name in backups)
@@ -0,0 +1,52 @@
+import hashlib
+import json
+import os
+
+import pytest
+
+from query_stats import QueryStats, mask_literals
+
+# Строка подключения к тестовой базе PostgreSQL; без нее проверки с базой пропускаются
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+def read_slow_log(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+def test_mask_literals_hides_inlined_values():
+    secret = hashlib.sha256(b"secret").hexdigest()
+    query = (f"INSERT INTO users (login, password, role) VALUES ('ivanov', '{secret}', 'Студент'), "
+             "('o''brien', 'x', 'Студент') ON CONFLICT DO NOTHING LIMIT 10 OFFSET -5.5")
+    masked = mask_literals(query)
+    assert secret not in masked
+    assert "ivanov" not in masked and "brien" not in masked
+    assert "10" not in masked and "5.5" not in masked
+    # Имена с цифрами и нумерованные параметры не меняются
+    assert mask_literals("SELECT * FROM test_results_2024_09 WHERE id = $1") == \
+        "SELECT * FROM test_results_2024_09 WHERE id = $1"
+
+def test_log_slow_masks_query_without_params(tmp_path):
+    stats = QueryStats(0, str(tmp_path / "slow.log"))
+    stats.log_slow("save_logs", "INSERT INTO logs VALUES ('admin', 'Вход', 42)", None, 1.0, 1)
+    stats.log_slow("get_user", "SELECT * FROM users WHERE login=%s", ("admin",), 1.0, 1)
+    entries = read_slow_log(tmp_path / "slow.log")
+    assert entries[0]["query"] == "INSERT INTO logs VALUES ('?', '?', ?)"
+    assert entries[1]["params"] == ["<str>"]
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL не задан")
+def test_apply_roster_leaves_no_hash_in_slow_log(tmp_path):
+    from database import Database
+    slow_log = tmp_path / "slow.log"
+    db = Database(TEST_DATABASE_URL, slow_query_ms=0, slow_log_file=str(slow_log))
+    try:
+        db.migrate()
+        hashes = [hashlib.sha256(f"roster-test-{i}".encode()).hexdigest() for i in range(3)]
+        users = [(f"roster_test_{i}", hashes[i], hashes[i], "Студент", f"Тест {i}") for i in range(3)]
+        db.apply_roster(users)
+        db.apply_roster([], [user[0] for user in users])
+    finally:
+        db.close()
+    text = slow_log.read_text(encoding="utf-8")
+    assert any(entry["method"] == "apply_roster" for entry in read_slow_log(slow_log))
+    for value in hashes:
+        assert value not in text
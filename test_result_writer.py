@@ -0,0 +1,60 @@
+import shutil
+
+import pytest
+
+from database import create_database
+from result_writer import ResultWriter
+
+@pytest.fixture
+def db(tmp_path):
+    db = create_database("sqlite", path=str(tmp_path / "test.db"), slow_log_file=str(tmp_path / "slow.log"))
+    db.migrate()
+    yield db
+    db.close()
+
+def open_writer(db, journal_file):
+    # Фоновая запись не должна срабатывать во время теста
+    return ResultWriter(db, journal_file=str(journal_file), flush_interval=3600)
+
+def test_replay_after_crash_writes_each_answer_once(db, tmp_path):
+    journal_file = tmp_path / "pending_results.jsonl"
+    writer = open_writer(db, journal_file)
+    writer.add("student", "Графы", "Теория графов", True, 1)
+    writer.add("student", "Графы", "Теория графов", False, 2)
+    writer.add("student", "Логика", "Логика", True, 3)
+    # Аварийное завершение до записи в базу: ответы есть только в журнале
+    writer.stop_event.set()
+    saved_journal = tmp_path / "journal_before_flush.jsonl"
+    shutil.copy(journal_file, saved_journal)
+
+    writer = open_writer(db, journal_file)
+    assert writer.pending() == 3
+    assert writer.flush() == 3
+    writer.close()
+    assert not journal_file.exists()
+    rows = db.get_user_results_page("student")
+    summary = db.get_topic_summary("student")
+    assert len(rows) == 3
+
+    # Сбой после записи пачки, но до очистки журнала: те же ответы отправляются повторно
+    shutil.copy(saved_journal, journal_file)
+    writer = open_writer(db, journal_file)
+    assert writer.pending() == 3
+    writer.flush()
+    writer.close()
+    assert db.get_user_results_page("student") == rows
+    assert db.get_topic_summary("student") == summary
+    assert sorted(row[:3] for row in summary) == [("Графы", 2, 1), ("Логика", 1, 1)]
+
+def test_replay_skips_truncated_last_line(db, tmp_path):
+    journal_file = tmp_path / "pending_results.jsonl"
+    writer = open_writer(db, journal_file)
+    writer.add("student", "Графы", "Теория графов", True)
+    writer.stop_event.set()
+    with open(journal_file, "a", encoding="utf-8") as f:
+        f.write('{"user_login": "student", "topic"')
+
+    writer = open_writer(db, journal_file)
+    assert writer.pending() == 1
+    writer.close()
+    assert len(db.get_user_results_page("student")) == 1
@@ -0,0 +1,64 @@
+import csv
+import gzip
+from datetime import date, datetime
+
+import pytest
+
+from database import create_database
+from sqlite_database import translate_query
+
+@pytest.fixture
+def db(tmp_path):
+    db = create_database("sqlite", path=str(tmp_path / "test.db"), slow_log_file=str(tmp_path / "slow.log"))
+    db.migrate()
+    yield db
+    db.close()
+
+def result(login, topic, correct, timestamp, client_id):
+    return (login, topic, "Логика", correct, timestamp, None, client_id)
+
+def test_translate_query_placeholders_casts_and_infinity():
+    assert translate_query("SELECT * FROM t WHERE a = %s AND b = %(name)s AND c LIKE 'x%%'") == \
+        "SELECT * FROM t WHERE a = ? AND b = :name AND c LIKE 'x%'"
+    assert translate_query("SELECT id::int, tags::text[] FROM t") == "SELECT id, tags FROM t"
+    assert translate_query("WHERE timestamp >= COALESCE(%s::timestamp, '-infinity')") == \
+        "WHERE timestamp >= COALESCE(?, '')"
+
+def test_translate_query_ilike_uses_casefold():
+    assert translate_query("WHERE action ILIKE %s ESCAPE '\\'") == "WHERE casefold(action) LIKE casefold(?) ESCAPE '\\'"
+
+def test_search_logs_ignores_case_of_cyrillic_text(db):
+    db.save_logs([("admin", "Открыт СПИСОК пользователей", datetime(2024, 5, 1, 12), "host"),
+                  ("admin", "Вход", datetime(2024, 5, 1, 13), "host")])
+    assert [row[4] for row in db.search_logs(text="список")] == ["Открыт СПИСОК пользователей"]
+
+def test_save_test_results_skips_already_written_answers(db):
+    results = [result("student", "Графы", True, datetime(2024, 5, 1, 12), "a"),
+               result("student", "Графы", False, datetime(2024, 5, 1, 12, 1), "b")]
+    assert db.save_test_results(results) == 2
+    # Повторная запись той же пачки (например, после сбоя) ничего не добавляет
+    assert db.save_test_results(results + [result("student", "Графы", True, datetime(2024, 5, 1, 12, 2), "c")]) == 1
+    assert len(db.get_user_results_page("student")) == 3
+    assert db.get_topic_summary("student")[0][:3] == ("Графы", 3, 2)
+
+def test_get_result_trend_groups_by_week(db):
+    db.save_test_results([result("student", "Графы", True, datetime(2024, 5, 6, 9), "a"),
+                          result("student", "Графы", False, datetime(2024, 5, 12, 9), "b"),
+                          result("student", "Графы", True, datetime(2024, 5, 13, 9), "c")])
+    trend = db.get_result_trend("student", "week")
+    assert trend == [(date(2024, 5, 6), 2, 1, 50.0), (date(2024, 5, 13), 1, 1, 100.0)]
+    assert db.get_result_trend("student", "week", since=datetime(2024, 5, 13)) == [(date(2024, 5, 13), 1, 1, 100.0)]
+    with pytest.raises(ValueError):
+        db.get_result_trend("student", "year")
+
+def test_archive_partitions_writes_old_months_and_drops_them(db, tmp_path):
+    db.save_test_results([result("student", "Графы", True, datetime(2024, 1, 15, 9), "a"),
+                          result("student", "Графы", False, datetime(2024, 3, 2, 9), "b"),
+                          result("student", "Графы", True, datetime(2024, 4, 1, 9), "c")])
+    archived = db.archive_partitions(date(2024, 4, 1), archive_dir=str(tmp_path / "archive"))
+    assert [(name, rows) for name, _, rows in archived] == [("test_results_2024_01", 1), ("test_results_2024_03", 1)]
+    with gzip.open(archived[0][1], "rt", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[0][:3] == ["id", "user_login", "topic"]
+    assert rows[1][-1] == "a"
+    assert [row[-1] for row in db.get_user_results_page("student")] == ["c"]
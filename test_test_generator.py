@@ -0,0 +1,30 @@
+import random
+
+from test_generator import TestGenerator
+
+class FakeQuestionsDb:
+    def __init__(self, question_ids, answered_correctly):
+        """Тема с вопросами question_ids, часть из которых пользователь уже решил верно"""
+        self.questions = [(qid, "Тема", f"Вопрос {qid}") for qid in question_ids]
+        self.answered_correctly = set(answered_correctly)
+
+    def sample_questions(self, topic, k, exclude_correct_for=None, exclude_ids=()):
+        pool = [q for q in self.questions if q[0] not in set(exclude_ids)]
+        if exclude_correct_for:
+            pool = [q for q in pool if q[0] not in self.answered_correctly]
+        return random.sample(pool, min(k, len(pool)))
+
+def test_generate_test_tops_up_to_k_when_unseen_pool_is_small():
+    # Не решено верно только 2 вопроса из 10, в тесте их должно быть 5
+    db = FakeQuestionsDb(range(1, 11), answered_correctly=range(3, 11))
+    generator = TestGenerator(db, questions_per_test=5)
+    for _ in range(50):
+        ids = [q[0] for q in generator.generate_test("Тема", user_login="student")]
+        assert len(ids) == 5
+        assert len(set(ids)) == 5
+        assert {1, 2} <= set(ids)
+
+def test_generate_test_stops_when_topic_runs_out():
+    db = FakeQuestionsDb(range(1, 4), answered_correctly=[3])
+    generator = TestGenerator(db, questions_per_test=5)
+    assert sorted(q[0] for q in generator.generate_test("Тема", user_login="student")) == [1, 2, 3]
@@ -0,0 +1,52 @@
+import threading
+import time
+
+import thumbnail_cache
+from thumbnail_cache import ThumbnailCache
+
+def make_images(tmp_path, count):
+    paths = []
+    for i in range(count):
+        path = tmp_path / f"image_{i}.png"
+        path.write_bytes(b"")
+        paths.append(str(path))
+    return paths
+
+def test_concurrent_prewarm_creates_single_executor(tmp_path, monkeypatch):
+    created = []
+
+    class CountingExecutor(thumbnail_cache.ThreadPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            created.append(self)
+            # Окно, в котором второй поток без блокировки тоже создал бы пул
+            time.sleep(0.05)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(thumbnail_cache, "ThreadPoolExecutor", CountingExecutor)
+    cache = ThumbnailCache(cache_dir=str(tmp_path / "cache"))
+    monkeypatch.setattr(cache, "load_image", lambda path: (cache._key(path), object()))
+    paths = make_images(tmp_path, 8)
+    barrier = threading.Barrier(4)
+
+    def prewarm():
+        barrier.wait()
+        cache.prewarm(paths)
+
+    threads = [threading.Thread(target=prewarm) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(created) == 1
+    cache.executor.shutdown(wait=True)
+    assert cache.get_stats()["ready"] == 8
+
+def test_prewarm_keeps_ready_images_bounded(tmp_path, monkeypatch):
+    cache = ThumbnailCache(cache_dir=str(tmp_path / "cache"), max_items=4)
+    monkeypatch.setattr(cache, "load_image", lambda path: (cache._key(path), object()))
+    paths = make_images(tmp_path, 20)
+    for start in range(0, len(paths), 4):
+        cache.prewarm(paths[start:start + 4])
+    cache.executor.shutdown(wait=True)
+    ready = cache.get_stats()["ready"]
+    assert 0 < ready <= 4
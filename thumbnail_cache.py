@@ -0,0 +1,158 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+class ThumbnailCache:
+    def __init__(self, cache_dir="cache/thumbnails", size=(300, 300), max_items=64, max_disk_files=1000):
+        """Кэш миниатюр изображений материалов
+
+        Ключ - (путь, mtime, размер), поэтому измененный файл получает новую
+        миниатюру. В памяти хранится LRU из max_items готовых PhotoImage, на
+        диске - уменьшенные копии в cache_dir (не более max_disk_files).
+        JPEG декодируется сразу в уменьшенном виде (Image.draft), крупные
+        изображения сначала уменьшаются reduce() в целое число раз. prewarm()
+        готовит миниатюры в фоновом потоке; PhotoImage создается только в
+        потоке Tk.
+        """
+        self.cache_dir = cache_dir
+        self.size = size
+        self.max_items = max_items
+        self.max_disk_files = max_disk_files
+        self.photos = OrderedDict()
+        self.ready = {}
+        self.lock = threading.Lock()
+        self.executor = None
+        self.stats = {"memory_hits": 0, "ready_hits": 0, "disk_hits": 0, "decoded": 0}
+
+    def _key(self, path):
+        """Ключ кэша: (абсолютный путь, mtime, размер)"""
+        return os.path.abspath(path), os.stat(path).st_mtime_ns, self.size
+
+    def _disk_path(self, key):
+        """Файл миниатюры на диске для ключа"""
+        digest = hashlib.sha1(f"{key[0]}|{key[1]}|{key[2][0]}x{key[2][1]}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, digest + ".png")
+
+    def _decode(self, path):
+        """Уменьшенное изображение из исходного файла"""
+        from PIL import Image
+        img = Image.open(path)
+        if img.format == "JPEG":
+            # Декодирование сразу с уменьшением в 2/4/8 раз, но не меньше нужного размера
+            img.draft("RGB", self.size)
+        factor = min(img.width // self.size[0], img.height // self.size[1])
+        if factor >= 2:
+            img = img.reduce(factor)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "transparency" in img.info or img.mode in ("LA", "PA") else "RGB")
+        return img.resize(self.size, Image.LANCZOS)
+
+    def load_image(self, path):
+        """Миниатюра как PIL Image: с диска или из исходного файла (можно вызывать из любого потока)"""
+        from PIL import Image
+        key = self._key(path)
+        disk_path = self._disk_path(key)
+        if os.path.exists(disk_path):
+            try:
+                img = Image.open(disk_path)
+                img.load()
+                # mtime - время последнего использования: prune_disk удаляет давно не нужные
+                os.utime(disk_path)
+                with self.lock:
+                    self.stats["disk_hits"] += 1
+                return key, img
+            except OSError:
+                # Поврежденный файл кэша создается заново
+                pass
+        img = self._decode(path)
+        with self.lock:
+            self.stats["decoded"] += 1
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_path = f"{disk_path}.{threading.get_ident()}.tmp"
+        img.save(temp_path, "PNG", compress_level=1)
+        os.replace(temp_path, disk_path)
+        return key, img
+
+    def get_photo(self, path):
+        """PhotoImage миниатюры для показа (только в потоке Tk)"""
+        from PIL import ImageTk
+        key = self._key(path)
+        with self.lock:
+            photo = self.photos.get(key)
+            if photo is not None:
+                self.photos.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return photo
+            img = self.ready.pop(key, None)
+            if img is not None:
+                self.stats["ready_hits"] += 1
+        if img is None:
+            key, img = self.load_image(path)
+        photo = ImageTk.PhotoImage(img)
+        with self.lock:
+            self.photos[key] = photo
+            while len(self.photos) > self.max_items:
+                self.photos.popitem(last=False)
+        return photo
+
+    def prewarm(self, paths):
+        """Фоновая подготовка миниатюр для списка файлов (уже готовые пропускаются)"""
+        paths = [p for p in paths if p and p.lower().endswith(IMAGE_EXTENSIONS) and os.path.exists(p)]
+        if not paths:
+            return
+        # prewarm вызывается из потоков DatabaseWorker: пул создается один раз
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="thumbnails")
+                self.executor.submit(self.prune_disk)
+            executor = self.executor
+        for path in paths[:self.max_items]:
+            executor.submit(self._prewarm_one, path)
+
+    def _prewarm_one(self, path):
+        """Подготовка одной миниатюры в фоне"""
+        try:
+            key = self._key(path)
+            with self.lock:
+                if key in self.photos or key in self.ready:
+                    return
+            key, img = self.load_image(path)
+            with self.lock:
+                self.ready[key] = img
+                # Неиспользованные заготовки не копятся без предела
+                while len(self.ready) > self.max_items:
+                    self.ready.pop(next(iter(self.ready)))
+        except Exception as e:
+            print(f"Ошибка подготовки миниатюры {path}: {str(e)}")
+
+    def prune_disk(self):
+        """Удаление давно не использованных файлов дискового кэша сверх max_disk_files (LRU по mtime)"""
+        if not os.path.isdir(self.cache_dir):
+            return 0
+        files = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir) if name.endswith(".png")]
+        if len(files) <= self.max_disk_files:
+            return 0
+        files.sort(key=os.path.getmtime)
+        removed = files[:len(files) - self.max_disk_files]
+        for path in removed:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        return len(removed)
+
+    def get_stats(self):
+        """Счетчики попаданий и размер кэша в памяти"""
+        with self.lock:
+            return dict(self.stats, photos=len(self.photos), ready=len(self.ready))
+
+    def close(self):
+        """Остановка фоновой подготовки"""
+        with self.lock:
+            executor = self.executor
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
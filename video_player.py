@@ -1,55 +1,131 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox
-import vlc
 import os
+import threading
+
+# Общий экземпляр libvlc: создается при первом воспроизведении и используется для всех медиа
+_instance = None
+_instance_lock = threading.Lock()
+
+# Ожидание разбора медиа (parse_with_options), мс
+PARSE_TIMEOUT_MS = 5000
+
+def get_instance():
+    """Общий vlc.Instance (модуль vlc загружается при первом вызове)"""
+    global _instance
+    with _instance_lock:
+        if _instance is None:
+            import vlc
+            _instance = vlc.Instance("--quiet")
+            if _instance is None:
+                raise RuntimeError("Не удалось инициализировать libvlc")
+        return _instance
+
+def release_instance():
+    """Освобождение общего экземпляра libvlc (при закрытии приложения)"""
+    global _instance
+    with _instance_lock:
+        if _instance is not None:
+            _instance.release()
+            _instance = None
 
 class VideoPlayer:
-    def __init__(self, root, video_path=None):
+    def __init__(self, root, max_prepared=16):
+        """Проигрыватель видео в отдельном окне
+
+        При создании ничего не загружается: libvlc, окно и плеер
+        появляются при первом play(). Медиа разбирается асинхронно
+        (parse_with_options) - при воспроизведении или заранее через
+        prepare() для списка видео, если libvlc уже загружен. Закрытие окна
+        освобождает плеер и виджеты; общий vlc.Instance и разобранные медиа
+        (не более max_prepared) сохраняются для следующих воспроизведений.
+        """
         self.root = root
-        self.video_path = video_path
-        self.instance = vlc.Instance()
-        self.player = self.instance.media_player_new()
-        self.media = None
+        self.max_prepared = max_prepared
+        self.media = {}
+        self.window = None
+        self.player = None
+        self.current = None
+        self.update_job = None
 
-        # Создание фрейма для видео
-        self.video_frame = tk.Frame(self.root)
-        self.video_frame.pack(fill=tk.BOTH, expand=True)
+    def _media(self, file_path):
+        """Медиа для файла с запуском асинхронного разбора; повторно используется из кэша"""
+        import vlc
+        media = self.media.pop(file_path, None)
+        if media is None:
+            media = get_instance().media_new(file_path)
+            media.parse_with_options(vlc.MediaParseFlag.local, PARSE_TIMEOUT_MS)
+        # Последний использованный - в конце; самые старые освобождаются
+        self.media[file_path] = media
+        while len(self.media) > self.max_prepared:
+            path = next(iter(self.media))
+            if path == self.current:
+                break
+            self.media.pop(path).release()
+        return media
 
-        # Создание области для воспроизведения видео
-        self.canvas = tk.Canvas(self.video_frame, bg="black")
-        self.canvas.pack(fill=tk.BOTH, expand=True)
-
-        # Панель управления
-        self.control_frame = tk.Frame(self.root)
-        self.control_frame.pack(fill=tk.X)
+    def prepare(self, paths):
+        """Заранее разобрать медиа списка, если libvlc уже загружен (не загружает его сам)"""
+        if _instance is None:
+            return
+        for file_path in paths[:self.max_prepared]:
+            if file_path and os.path.exists(file_path) and file_path not in self.media:
+                try:
+                    self._media(file_path)
+                except Exception as e:
+                    print(f"Ошибка подготовки видео {file_path}: {str(e)}")
 
-        # Кнопки управления
-        tk.Button(self.control_frame, text="Открыть", command=self.open_file).pack(side=tk.LEFT, padx=5)
-        tk.Button(self.control_frame, text="Воспроизвести", command=self.play_video).pack(side=tk.LEFT, padx=5)
-        tk.Button(self.control_frame, text="Пауза", command=self.pause_video).pack(side=tk.LEFT, padx=5)
-        tk.Button(self.control_frame, text="Стоп", command=self.stop_video).pack(side=tk.LEFT, padx=5)
+    def _open_window(self):
+        """Окно проигрывателя с областью видео и панелью управления"""
+        if self.window is not None:
+            self.window.lift()
+            return
+        self.window = tk.Toplevel(self.root)
+        self.window.title("Проигрыватель видео")
+        self.window.geometry("800x600")
+        self.window.protocol("WM_DELETE_WINDOW", self.close_window)
+        self.canvas = tk.Canvas(self.window, bg="black")
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+        controls = tk.Frame(self.window)
+        controls.pack(fill=tk.X)
+        tk.Button(controls, text="Открыть", command=self.open_file).pack(side=tk.LEFT, padx=5)
+        tk.Button(controls, text="Воспроизвести", command=self.play_video).pack(side=tk.LEFT, padx=5)
+        tk.Button(controls, text="Пауза", command=self.pause_video).pack(side=tk.LEFT, padx=5)
+        tk.Button(controls, text="Стоп", command=self.stop_video).pack(side=tk.LEFT, padx=5)
+        tk.Button(controls, text="Закрыть", command=self.close_window).pack(side=tk.RIGHT, padx=5)
+        self.time_label = tk.Label(controls, text="")
+        self.time_label.pack(side=tk.RIGHT, padx=5)
+        self.window.update_idletasks()
 
-        # Привязка видео к canvas (для Windows)
+        self.player = get_instance().media_player_new()
+        # Привязка видео к canvas
         if os.name == "nt":
             self.player.set_hwnd(self.canvas.winfo_id())
         else:
             self.player.set_xwindow(self.canvas.winfo_id())
+        self._update_time()
 
-        if self.video_path:
-            self.load_video(self.video_path)
+    def play(self, file_path):
+        """Воспроизведение файла в окне проигрывателя"""
+        if not file_path or not os.path.exists(file_path):
+            messagebox.showerror("Ошибка", "Файл не найден!")
+            return
+        try:
+            media = self._media(file_path)
+            self._open_window()
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось запустить видео: {str(e)}")
+            return
+        self.current = file_path
+        self.window.title(f"Проигрыватель видео - {os.path.basename(file_path)}")
+        self.player.set_media(media)
+        self.player.play()
 
     def open_file(self):
-        file_path = filedialog.askopenfilename(filetypes=[("Video files", "*.mp4 *.avi *.mkv")])
+        file_path = filedialog.askopenfilename(parent=self.window,
+                                               filetypes=[("Video files", "*.mp4 *.avi *.mkv")])
         if file_path:
-            self.load_video(file_path)
-
-    def load_video(self, file_path):
-        if not os.path.exists(file_path):
-            messagebox.showerror("Ошибка", "Файл не найден!")
-            return
-        self.media = self.instance.media_new(file_path)  # Строка 47
-        self.player.set_media(self.media)  # Строка 48
-        self.play_video()
+            self.play(file_path)
 
     def play_video(self):
         if self.player:
@@ -63,9 +139,44 @@ class VideoPlayer:
         if self.player:
             self.player.stop()
 
+    def _update_time(self):
+        """Текущая позиция и длительность (длительность известна после разбора медиа)"""
+        self.update_job = None
+        if self.window is None:
+            return
+        length = self.player.get_length()
+        position = max(self.player.get_time(), 0)
+        if length > 0:
+            self.time_label.config(text=f"{position // 60000}:{position // 1000 % 60:02d} / "
+                                        f"{length // 60000}:{length // 1000 % 60:02d}")
+        self.update_job = self.window.after(500, self._update_time)
+
+    def close_window(self):
+        """Остановка и освобождение плеера и окна; libvlc и разобранные медиа остаются"""
+        if self.update_job is not None:
+            # Иначе опрос от закрытого окна продолжится в новом окне вторым циклом
+            self.window.after_cancel(self.update_job)
+            self.update_job = None
+        if self.player is not None:
+            self.player.stop()
+            self.player.release()
+            self.player = None
+        if self.window is not None:
+            self.window.destroy()
+            self.window = None
+        self.current = None
+
+    def close(self):
+        """Освобождение всех ресурсов проигрывателя (при закрытии приложения)"""
+        self.close_window()
+        for media in self.media.values():
+            media.release()
+        self.media.clear()
+        release_instance()
+
 if __name__ == "__main__":
     root = tk.Tk()
     root.title("Проигрыватель видео")
-    root.geometry("800x600")
     player = VideoPlayer(root)
-    root.mainloop()
\ No newline at end of file
+    tk.Button(root, text="Открыть видео", command=player.open_file).pack(padx=40, pady=20)
+    root.mainloop()